@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the MySQL to PostgreSQL converter
+Compares the per-statement conversion with the previous whole-file re.sub chain
+and the table converter's row scanner with the old per-character loop
+"""
+
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+
+from check_parity import summarize
+from mysql_to_postgres_bulk import MySQLToPostgreSQLConverter
+from sql_lexer import iter_row_spans, iter_statements
+from sql_rows import parse_insert_header
+from table_converter import DumpConverter
+
+ORIGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'origin')
+
+
+def legacy_convert(sql_content):
+    """The regex cascade convert_file ran before the lexer (one re.sub per rule)"""
+    conversions = {
+        r'\bTINYINT\b': 'SMALLINT', r'\bINT\b': 'INTEGER', r'\bBIGINT\b': 'BIGINT',
+        r'\bVARCHAR\((\d+)\)': r'VARCHAR(\1)', r'\bTEXT\b': 'TEXT', r'\bLONGTEXT\b': 'TEXT',
+        r'\bMEDIUMTEXT\b': 'TEXT', r'\bTIMESTAMP\b': 'TIMESTAMP', r'\bDATETIME\b': 'TIMESTAMP',
+        r'\bDATE\b': 'DATE', r'\bTIME\b': 'TIME', r'\bFLOAT\b': 'REAL',
+        r'\bDOUBLE\b': 'DOUBLE PRECISION', r'\bDECIMAL\((\d+),(\d+)\)': r'DECIMAL(\1,\2)',
+        r'\bBOOLEAN\b': 'BOOLEAN', r'\bTINYINT\(1\)': 'BOOLEAN', r'\bJSON\b': 'JSONB',
+    }
+    for mysql_type, postgres_type in conversions.items():
+        sql_content = re.sub(mysql_type, postgres_type, sql_content, flags=re.IGNORECASE)
+    
+    for pattern in (r'\bAUTO_INCREMENT\b', r'\bENGINE\s*=\s*\w+', r'\bCHARSET\s*=\s*\w+',
+                    r'\bCOLLATE\s*=\s*\w+', r'\bDEFAULT\s+CHARSET\s*=\s*\w+'):
+        sql_content = re.sub(pattern, '', sql_content, flags=re.IGNORECASE)
+    sql_content = re.sub(r'`([^`]+)`', r'"\1"', sql_content)
+    sql_content = re.sub(r'\bINSERT\s+IGNORE\s+INTO\b', 'INSERT INTO', sql_content, flags=re.IGNORECASE)
+    re.findall(r'\b(\w+)\s+ENUM\s*\(([^)]+)\)', sql_content, flags=re.IGNORECASE)
+    
+    sql_content = re.sub(r"'0000-00-00 00:00:00'", 'NULL', sql_content)
+    sql_content = re.sub(r"'0000-00-00'", 'NULL', sql_content)
+    sql_content = re.sub(r'\bCURRENT_TIMESTAMP\b', 'CURRENT_TIMESTAMP', sql_content, flags=re.IGNORECASE)
+    
+    lines = sql_content.split('\n')
+    for index, line in enumerate(lines):
+        if re.match(r'^\s*INSERT\s+INTO', line, flags=re.IGNORECASE):
+            lines[index] = re.sub(r'\s+', ' ', line.strip())
+    return '\n'.join(lines)
+
+
+def legacy_split_records(remaining_content):
+    """The per-character VALUES splitter convert_event_registration.py used"""
+    records = []
+    i = 0
+    while i < len(remaining_content):
+        while i < len(remaining_content) and remaining_content[i].isspace():
+            i += 1
+        if i >= len(remaining_content):
+            break
+        if remaining_content[i] == '(':
+            record_start = i
+            paren_count = 1
+            i += 1
+            in_string = False
+            escape_next = False
+            while i < len(remaining_content) and paren_count > 0:
+                char = remaining_content[i]
+                if escape_next:
+                    escape_next = False
+                elif char == '\\':
+                    escape_next = True
+                elif char == "'" and not escape_next:
+                    in_string = not in_string
+                elif not in_string:
+                    if char == '(':
+                        paren_count += 1
+                    elif char == ')':
+                        paren_count -= 1
+                i += 1
+            if paren_count == 0:
+                records.append(remaining_content[record_start + 1:i - 1].strip())
+                while i < len(remaining_content) and remaining_content[i] in ',\n\r\t ':
+                    i += 1
+            else:
+                break
+        else:
+            if remaining_content[i] == ';':
+                break
+            i += 1
+    return records
+
+
+def scale_dump(sql_content, target_size):
+    """Repeat the VALUES rows of a dump as often as fits in target_size characters; never fewer than once"""
+    header, _, rows = sql_content.partition(' VALUES\n')
+    rows, _, footer = rows.partition(';\n')
+    rows = rows.rstrip()
+    repeated = [rows]
+    size = len(sql_content)
+    while size + len(rows) + 2 <= target_size:
+        repeated.append(rows)
+        size += len(rows) + 2
+    return header + ' VALUES\n' + ',\n'.join(repeated) + ';\n' + footer
+
+
+def time_call(function, sql_content, repeat=3):
+    """Return the best wall time of function(sql_content) over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(sql_content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def row_summary(sql_content):
+    """Row count and row hash per table of a dump held in memory, as check_parity sees them"""
+    with tempfile.NamedTemporaryFile('w', suffix='.sql', encoding='utf-8', delete=False) as f:
+        f.write(sql_content)
+    try:
+        return {table: (info['rows'], info['hash']) for table, info in summarize(f.name)['tables'].items()}
+    finally:
+        os.unlink(f.name)
+
+
+def check_rows(sql_content, legacy_output, converted):
+    """Compare the rows of the converted dump with the legacy conversion
+    
+    Returns the tables whose rows differ from both. Where legacy_convert
+    itself changes values (its global re.sub chain also rewrites text inside
+    string literals, e.g. 'false' to '0'), the source dump is the reference.
+    """
+    source = row_summary(sql_content)
+    legacy = row_summary(legacy_output)
+    new = row_summary(converted)
+    if set(new) != set(legacy):
+        return sorted(set(new) ^ set(legacy))
+    return [table for table in sorted(new) if new[table] != legacy[table] and new[table] != source.get(table)]
+
+
+def main():
+    converter = MySQLToPostgreSQLConverter(ORIGIN_DIR)
+    files = sys.argv[1:] or ['users.sql', 'product.sql', 'event_registration.sql']
+    sizes = [1, 2, 4, 8]
+    
+    print("Converter benchmark: legacy re.sub chain vs per-statement conversion (convert_text)")
+    print("=" * 84)
+    print(f"{'input':32s} {'size':>10s} {'legacy':>10s} {'convert':>10s} {'MB/s':>8s} {'speedup':>8s} {'rows':>10s}")
+    print("-" * 84)
+    
+    failed = False
+    for filename in files:
+        with open(os.path.join(ORIGIN_DIR, filename), 'r', encoding='utf-8') as f:
+            original = f.read()
+        
+        for megabytes in sizes:
+            sql_content = scale_dump(original, megabytes * 1024 * 1024)
+            converted = converter.convert_text(sql_content)[0]
+            differing = check_rows(sql_content, legacy_convert(sql_content), converted)
+            if differing:
+                print(f"{filename:32s} {len(sql_content):>10,} ✗ rows differ from legacy_convert in: "
+                      f"{', '.join(differing)}")
+                failed = True
+                continue
+            
+            legacy = time_call(legacy_convert, sql_content)
+            convert = time_call(converter.convert_text, sql_content)
+            throughput = len(sql_content.encode('utf-8')) / 1024 / 1024 / convert
+            
+            print(f"{filename:32s} {len(sql_content):>10,} {legacy * 1000:>8.1f}ms "
+                  f"{convert * 1000:>8.1f}ms {throughput:>8.1f} {legacy / convert:>7.1f}x {'✓ match':>10s}")
+        print()
+    
+    split_benchmark()
+    if failed:
+        sys.exit(1)
+
+
+def split_benchmark(filename='event_registration.sql', factors=(1, 100)):
+    """Time row splitting and whole-table conversion against the per-character loop"""
+    path = os.path.join(ORIGIN_DIR, filename)
+    with open(path, 'r', encoding='utf-8') as f:
+        original = f.read()
+    table = DumpConverter()
+    table.read_schema(path)
+    
+    print("Row splitting: per-character loop vs compiled scanner")
+    print("=" * 90)
+    print(f"{'input':32s} {'rows':>8s} {'loop':>10s} {'scanner':>10s} {'convert':>10s} {'split':>8s} {'convert':>8s}")
+    print("-" * 90)
+    for factor in factors:
+        sql_content = scale_dump(original, len(original) * factor)
+        statement = next(
+            statement for statement in iter_statements(io.StringIO(sql_content))
+            if parse_insert_header(statement) is not None
+        )
+        trivia, match = parse_insert_header(statement)
+        values_start = len(trivia) + match.end()
+        
+        rows = len(legacy_split_records(statement[values_start:]))
+        loop = time_call(lambda text: legacy_split_records(text[values_start:]), statement)
+        scanner = time_call(lambda text: list(iter_row_spans(text, values_start)), statement)
+        convert = time_call(table.convert_insert, statement)
+        print(f"{filename + f' x{factor}':32s} {rows:>8,} {loop * 1000:>8.1f}ms {scanner * 1000:>8.1f}ms "
+              f"{convert * 1000:>8.1f}ms {loop / scanner:>7.1f}x {loop / convert:>7.1f}x")
+    print()
+
+
+if __name__ == "__main__":
+    main()
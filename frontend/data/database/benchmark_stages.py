@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for every conversion stage on synthetic dumps of 1 MB to 1 GB
+Records throughput, peak RSS and the disk bytes of the plain and compressed conversions as JSON, and fails when a stage regresses against a saved baseline
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:     # Windows: peak RSS is not recorded
+    resource = None
+
+from compressed_io import open_file
+from mysql_to_postgres_bulk import MySQLToPostgreSQLConverter
+from sql_lexer import is_insert_statement, iter_statements
+from sql_rows import parse_insert_header
+from sql_schema import base_type, column_kind, parse_create_table
+from table_converter import DumpConverter
+from validate_conversion import validate_postgres_file
+
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ORIGIN_DIR = os.path.join(DATABASE_DIR, 'database', 'origin')
+
+# Real schemas the synthetic dumps are modelled on
+DATASETS = ('users', 'event_registration', 'product')
+DEFAULT_SIZES = (1, 10, 100, 1024)      # MB
+DEFAULT_THRESHOLD = 0.2
+# 2: convert_syntax converts every statement and peak RSS is VmHWM; version 1 results are not comparable
+RESULTS_VERSION = 2
+
+# Rows are written as extended INSERTs of about this size, like mysqldump
+INSERT_BYTES = 1024 * 1024
+MB = 1024 * 1024
+
+# An in-memory stage whose output is shorter than this fraction of its input lost statements
+MIN_OUTPUT_RATIO = 0.9
+
+ENUM_VALUE_PATTERN = re.compile(r"'((?:[^'\\]|\\.)*)'")
+LENGTH_PATTERN = re.compile(r'\((\d+)')
+
+WORDS = ('台灣', '台北市', '大安區', '敦南街', '商務', '黑色', 'Intel® Core™ i7', 'USB 3.2 Gen 2',
+         'Thunderbolt™ 4', 'HDMI 2.1', "O'Neil", 'back\\slash', 'line\r\nbreak', 'laptop', 'guru', '16GB')
+
+
+class DumpGenerator:
+    """Write a synthetic MySQL dump shaped like one of the dumps in database/origin
+    
+    The text around the rows (SET lines, CREATE TABLE, the keys and
+    AUTO_INCREMENT after the data) is copied from the real dump; the rows
+    are generated from its column types with a fixed seed, so a given
+    dataset and size always produce the same file. users rows carry a
+    base64 data: URI image, event_registration rows a JSON document and
+    product rows fill every VARCHAR close to its length.
+    """
+    
+    def __init__(self, dataset, seed=0):
+        self.dataset = dataset
+        self.random = random.Random(seed)
+        with open(os.path.join(ORIGIN_DIR, f'{dataset}.sql'), 'r', encoding='utf-8') as source:
+            statements = list(iter_statements(source))
+        inserts = [index for index, statement in enumerate(statements) if is_insert_statement(statement)]
+        first = statements[inserts[0]]
+        trivia, header = parse_insert_header(first)
+        self.before = ''.join(statements[:inserts[0]])
+        self.insert_header = first[:len(trivia) + header.end()].lstrip('\n') + '\n'
+        self.after = ''.join(statements[inserts[-1] + 1:])
+        self.columns = next(
+            definition[1] for definition in map(parse_create_table, statements) if definition is not None
+        )
+        self.wide = dataset == 'product'
+    
+    def write(self, path, target_size):
+        """Write a dump of about target_size bytes to path"""
+        row_id = 0
+        with open(path, 'w', encoding='utf-8', newline='\n') as output:
+            output.write(self.before)
+            size = len(self.before.encode('utf-8'))
+            while size < target_size:
+                rows = []
+                batch_size = 0
+                while batch_size < INSERT_BYTES and size + batch_size < target_size:
+                    row_id += 1
+                    row = self.row(row_id)
+                    rows.append(row)
+                    batch_size += len(row.encode('utf-8')) + 2
+                statement = '\n' + self.insert_header + ',\n'.join(rows) + ';\n'
+                output.write(statement)
+                size += len(statement.encode('utf-8'))
+            output.write(self.after)
+        return row_id
+    
+    def row(self, row_id):
+        return '(' + ', '.join(self.value(column, index, row_id) for index, column in enumerate(self.columns)) + ')'
+    
+    def value(self, column, index, row_id):
+        rng = self.random
+        if index == 0:
+            return str(row_id)
+        if column.nullable and rng.random() < 0.1:
+            return 'NULL'
+        name = column.name.lower()
+        kind = column_kind(column)
+        type_name = base_type(column.type)
+        if kind == 'json':
+            return self.quote(json.dumps(self.participants(), ensure_ascii=False))
+        if name == 'image_path':
+            image = rng.randbytes(rng.randint(8, 48) * 1024)
+            return self.quote('data:image/jpeg;base64,' + base64.b64encode(image).decode())
+        if kind == 'boolean':
+            return rng.choice(('0', '1'))
+        if kind == 'date':
+            if rng.random() < 0.02:
+                return "'0000-00-00'" if type_name == 'DATE' else "'0000-00-00 00:00:00'"
+            moment = datetime(2023, 1, 1) + timedelta(seconds=rng.randrange(3 * 365 * 86400))
+            return self.quote(moment.strftime('%Y-%m-%d' if type_name == 'DATE' else '%Y-%m-%d %H:%M:%S'))
+        if type_name == 'ENUM':
+            return "'" + rng.choice(ENUM_VALUE_PATTERN.findall(column.type)) + "'"
+        if type_name in ('FLOAT', 'DOUBLE', 'DECIMAL'):
+            return f"{rng.uniform(0.5, 5000):.2f}"
+        if 'INT' in type_name:
+            return str(rng.randint(0, 99999))
+        length = LENGTH_PATTERN.search(column.type)
+        limit = int(length.group(1)) if length else 2000
+        length = rng.randint(limit * 3 // 4, limit) if self.wide else rng.randint(0, min(limit, 40))
+        return self.quote(self.text(length))
+    
+    def text(self, length):
+        pieces = []
+        size = 0
+        while size < length:
+            word = self.random.choice(WORDS)
+            pieces.append(word)
+            size += len(word) + 1
+        return ' '.join(pieces)[:length]
+    
+    def participants(self):
+        rng = self.random
+        return [
+            {'name': self.text(8), 'phone': f"09{rng.randint(10000000, 99999999)}",
+             'email': f"user{rng.randint(1, 9999)}@test.com", 'game_id': rng.randint(1000, 999999),
+             'captain': index == 0}
+            for index in range(rng.randint(1, 5))
+        ]
+    
+    def quote(self, text):
+        """MySQL string literal for text, with the escapes mysqldump writes"""
+        return "'" + (text.replace('\\', '\\\\').replace("'", "\\'").replace('\r', '\\r').replace('\n', '\\n')) + "'"
+
+
+def dataset_path(work_dir, dataset, megabytes):
+    return os.path.join(work_dir, f'{dataset}_{megabytes}mb.sql')
+
+
+def prepare_dump(work_dir, dataset, megabytes):
+    """Return the path of the synthetic dump, generating it on first use"""
+    path = dataset_path(work_dir, dataset, megabytes)
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        rows = DumpGenerator(dataset).write(path + '.tmp', megabytes * MB)
+        os.replace(path + '.tmp', path)
+        print(f"  Generated {os.path.basename(path)}: {rows:,} rows in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def converted_path(path):
+    return path.replace('.sql', '_postgres.sql')
+
+
+def compressed_dump(path, suffix):
+    """Return the path of the dump compressed with the codec of suffix, writing it on first use"""
+    compressed = path + suffix
+    if not os.path.exists(compressed):
+        start = time.perf_counter()
+        with open(path, 'rb') as source, open_file(compressed + '.tmp', 'wb', suffix) as output:
+            shutil.copyfileobj(source, output, MB)
+        os.replace(compressed + '.tmp', compressed)
+        print(f"  Compressed {os.path.basename(compressed)}: {os.path.getsize(compressed) / MB:.1f} MB "
+              f"in {time.perf_counter() - start:.1f}s")
+    return compressed
+
+
+# Stages: name -> function(path) run in a fresh process; returns (wall seconds, CPU seconds)
+def _in_memory(method):
+    def run(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            sql_content = f.read()
+        converter = MySQLToPostgreSQLConverter(os.path.dirname(path))
+        output = []
+        result = _timed(lambda: output.append(getattr(converter, method)(sql_content)))
+        check_output(method, sql_content, output[0])
+        return result
+    return run
+
+
+def check_output(method, sql_content, converted):
+    """Raise when an in-memory stage returned an empty or shrunk dump instead of converting all of it"""
+    if len(converted) < len(sql_content) * MIN_OUTPUT_RATIO:
+        raise RuntimeError(f"{method} returned {len(converted):,} of {len(sql_content):,} characters")
+
+
+def _convert_file(streaming):
+    def run(path):
+        converter = MySQLToPostgreSQLConverter(os.path.dirname(path), streaming=streaming)
+        result = _timed(lambda: converter.convert_file(os.path.basename(path)))
+        if converter.conversion_log[-1]['status'] != 'success':
+            raise RuntimeError(converter.conversion_log[-1]['error'])
+        return result
+    return run
+
+
+def _convert_compressed(suffix):
+    """convert_file_stream from the dump compressed with suffix to output compressed the same way"""
+    def run(path):
+        converter = MySQLToPostgreSQLConverter(os.path.dirname(path), streaming=True, compress=suffix[1:])
+        result = _timed(lambda: converter.convert_file(os.path.basename(path) + suffix))
+        if converter.conversion_log[-1]['status'] != 'success':
+            raise RuntimeError(converter.conversion_log[-1]['error'])
+        return result
+    return run
+
+
+def _record_scanner(path):
+    """The row scanner behind convert_event_registration.py (DumpConverter.convert_insert)"""
+    table = DumpConverter()
+    table.read_schema(path)
+    
+    def scan():
+        with open(path, 'r', encoding='utf-8') as source:
+            for statement in iter_statements(source):
+                if parse_insert_header(statement) is not None:
+                    table.convert_insert(statement)
+    return _timed(scan)
+
+
+def _validate(path):
+    return _timed(lambda: validate_postgres_file(converted_path(path)))
+
+
+STAGES = {
+    'convert_data_types': _in_memory('convert_data_types'),
+    'convert_syntax': _in_memory('convert_syntax'),
+    'convert_timestamps': _in_memory('convert_timestamps'),
+    'process_insert_statements': _in_memory('process_insert_statements'),
+    'add_sequence_reset': _in_memory('add_sequence_reset'),
+    'convert_file': _convert_file(streaming=False),
+    'convert_file_stream': _convert_file(streaming=True),
+    'convert_file_gz': _convert_compressed('.gz'),
+    'convert_file_xz': _convert_compressed('.xz'),
+    'convert_file_bz2': _convert_compressed('.bz2'),
+    'record_scanner': _record_scanner,
+    'validate_postgres_file': _validate,
+}
+
+# Stages that read the converted file instead of the MySQL dump
+READS_CONVERTED = frozenset(('validate_postgres_file',))
+
+# Conversions whose input and output go through a codec: stage -> suffix.
+# Their throughput is measured on the uncompressed dump size like the
+# plain ones, and disk_mb shows what they read and write instead.
+COMPRESSED_STAGES = {
+    'convert_file_gz': '.gz',
+    'convert_file_xz': '.xz',
+    'convert_file_bz2': '.bz2',
+}
+PLAIN_CONVERSIONS = frozenset(('convert_file', 'convert_file_stream'))
+
+
+def disk_bytes(stage, path):
+    """Bytes a conversion stage reads from and writes to disk (its input plus its output), or None"""
+    suffix = COMPRESSED_STAGES.get(stage, '')
+    if not suffix and stage not in PLAIN_CONVERSIONS:
+        return None
+    return os.path.getsize(path + suffix) + os.path.getsize(converted_path(path) + suffix)
+
+
+def _timed(function):
+    """Run function; returns (wall seconds, CPU seconds)"""
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    with redirect_stdout(io.StringIO()):
+        function()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be read
+    
+    On Linux this is VmHWM from /proc/self/status: ru_maxrss carries the
+    high-water mark of the address space replaced by exec, which for a
+    child started with vfork is the parent's.
+    """
+    try:
+        with open('/proc/self/status', 'r', encoding='utf-8') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (MB if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_stage_here(stage, path):
+    """--run-stage entry point: run one stage in this process and print its measurements as JSON"""
+    seconds, cpu_seconds = STAGES[stage](path)
+    print(json.dumps({'seconds': seconds, 'cpu_seconds': cpu_seconds, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def run_stage(stage, path):
+    """Run one stage in a fresh interpreter so its peak RSS is its own"""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-stage', stage, path],
+        cwd=DATABASE_DIR, capture_output=True, text=True, encoding='utf-8',
+    )
+    if completed.returncode != 0:
+        message = completed.stderr.strip().splitlines()
+        raise RuntimeError(message[-1] if message else f"exited with status {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def benchmark(stages, datasets, sizes, work_dir, repeat=1):
+    """Run every stage on every dataset and size; returns {key: result}"""
+    results = {}
+    for megabytes in sizes:
+        for dataset in datasets:
+            path = prepare_dump(work_dir, dataset, megabytes)
+            for stage in stages:
+                source = path
+                if stage in READS_CONVERTED:
+                    source = converted_path(path)
+                    if not os.path.exists(source):
+                        run_stage('convert_file_stream', path)
+                if stage in COMPRESSED_STAGES:
+                    compressed_dump(path, COMPRESSED_STAGES[stage])
+                key = f"{stage}/{dataset}/{megabytes}mb"
+                size = os.path.getsize(source)
+                try:
+                    runs = [run_stage(stage, path) for _ in range(repeat)]
+                except RuntimeError as e:
+                    results[key] = {'stage': stage, 'dataset': dataset, 'size_mb': megabytes, 'bytes': size,
+                                    'status': 'error', 'error': str(e)}
+                    print(f"  ✗ {key}: {e}")
+                    continue
+                best = min(runs, key=lambda run: run['seconds'])
+                peaks = [run['peak_rss_mb'] for run in runs if run['peak_rss_mb'] is not None]
+                result = {
+                    'stage': stage, 'dataset': dataset, 'size_mb': megabytes, 'bytes': size, 'status': 'ok',
+                    'seconds': round(best['seconds'], 4), 'cpu_seconds': round(best['cpu_seconds'], 4),
+                    'mb_per_s': round(size / MB / best['seconds'], 2) if best['seconds'] else None,
+                    'peak_rss_mb': max(peaks) if peaks else None,
+                }
+                io_bytes = disk_bytes(stage, path)
+                if io_bytes is not None:
+                    result['disk_mb'] = round(io_bytes / MB, 2)
+                results[key] = result
+                print(f"  {key:<48} {result['seconds']:>9.3f}s {result['mb_per_s'] or 0:>9.2f} MB/s "
+                      f"{result['peak_rss_mb'] or 0:>9.1f} MB"
+                      + (f" {result['disk_mb']:>9.1f} MB disk" if 'disk_mb' in result else ''))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the regressions of results against baseline as printable lines
+    
+    A stage regresses when its throughput drops, or its peak RSS grows, by
+    more than threshold (a fraction) relative to the baseline run.
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        before = baseline.get(key)
+        if before is None or before.get('status') != 'ok':
+            continue
+        if result['status'] != 'ok':
+            regressions.append(f"{key}: {result['error']}")
+            continue
+        if before.get('mb_per_s') and result['mb_per_s'] is not None \
+                and result['mb_per_s'] < before['mb_per_s'] * (1 - threshold):
+            regressions.append(f"{key}: {before['mb_per_s']:.2f} → {result['mb_per_s']:.2f} MB/s")
+        if before.get('peak_rss_mb') and result['peak_rss_mb'] is not None \
+                and result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{key}: peak RSS {before['peak_rss_mb']:.1f} → {result['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    if saved.get('version') != RESULTS_VERSION:
+        raise ValueError(f"{path} holds version {saved.get('version')} results; "
+                         f"regenerate it with --output (this is version {RESULTS_VERSION})")
+    return saved['results']
+
+
+def save_results(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': RESULTS_VERSION,
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write('\n')
+
+
+def _list(value):
+    return [item for item in value.split(',') if item]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark every conversion stage on synthetic dumps")
+    parser.add_argument('--stages', type=_list, default=list(STAGES), metavar='STAGE[,...]',
+                        help=f"stages to run (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--datasets', type=_list, default=list(DATASETS), metavar='NAME[,...]',
+                        help=f"dumps to model the data on (default: {', '.join(DATASETS)})")
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in _list(value)], default=list(DEFAULT_SIZES),
+                        metavar='MB[,...]', help="dump sizes in MB (default: 1,10,100,1024)")
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'guru-benchmark'),
+                        help="where the generated dumps and their conversions are kept between runs "
+                             "(default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="runs per stage; the fastest is recorded (default: %(default)s)")
+    parser.add_argument('--output', default=None, help="write the results to this JSON file")
+    parser.add_argument('--baseline', default=None,
+                        help="compare against a results file and exit 1 when a stage regresses")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed throughput drop or peak RSS growth against --baseline, as a "
+                             "fraction (default: %(default)s)")
+    parser.add_argument('--run-stage', nargs=2, metavar=('STAGE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    unknown += [dataset for dataset in args.datasets if dataset not in DATASETS]
+    if unknown:
+        parser.error(f"unknown stage or dataset: {', '.join(unknown)}")
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.run_stage:
+        run_stage_here(*args.run_stage)
+        return
+    
+    baseline = None
+    if args.baseline:
+        try:
+            baseline = load_results(args.baseline)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+    
+    print("Conversion stage benchmark")
+    print("=" * 50)
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = benchmark(args.stages, args.datasets, args.sizes, args.work_dir, args.repeat)
+    
+    if args.output:
+        save_results(args.output, results)
+        print(f"\n✓ Results written to {args.output}")
+    
+    if args.baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regressions beyond {args.threshold:.0%} against {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\n✓ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
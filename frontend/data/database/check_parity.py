@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Row-level parity check between the MySQL dumps in database/origin and their PostgreSQL conversions
+Streams both sides, compares per-table row counts and order-independent hashes, and pinpoints differing rows by primary key
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from compressed_io import find_file, glob_files, strip_compression
+from mapped_input import iter_mapped_statements
+from sql_lexer import CopyData, split_leading_trivia
+from sql_rows import Raw, insert_column_names, is_zero_date, iter_row_values, parse_insert_header
+from sql_schema import column_kind, parse_alter_table, qualified_name
+from table_converter import TableSchema
+
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ORIGIN_DIR = os.path.join(DATABASE_DIR, 'database', 'origin')
+
+DEFAULT_DIFFERENCES = 10
+
+# Rows per partition when locating differences; one partition per side is
+# held in memory at a time
+BUCKET_ROWS = 100_000
+MAX_BUCKETS = 256
+
+# Row hashes are summed modulo 2**128: order-independent, and unlike XOR a
+# duplicated row does not cancel itself out
+HASH_BITS = 128
+HASH_MODULUS = 1 << HASH_BITS
+
+# Known conversions, applied to both sides before hashing
+BOOLEAN_TEXT = {'0': 'false', 'f': 'false', 'false': 'false', '1': 'true', 't': 'true', 'true': 'true'}
+
+COPY_HEADER_PATTERN = re.compile(
+    r'COPY\s+(?P<table>(?:"[^"]*(?:""[^"]*)*"|[\w$]+)(?:\.(?:"[^"]*(?:""[^"]*)*"|[\w$]+))?)'
+    r'\s*(?:\((?P<columns>[^()]*)\))?\s+FROM\s+stdin\b',
+    re.IGNORECASE,
+)
+BINARY_COPY_PATTERN = re.compile(r'^\\copy\s+(\S+)', re.IGNORECASE | re.MULTILINE)
+COPY_ESCAPE_PATTERN = re.compile(r'\\(.)')
+UNSAFE_FILE_CHARS = re.compile(r'[^\w.-]')
+COPY_UNESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+
+
+def copy_value(field):
+    """Decode one field of COPY text format"""
+    if field == '\\N':
+        return None
+    if '\\' not in field:
+        return field
+    return COPY_ESCAPE_PATTERN.sub(lambda match: COPY_UNESCAPES.get(match.group(1), match.group(1)), field)
+
+
+def normalise(kind, value):
+    """The text a value stands for once the converter's known changes are undone
+    
+    Quoting and number/string distinctions are dropped (COPY text has
+    neither), booleans become 'true'/'false' whether written 0/1, '0'/'1'
+    or as words, and zero-dates (impossible dates included) in date columns
+    become NULL.
+    """
+    if value is None:
+        return None
+    text = value.text if isinstance(value, Raw) else value
+    if kind == 'boolean':
+        return BOOLEAN_TEXT.get(text.lower(), text)
+    if kind == 'date' and is_zero_date(text):
+        return None
+    return text
+
+
+def row_digest(row):
+    """128-bit digest of a {column: value} row, independent of column order"""
+    canonical = json.dumps(sorted(row.items()), ensure_ascii=False, separators=(',', ':'))
+    return int.from_bytes(hashlib.blake2b(canonical.encode('utf-8'), digest_size=HASH_BITS // 8).digest(), 'big')
+
+
+class RowReader:
+    """Stream the rows of one dump, MySQL or converted, as (table, {column: value})
+    
+    Reads INSERT ... VALUES and COPY ... FROM stdin rows in bounded memory
+    (one statement or one COPY chunk at a time). CREATE TABLE and ALTER
+    TABLE statements are kept as TableSchemas for the column kinds and the
+    primary key, which phpMyAdmin and the converter both write after the
+    rows; it is complete once iteration has finished. Binary COPY data in
+    .pgcopy files is not read and is listed in notes.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.schemas = {}       # table -> TableSchema
+        self.notes = []
+        self._kinds = {}        # table -> {column: kind}
+    
+    def __iter__(self):
+        copy_target = None      # (table, column names) of the COPY block being read
+        for statement in iter_mapped_statements(self.path):
+            if isinstance(statement, CopyData):
+                if copy_target is None:
+                    continue
+                table, names = copy_target
+                for line in statement.split('\n'):
+                    if line == '\\.':
+                        copy_target = None
+                        break
+                    if line:
+                        yield table, self._row(table, names, [copy_value(field) for field in line.split('\t')])
+                continue
+            
+            trivia, body = split_leading_trivia(statement)
+            for binary in BINARY_COPY_PATTERN.finditer(trivia):
+                self.notes.append(f"rows of {qualified_name(binary.group(1))} are in a binary COPY file "
+                                  f"and were not checked")
+            header = parse_insert_header(statement)
+            if header is not None:
+                table = qualified_name(header[1].group('table'))
+                names = self._names(table, header[1].group('columns'))
+                for values in iter_row_values(statement, len(header[0]) + header[1].end()):
+                    yield table, self._row(table, names, values)
+                continue
+            copy = COPY_HEADER_PATTERN.match(body)
+            if copy is not None:
+                table = qualified_name(copy.group('table'))
+                copy_target = (table, self._names(table, copy.group('columns')))
+                continue
+            self._observe(statement)
+    
+    def _observe(self, statement):
+        schema = TableSchema.from_statement(statement)
+        if schema is not None:
+            self.schemas[schema.name] = schema
+            self._kinds.pop(schema.name, None)
+            return
+        altered = parse_alter_table(statement)
+        if altered is not None and altered[0] in self.schemas:
+            self.schemas[altered[0]].apply_alter(altered[1])
+    
+    def _names(self, table, column_list):
+        if column_list:
+            return insert_column_names(column_list)
+        schema = self.schemas.get(table)
+        return [column.name for column in schema.columns] if schema else []
+    
+    def _row(self, table, names, values):
+        kinds = self._kinds.get(table)
+        if kinds is None:
+            schema = self.schemas.get(table)
+            kinds = {column.name: column_kind(column) for column in schema.columns} if schema else {}
+            self._kinds[table] = kinds
+        if len(names) != len(values):
+            # No column list and no CREATE TABLE: compare by position
+            names = [f"#{index}" for index in range(len(values))]
+        return {name: normalise(kinds.get(name), value) for name, value in zip(names, values)}
+    
+    def primary_key(self, table):
+        schema = self.schemas.get(table)
+        return list(schema.primary_key) if schema else []
+    
+    def auto_increment(self, table):
+        schema = self.schemas.get(table)
+        return sorted(schema.auto_increment) if schema else []
+
+
+def summarize(path):
+    """First pass over one dump: row count and row hash per table
+    
+    Returns {'tables': {table: {'rows', 'hash', 'primary_key', 'auto_increment'}}, 'notes': [...]}.
+    """
+    reader = RowReader(path)
+    counts = {}
+    hashes = {}
+    for table, row in reader:
+        counts[table] = counts.get(table, 0) + 1
+        hashes[table] = (hashes.get(table, 0) + row_digest(row)) % HASH_MODULUS
+    return {
+        'tables': {
+            table: {'rows': counts[table], 'hash': f"{hashes[table]:032x}", 'primary_key': reader.primary_key(table),
+                    'auto_increment': reader.auto_increment(table)}
+            for table in counts
+        },
+        'notes': reader.notes,
+    }
+
+
+def row_key(row, primary_key):
+    """Identity of a row: its primary key values, or the whole row when the table has none"""
+    if primary_key and all(column in row for column in primary_key):
+        return [row[column] for column in primary_key]
+    return [f"{row_digest(row):032x}"]
+
+
+def partition(path, tables, directory, side):
+    """Second pass over one dump: spread the rows of tables over partition files by key
+    
+    tables maps table -> (primary key columns, partition count). Each line
+    holds [key, row digest, row]; rows with the same key land in the same
+    partition on both sides. Returns {(table, number): path}.
+    """
+    files = {}
+    paths = {}
+    try:
+        for table, row in RowReader(path):
+            if table not in tables:
+                continue
+            primary_key, buckets = tables[table]
+            key = row_key(row, primary_key)
+            encoded_key = json.dumps(key, ensure_ascii=False)
+            number = zlib.crc32(encoded_key.encode('utf-8')) % buckets
+            output = files.get((table, number))
+            if output is None:
+                safe_name = UNSAFE_FILE_CHARS.sub('_', table)
+                paths[(table, number)] = os.path.join(directory, f"{side}-{safe_name}-{number}.jsonl")
+                output = files[(table, number)] = open(paths[(table, number)], 'w', encoding='utf-8')
+            output.write(json.dumps([key, f"{row_digest(row):032x}", row], ensure_ascii=False) + '\n')
+    finally:
+        for output in files.values():
+            output.close()
+    return paths
+
+
+def _sort_key(key):
+    """Order keys numerically where they are numbers"""
+    return tuple(
+        (0, float(value), '') if value is not None and re.fullmatch(r'-?\d+(?:\.\d+)?', value) else (1, 0.0, str(value))
+        for value in key
+    )
+
+
+def _read_bucket(path):
+    if path is None:
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def compare_bucket(mysql_path, postgres_path, limit):
+    """Compare one partition of both sides
+    
+    Returns (number of differing rows, the limit smallest differences by key).
+    """
+    expected = {}
+    for key, digest, row in _read_bucket(mysql_path):
+        expected.setdefault(json.dumps(key, ensure_ascii=False), []).append((key, digest, row))
+    
+    differences = []
+    total = 0
+    for key, digest, row in _read_bucket(postgres_path):
+        candidates = expected.get(json.dumps(key, ensure_ascii=False))
+        if not candidates:
+            total += 1
+            differences.append({'key': key, 'kind': 'extra', 'mysql': None, 'postgres': row})
+            continue
+        match = next((index for index, candidate in enumerate(candidates) if candidate[1] == digest), None)
+        if match is not None:
+            candidates.pop(match)
+            continue
+        _, _, original = candidates.pop(0)
+        total += 1
+        changed = sorted(name for name in set(original) | set(row) if original.get(name) != row.get(name))
+        differences.append({'key': key, 'kind': 'changed', 'columns': changed, 'mysql': original, 'postgres': row})
+    for candidates in expected.values():
+        for key, _, original in candidates:
+            total += 1
+            differences.append({'key': key, 'kind': 'missing', 'mysql': original, 'postgres': None})
+    return total, heapq.nsmallest(limit, differences, key=lambda difference: _sort_key(difference['key']))
+
+
+def find_pairs(origin_dir, output_dir, names=None):
+    """(name, MySQL dump, converted file or None) for every dump in origin_dir
+    
+    Either side may be compressed (.gz, .xz, .bz2); name is the plain one.
+    """
+    pairs = []
+    for mysql_path in glob_files(origin_dir, '*.sql'):
+        name = strip_compression(os.path.basename(mysql_path))
+        if name.endswith(('_postgres.sql', '_delta.sql')) or (names and name not in names and name[:-4] not in names):
+            continue
+        pairs.append((name, mysql_path, find_file(os.path.join(output_dir, name[:-4] + '_postgres.sql'))))
+    return pairs
+
+
+def check_parity(pairs, jobs=1, limit=DEFAULT_DIFFERENCES, work_dir=None):
+    """Compare every pair; returns a list of per-table results
+    
+    Both sides of every pair are summarised in parallel. Only tables whose
+    counts or hashes differ get the second, partitioned pass that finds
+    the differing rows, so a clean run reads every file once.
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        scans = {
+            (name, side): executor.submit(summarize, path)
+            for name, mysql_path, postgres_path in pairs
+            for side, path in (('mysql', mysql_path), ('postgres', postgres_path)) if path
+        }
+        
+        mismatched = []         # (result, mysql_path, postgres_path)
+        for name, mysql_path, postgres_path in pairs:
+            mysql = scans[(name, 'mysql')].result()
+            if postgres_path is None:
+                for table, summary in mysql['tables'].items():
+                    results.append({'file': name, 'table': table, 'status': 'no output',
+                                    'mysql_rows': summary['rows'], 'postgres_rows': None})
+                continue
+            postgres = scans[(name, 'postgres')].result()
+            notes = mysql['notes'] + postgres['notes']
+            for table in sorted(set(mysql['tables']) | set(postgres['tables'])):
+                before = mysql['tables'].get(table)
+                after = postgres['tables'].get(table)
+                result = {
+                    'file': name, 'table': table,
+                    'mysql_rows': before['rows'] if before else 0,
+                    'postgres_rows': after['rows'] if after else 0,
+                    'mysql_hash': before['hash'] if before else None,
+                    'postgres_hash': after['hash'] if after else None,
+                    'notes': notes,
+                }
+                result['status'] = 'match' if before and after and before['hash'] == after['hash'] \
+                    and before['rows'] == after['rows'] else 'mismatch'
+                results.append(result)
+                if result['status'] == 'mismatch':
+                    primary_key = (before or after)['primary_key']
+                    rows = max(result['mysql_rows'], result['postgres_rows'])
+                    buckets = min(MAX_BUCKETS, max(1, -(-rows // BUCKET_ROWS)))
+                    mismatched.append((result, mysql_path, postgres_path, primary_key, buckets))
+        
+        if mismatched:
+            locate_differences(executor, mismatched, limit, work_dir)
+    return results
+
+
+def locate_differences(executor, mismatched, limit, work_dir=None):
+    """Second pass for the mismatched tables; fills in 'differences' on their results"""
+    directory = tempfile.mkdtemp(prefix='parity-', dir=work_dir)
+    try:
+        by_path = {}
+        for result, mysql_path, postgres_path, primary_key, buckets in mismatched:
+            for side, path in (('mysql', mysql_path), ('postgres', postgres_path)):
+                by_path.setdefault((side, path), {})[result['table']] = (primary_key, buckets)
+        partitions = {}
+        for number, ((side, path), tables) in enumerate(by_path.items()):
+            partitions[(side, path)] = executor.submit(partition, path, tables, directory, f"{side}{number}")
+        files = {side_path: future.result() for side_path, future in partitions.items()}
+        
+        for result, mysql_path, postgres_path, primary_key, buckets in mismatched:
+            table = result['table']
+            mysql_files = files[('mysql', mysql_path)]
+            postgres_files = files[('postgres', postgres_path)]
+            futures = [
+                executor.submit(compare_bucket, mysql_files.get((table, number)),
+                                postgres_files.get((table, number)), limit)
+                for number in range(buckets)
+            ]
+            total = 0
+            differences = []
+            for future in futures:
+                count, found = future.result()
+                total += count
+                differences.extend(found)
+            result['primary_key'] = primary_key
+            result['differing_rows'] = total
+            result['differences'] = heapq.nsmallest(limit, differences, key=lambda difference: _sort_key(difference['key']))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def print_results(results):
+    print("\nPARITY SUMMARY")
+    print("=" * 50)
+    width = max([len('Table')] + [len(result['table']) for result in results])
+    print(f"{'Table':<{width}}  {'MySQL':>10}  {'PostgreSQL':>10}  Status")
+    for result in results:
+        postgres_rows = '-' if result['postgres_rows'] is None else f"{result['postgres_rows']:,}"
+        marker = '✓' if result['status'] == 'match' else '✗'
+        print(f"{result['table']:<{width}}  {result['mysql_rows']:>10,}  {postgres_rows:>10}  {marker} {result['status']}")
+    
+    for result in results:
+        if not result.get('differences'):
+            continue
+        key_name = ', '.join(result['primary_key']) or 'row hash'
+        print(f"\n✗ {result['table']}: {result['differing_rows']:,} differing rows; first by {key_name}:")
+        for difference in result['differences']:
+            key = ', '.join('NULL' if value is None else str(value) for value in difference['key'])
+            if difference['kind'] == 'changed':
+                columns = difference['columns']
+                print(f"  ({key}) changed: " + '; '.join(
+                    f"{column}: {difference['mysql'].get(column)!r} → {difference['postgres'].get(column)!r}"[:160]
+                    for column in columns[:5]
+                ))
+            else:
+                print(f"  ({key}) {difference['kind']} in PostgreSQL output")
+    for note in sorted({note for result in results for note in result.get('notes', [])}):
+        print(f"  ! {note}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check that converted files hold the same rows as the MySQL dumps")
+    parser.add_argument('files', nargs='*',
+                        help="dump names to check, such as users or users.sql (default: every dump in --origin)")
+    parser.add_argument('--origin', default=ORIGIN_DIR, help="directory holding the MySQL dumps (default: %(default)s)")
+    parser.add_argument('--output', default=DATABASE_DIR,
+                        help="directory holding the *_postgres.sql files (default: %(default)s)")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="worker processes; 0 uses every CPU")
+    parser.add_argument('--differences', type=int, default=DEFAULT_DIFFERENCES,
+                        help="differing rows to show per table (default: %(default)s)")
+    parser.add_argument('--work-dir', default=None,
+                        help="where the partition files for locating differences go (default: the system temp dir)")
+    parser.add_argument('--report', default=None, help="write the results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    
+    print("MySQL / PostgreSQL Row Parity Check")
+    print("=" * 50)
+    pairs = find_pairs(args.origin, args.output, set(args.files))
+    if not pairs:
+        print(f"\nNo MySQL dumps found in {args.origin}")
+        sys.exit(1)
+    
+    start = time.perf_counter()
+    results = check_parity(pairs, jobs, args.differences, args.work_dir)
+    elapsed = time.perf_counter() - start
+    print_results(results)
+    
+    failed = [result for result in results if result['status'] != 'match']
+    print(f"\n{len(results) - len(failed)} of {len(results)} tables match ({elapsed:.2f}s)")
+    
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed': round(elapsed, 4), 'tables': results}, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"✓ Results written to {args.report}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
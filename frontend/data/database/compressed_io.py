@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Transparent gzip, xz and bzip2 compression for dumps and converted files
+A name ending in .gz, .xz or .bz2 is read and written through the standard library codec, streaming, so compressed files never have to be unpacked to disk
+"""
+
+import bz2
+import glob
+import gzip
+import lzma
+import os
+
+# Suffix -> codec module; each open() takes the same mode, encoding and newline arguments
+CODECS = {
+    '.gz': gzip,
+    '.xz': lzma,
+    '.bz2': bz2,
+}
+
+# Values of the --compress options
+COMPRESSIONS = tuple(suffix[1:] for suffix in CODECS)
+
+# Options for writing: gzip's module default (level 9) is several times
+# slower than the gzip command's 6 for about 1% smaller output
+WRITE_OPTIONS = {
+    '.gz': {'compresslevel': 6},
+}
+
+
+def compression_suffix(path):
+    """The codec suffix path ends with ('.gz', '.xz' or '.bz2'), or '' for a plain file"""
+    suffix = os.path.splitext(path)[1].lower()
+    return suffix if suffix in CODECS else ''
+
+
+def strip_compression(path):
+    """path without its codec suffix: users.sql.gz -> users.sql"""
+    suffix = compression_suffix(path)
+    return path[:-len(suffix)] if suffix else path
+
+
+def with_compression(path, compression):
+    """path with the suffix of compression ('gz', 'xz', 'bz2' or None for plain)"""
+    return f"{path}.{compression}" if compression else path
+
+
+def open_file(path, mode='r', compression=None, newline=None):
+    """open() for plain and compressed files; text modes read and write UTF-8
+    
+    The codec follows path's suffix unless compression gives one ('' for
+    plain), which is how a temporary file gets the codec of the file it
+    replaces: open_file(path + '.tmp', 'w', compression_suffix(path)).
+    """
+    suffix = compression_suffix(path) if compression is None else compression
+    text = {} if 'b' in mode else {'encoding': 'utf-8', 'newline': newline}
+    if not suffix:
+        return open(path, mode, **text)
+    options = WRITE_OPTIONS.get(suffix, {}) if mode[0] in 'wax' else {}
+    # The codecs open binary unless told otherwise
+    return CODECS[suffix].open(path, mode if 'b' in mode else mode + 't', **options, **text)
+
+
+def glob_files(directory, pattern):
+    """Sorted paths in directory matching pattern, plain or with a codec suffix"""
+    paths = set(glob.glob(os.path.join(directory, pattern)))
+    for suffix in CODECS:
+        paths.update(glob.glob(os.path.join(directory, pattern + suffix)))
+    return sorted(paths)
+
+
+def find_file(path):
+    """path if it exists, else the first of path.gz, path.xz and path.bz2 that does; None if none do"""
+    for candidate in [path] + [path + suffix for suffix in CODECS]:
+        if os.path.exists(candidate):
+            return candidate
+    return None
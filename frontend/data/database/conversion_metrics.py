@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Per-stage measurements and optional profiling for the MySQL to PostgreSQL converter
+Wall and CPU time, characters in and out, replacement counts and peak memory for each stage of one file
+"""
+
+import cProfile
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:     # Windows: peak memory is only known under --profile tracemalloc
+    resource = None
+
+# Stages of convert_file in the order they run. The rewrite stages share one
+# token pass, so they have replacement counts but no time of their own: that
+# is recorded once under 'rewrite'.
+STAGES = ('reading', 'rewrite', 'sequence_reset', 'writing')
+REWRITE_STAGES = ('types', 'syntax', 'enums', 'timestamps', 'inserts')
+
+PROFILERS = ('cprofile', 'tracemalloc')
+
+# Allocation sites listed per file by --profile tracemalloc
+TRACEMALLOC_TOP = 25
+
+MB = 1024 * 1024
+
+
+def peak_memory():
+    """Peak memory in bytes: traced Python allocations under tracemalloc, else the process peak RSS"""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1]
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageMetrics:
+    """Measurements for the stages of one file, as stored in conversion_log
+    
+    measure() brackets one piece of work and may be entered many times per
+    stage (once per read() call when streaming); times and sizes add up and
+    peak memory keeps the highest value seen. Sizes are in characters of
+    decoded text, the unit every stage works in. Under tracemalloc the peak
+    is reset at the start of every measured piece, so it is that stage's
+    own; otherwise it is the process peak RSS when the piece ended.
+    """
+    
+    def __init__(self):
+        self.stages = {name: self._empty() for name in STAGES}
+        self.replacements = dict.fromkeys(REWRITE_STAGES, 0)
+    
+    @staticmethod
+    def _empty():
+        return {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'chars_in': 0, 'chars_out': 0, 'calls': 0,
+                'peak_memory': None}
+    
+    @contextmanager
+    def measure(self, stage, chars_in=0):
+        entry = self.stages.setdefault(stage, self._empty())
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield entry
+        finally:
+            entry['wall_seconds'] += time.perf_counter() - wall
+            entry['cpu_seconds'] += time.process_time() - cpu
+            entry['chars_in'] += chars_in
+            entry['calls'] += 1
+            peak = peak_memory()
+            if peak is not None and (entry['peak_memory'] is None or peak > entry['peak_memory']):
+                entry['peak_memory'] = peak
+    
+    def add(self, stage, wall_seconds=0.0, cpu_seconds=0.0, chars_in=0, chars_out=0):
+        """Record work measured elsewhere, such as CPU time spent on worker processes"""
+        entry = self.stages.setdefault(stage, self._empty())
+        entry['wall_seconds'] += wall_seconds
+        entry['cpu_seconds'] += cpu_seconds
+        entry['chars_in'] += chars_in
+        entry['chars_out'] += chars_out
+    
+    def count(self, counts):
+        """Add a {rewrite stage: replacements} dict from rewrite_tokens"""
+        for stage, number in counts.items():
+            self.replacements[stage] = self.replacements.get(stage, 0) + number
+    
+    def as_dict(self):
+        stages = {}
+        for name, entry in self.stages.items():
+            stages[name] = dict(entry, wall_seconds=round(entry['wall_seconds'], 6),
+                                cpu_seconds=round(entry['cpu_seconds'], 6))
+        return {'stages': stages, 'replacements': dict(self.replacements)}
+
+
+def new_counts():
+    """Replacement counters for one rewrite_tokens call"""
+    return dict.fromkeys(REWRITE_STAGES, 0)
+
+
+class FileProfiler:
+    """cProfile or tracemalloc around the conversion of one file
+    
+    stop() writes <output_prefix>.prof (load it with pstats or snakeviz) or
+    <output_prefix>.tracemalloc.txt (the top allocation sites by line) and
+    returns the path written.
+    """
+    
+    def __init__(self, kind):
+        if kind not in PROFILERS:
+            raise ValueError(f"unknown profiler {kind!r}; expected one of {', '.join(PROFILERS)}")
+        self.kind = kind
+        self._profile = None
+        self._started_tracing = False
+    
+    def start(self):
+        if self.kind == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+    
+    def stop(self, output_prefix):
+        if self.kind == 'cprofile':
+            self._profile.disable()
+            path = output_prefix + '.prof'
+            self._profile.dump_stats(path)
+            return path
+        
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracing:
+            tracemalloc.stop()
+        path = output_prefix + '.tracemalloc.txt'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Traced memory: {current / MB:.1f} MB now, {peak / MB:.1f} MB peak\n")
+            f.write(f"Top {TRACEMALLOC_TOP} allocation sites by size:\n")
+            for statistic in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                f.write(f"  {statistic}\n")
+        return path
+
+
+class TimedStatements:
+    """Statement iterator wrapper that measures producing every statement as the 'reading' stage
+    
+    For memory-mapped input reading is splitting the map into statements
+    and decoding each one, so that is what gets timed.
+    """
+    
+    def __init__(self, statements, metrics):
+        self.statements = iter(statements)
+        self.metrics = metrics
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        with self.metrics.measure('reading') as entry:
+            statement = next(self.statements)
+        entry['chars_in'] += len(statement)
+        entry['chars_out'] += len(statement)
+        return statement
+
+
+class TimedWriter:
+    """Text stream wrapper that measures every write() as the 'writing' stage"""
+    
+    def __init__(self, stream, metrics):
+        self.stream = stream
+        self.metrics = metrics
+    
+    def write(self, text):
+        with self.metrics.measure('writing', len(text)) as entry:
+            written = self.stream.write(text)
+        entry['chars_out'] += len(text)
+        return written
+    
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
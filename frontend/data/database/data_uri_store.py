@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for data: URI column values
+Moves inline base64 images out of the dumps into files named by their hash
+"""
+
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from compressed_io import compression_suffix, open_file, strip_compression
+from sql_lexer import CopyData, TokenStream, iter_statements
+from sql_rows import COPY_ESCAPES, insert_column_names, parse_insert_header, string_value
+from sql_schema import parse_create_table, qualified_name
+
+DEFAULT_BLOB_DIR = 'blobs'
+
+DATA_URI_PATTERN = re.compile(r'data:([^,]*);base64,(.*)', re.DOTALL)
+
+# Preferred file extensions; mimetypes answers for anything else
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'image/svg+xml': '.svg',
+}
+
+
+def parse_column_spec(spec):
+    """Turn 'users.image_path,table.column' into {table: {column, ...}}"""
+    columns = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        table, _, column = item.rpartition('.')
+        if not table or not column:
+            raise argparse.ArgumentTypeError(f"expected TABLE.COLUMN, got {item!r}")
+        columns.setdefault(qualified_name(table), set()).add(column)
+    return columns
+
+
+def blob_extension(media_type):
+    mime = media_type.split(';', 1)[0].strip().lower()
+    return EXTENSIONS.get(mime) or mimetypes.guess_extension(mime) or '.bin'
+
+
+class DataURIStore:
+    """Replace data: URIs in chosen INSERT columns by paths to hash-named files
+    
+    Works on MySQL INSERT statements before conversion. Each distinct
+    payload is decoded and written once; the value becomes the path
+    relative to the output directory, e.g. 'blobs/<sha256>.jpg'.
+    A manifest per source file records the media type of every blob so
+    restore_file() can put the original URIs back byte for byte. Values
+    whose base64 text is not in canonical form are left inline, since they
+    could not be restored exactly.
+    """
+    
+    def __init__(self, columns, directory, blob_dir=DEFAULT_BLOB_DIR):
+        self.columns = columns            # table -> {column, ...}
+        self.directory = directory
+        self.blob_dir = blob_dir.strip('/')
+        self.table_columns = {}           # table -> column names from CREATE TABLE
+        self.blobs = {}                   # relative path -> manifest entry
+        self.extracted = 0
+        self.bytes_saved = 0
+    
+    def blob_path(self, relative_path):
+        return os.path.join(self.directory, *relative_path.split('/'))
+    
+    def store(self, value):
+        """Write one data URI to the store; returns its relative path or None"""
+        match = DATA_URI_PATTERN.match(value)
+        if match is None:
+            return None
+        media_type, payload = match.groups()
+        try:
+            data = base64.b64decode(payload, validate=True)
+        except binascii.Error:
+            return None
+        if base64.b64encode(data).decode('ascii') != payload:
+            return None
+        
+        relative_path = f"{self.blob_dir}/{hashlib.sha256(data).hexdigest()}{blob_extension(media_type)}"
+        entry = self.blobs.get(relative_path)
+        if entry is None:
+            path = self.blob_path(relative_path)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(path + '.tmp', path)
+            entry = self.blobs[relative_path] = {'media_type': media_type, 'bytes': len(data), 'references': 0}
+        entry['references'] += 1
+        self.extracted += 1
+        self.bytes_saved += len(value) - len(relative_path)
+        return relative_path
+    
+    def extract(self, statement):
+        """Return statement with data URIs in the chosen columns replaced by paths"""
+        definition = parse_create_table(statement)
+        if definition is not None:
+            table, columns = definition
+            self.table_columns[table] = [column.name for column in columns]
+            return statement
+        
+        header = parse_insert_header(statement)
+        if header is None:
+            return statement
+        trivia, match = header
+        table = qualified_name(match.group('table'))
+        wanted = self.columns.get(table)
+        if not wanted:
+            return statement
+        column_list = match.group('columns')
+        names = insert_column_names(column_list) if column_list else self.table_columns.get(table, [])
+        indexes = {index for index, name in enumerate(names) if name in wanted}
+        if not indexes:
+            return statement
+        
+        pieces = []
+        last = 0
+        depth = 0
+        column = 0
+        for token in TokenStream(statement, len(trivia) + match.end()):
+            kind = token.lastgroup
+            if kind == 'punct':
+                text = token.group()
+                if text == '(':
+                    depth += 1
+                    if depth == 1:
+                        column = 0
+                elif text == ')':
+                    depth -= 1
+                elif text == ',' and depth == 1:
+                    column += 1
+            elif kind == 'string' and depth == 1 and column in indexes and token.group().startswith("'data:"):
+                relative_path = self.store(string_value(token.group()))
+                if relative_path is not None:
+                    pieces.append(statement[last:token.start()])
+                    pieces.append(f"'{relative_path}'")
+                    last = token.end()
+        
+        if not pieces:
+            return statement
+        pieces.append(statement[last:])
+        return ''.join(pieces)
+    
+    def manifest_name(self, mysql_filename):
+        return f"{self.blob_dir}/{os.path.splitext(strip_compression(mysql_filename))[0]}.json"
+    
+    def close(self, mysql_filename):
+        """Write the manifest for mysql_filename; returns the files to track"""
+        if not self.blobs:
+            return []
+        manifest_name = self.manifest_name(mysql_filename)
+        manifest = {
+            'source': mysql_filename,
+            'columns': sorted(f"{table}.{column}" for table, columns in self.columns.items() for column in columns),
+            'blobs': dict(sorted(self.blobs.items())),
+        }
+        path = self.blob_path(manifest_name)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+        return [manifest_name]
+
+
+def load_restore_map(directory, manifest_name):
+    """Return {relative path: original data URI} from a store manifest"""
+    with open(os.path.join(directory, *manifest_name.split('/')), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    uris = {}
+    for relative_path, entry in manifest['blobs'].items():
+        with open(os.path.join(directory, *relative_path.split('/')), 'rb') as f:
+            payload = base64.b64encode(f.read()).decode('ascii')
+        uris[relative_path] = f"data:{entry['media_type']};base64,{payload}"
+    return uris
+
+
+def restore_text(statement, uris):
+    """Put data URIs back into the string literals or COPY fields of one statement"""
+    if isinstance(statement, CopyData):
+        lines = statement.split('\n')
+        for index, line in enumerate(lines):
+            if '/' in line:
+                fields = line.split('\t')
+                lines[index] = '\t'.join(
+                    uris[field].translate(COPY_ESCAPES) if field in uris else field for field in fields
+                )
+        return CopyData('\n'.join(lines))
+    
+    pieces = []
+    last = 0
+    for token in TokenStream(statement):
+        if token.lastgroup == 'string' and string_value(token.group()) in uris:
+            pieces.append(statement[last:token.start()])
+            pieces.append(f"'{uris[string_value(token.group())]}'")
+            last = token.end()
+    if not pieces:
+        return statement
+    pieces.append(statement[last:])
+    return ''.join(pieces)
+
+
+def restore_file(sql_path, directory, manifest_name):
+    """Rewrite sql_path with the stored blobs inlined again as data URIs"""
+    uris = load_restore_map(directory, manifest_name)
+    temp_path = sql_path + '.tmp'
+    with open_file(sql_path) as source, open_file(temp_path, 'w', compression_suffix(sql_path)) as output:
+        for statement in iter_statements(source):
+            output.write(restore_text(statement, uris))
+    os.replace(temp_path, sql_path)
+    return len(uris)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline the blobs extracted by --extract-data-uris again")
+    parser.add_argument('sql_file', help="converted SQL file to restore, e.g. users_postgres.sql")
+    parser.add_argument('manifest', nargs='?',
+                        help="store manifest relative to the SQL file's directory "
+                             "(default: blobs/<table>.json from the SQL file name)")
+    args = parser.parse_args()
+    
+    directory = os.path.dirname(os.path.abspath(args.sql_file))
+    manifest_name = args.manifest
+    if manifest_name is None:
+        stem = strip_compression(os.path.basename(args.sql_file)).replace('_postgres.sql', '')
+        manifest_name = f"{DEFAULT_BLOB_DIR}/{stem}.json"
+    count = restore_file(args.sql_file, directory, manifest_name)
+    print(f"Restored {count} blobs into {args.sql_file}")
+
+
+if __name__ == "__main__":
+    main()
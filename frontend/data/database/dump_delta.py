@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Delta between two versions of a MySQL dump, as PostgreSQL upserts and deletes
+Compares the rows of a new dump with the previous dump or its conversion by primary key, in on-disk hash partitions, and writes only INSERT ... ON CONFLICT DO UPDATE for new or changed rows and DELETE for removed ones
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from check_parity import BUCKET_ROWS, MAX_BUCKETS, _read_bucket, _sort_key, partition, summarize
+from compressed_io import compression_suffix, open_file, strip_compression
+from sql_lexer import quote_identifier
+from sql_schema import quote_table
+
+DEFAULT_ROWS_PER_STATEMENT = 500
+
+DELTA_SUFFIX = '_delta.sql'
+
+
+def sql_literal(value):
+    """A value as PostgreSQL SQL: NULL, or a string literal the server casts to the column's type"""
+    if value is None:
+        return 'NULL'
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _row_sql(row, names):
+    return '(' + ', '.join(sql_literal(row.get(name)) for name in names) + ')'
+
+
+def upsert_sql(table, names, rows, primary_key):
+    """One INSERT ... ON CONFLICT statement for rows that all have the columns names"""
+    updates = [name for name in names if name not in primary_key]
+    if updates:
+        action = "DO UPDATE SET " + ', '.join(
+            f"{quote_identifier(name)} = EXCLUDED.{quote_identifier(name)}" for name in updates
+        )
+    else:
+        action = "DO NOTHING"
+    values = ',\n'.join(_row_sql(row, names) for row in rows)
+    return (f"INSERT INTO {quote_table(table)} ({', '.join(quote_identifier(name) for name in names)}) VALUES\n"
+            f"{values}\nON CONFLICT ({', '.join(quote_identifier(name) for name in primary_key)}) {action};\n")
+
+
+def delete_sql(table, keys, primary_key):
+    """One DELETE statement for the rows with the primary key values keys"""
+    if len(primary_key) == 1:
+        condition = f"{quote_identifier(primary_key[0])} IN ({', '.join(sql_literal(key[0]) for key in keys)})"
+    else:
+        columns = ', '.join(quote_identifier(name) for name in primary_key)
+        tuples = ', '.join('(' + ', '.join(sql_literal(value) for value in key) + ')' for key in keys)
+        condition = f"({columns}) IN ({tuples})"
+    return f"DELETE FROM {quote_table(table)} WHERE {condition};\n"
+
+
+def sequence_sql(table, column):
+    """A setval() moving the sequence of table.column past the largest value now in the table"""
+    table_literal = quote_table(table).replace("'", "''")
+    column_literal = column.replace("'", "''")
+    return (f"SELECT setval(pg_get_serial_sequence('{table_literal}', '{column_literal}'), "
+            f"COALESCE((SELECT MAX({quote_identifier(column)}) FROM {quote_table(table)}), 0) + 1, false);\n")
+
+
+def delta_bucket(old_path, new_path, table, primary_key, directory, name, rows_per_statement):
+    """Compare one partition of both dumps and write its SQL to two part files
+    
+    Only the keys and row digests of the old side are held in memory; the
+    new side is streamed past them. Returns (inserted, updated, deleted,
+    deletes path, upserts path); a path is None when it has no statements.
+    """
+    previous = {}
+    for key, digest, _ in _read_bucket(old_path):
+        previous[tuple(key)] = digest
+    
+    upserts_path = os.path.join(directory, f"{name}-upserts.sql")
+    deletes_path = os.path.join(directory, f"{name}-deletes.sql")
+    inserted = updated = 0
+    with open(upserts_path, 'w', encoding='utf-8') as upserts:
+        pending = []
+        names = None
+        for key, digest, row in _read_bucket(new_path):
+            old_digest = previous.pop(tuple(key), None)
+            if old_digest == digest:
+                continue
+            if old_digest is None:
+                inserted += 1
+            else:
+                updated += 1
+            if pending and (list(row) != names or len(pending) >= rows_per_statement):
+                upserts.write(upsert_sql(table, names, pending, primary_key))
+                pending = []
+            names = list(row)
+            pending.append(row)
+        if pending:
+            upserts.write(upsert_sql(table, names, pending, primary_key))
+    
+    removed = sorted(previous, key=_sort_key)
+    with open(deletes_path, 'w', encoding='utf-8') as deletes:
+        for start in range(0, len(removed), rows_per_statement):
+            deletes.write(delete_sql(table, removed[start:start + rows_per_statement], primary_key))
+    return (inserted, updated, len(removed),
+            deletes_path if removed else None, upserts_path if inserted or updated else None)
+
+
+def plan_tables(old, new):
+    """Per-table results from the summaries of both dumps; tables that need a delta get status 'changed'"""
+    results = []
+    for table in sorted(set(old['tables']) | set(new['tables'])):
+        before = old['tables'].get(table)
+        after = new['tables'].get(table)
+        result = {
+            'table': table,
+            'old_rows': before['rows'] if before else 0,
+            'new_rows': after['rows'] if after else 0,
+            'primary_key': (after or before)['primary_key'],
+            'auto_increment': after['auto_increment'] if after else [],
+            'inserted': 0, 'updated': 0, 'deleted': 0,
+        }
+        if after is None:
+            # A dump of other tables, most likely; deleting every row is not a delta
+            result['status'] = 'not in new dump'
+        elif before is not None and before['hash'] == after['hash'] and before['rows'] == after['rows']:
+            result['status'] = 'unchanged'
+        elif not result['primary_key']:
+            result['status'] = 'no primary key'
+        elif before is not None and before['primary_key'] and before['primary_key'] != after['primary_key']:
+            result['status'] = 'primary key changed'
+        else:
+            result['status'] = 'changed'
+        results.append(result)
+    return results
+
+
+def dump_delta(old_path, new_path, output_path, jobs=1, work_dir=None, rows_per_statement=DEFAULT_ROWS_PER_STATEMENT):
+    """Write the SQL that turns the rows of old_path into those of new_path; returns (per-table results, notes)
+    
+    Both dumps are summarised first (row count and order-independent hash
+    per table, as check_parity does), so unchanged tables cost one read.
+    The rows of changed tables are then spread over partition files by
+    primary key on both sides, and the partitions compared in parallel;
+    one partition's keys are in memory at a time, however large the
+    tables. Tables whose rows cannot be matched by key (no primary key,
+    or a different one) are reported and left out. The output holds one
+    transaction: per table the deletes, then the upserts, then a sequence
+    reset when rows were added. It is not written when nothing changed.
+    
+    old_path may be the converted file, whose values are compared after
+    the converter's known changes are undone; one converted with
+    --extract-data-uris holds paths instead of the data: URIs, so compare
+    against the previous MySQL dump in that case.
+    """
+    directory = tempfile.mkdtemp(prefix='delta-', dir=work_dir)
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            old_scan = executor.submit(summarize, old_path)
+            new_scan = executor.submit(summarize, new_path)
+            old, new = old_scan.result(), new_scan.result()
+            results = plan_tables(old, new)
+            changed = {
+                result['table']: (
+                    result['primary_key'],
+                    min(MAX_BUCKETS, max(1, -(-max(result['old_rows'], result['new_rows']) // BUCKET_ROWS))),
+                )
+                for result in results if result['status'] == 'changed'
+            }
+            if not changed:
+                return results, old['notes'] + new['notes']
+            
+            old_scan = executor.submit(partition, old_path, changed, directory, 'old')
+            new_scan = executor.submit(partition, new_path, changed, directory, 'new')
+            old_files, new_files = old_scan.result(), new_scan.result()
+            
+            parts = {}
+            for number, (table, (primary_key, buckets)) in enumerate(changed.items()):
+                parts[table] = [
+                    executor.submit(delta_bucket, old_files.get((table, bucket)), new_files.get((table, bucket)),
+                                    table, primary_key, directory, f"{number}-{bucket}", rows_per_statement)
+                    for bucket in range(buckets)
+                ]
+            
+            by_table = {result['table']: result for result in results}
+            for table, futures in parts.items():
+                parts[table] = [future.result() for future in futures]
+                result = by_table[table]
+                for inserted, updated, deleted, _, _ in parts[table]:
+                    result['inserted'] += inserted
+                    result['updated'] += updated
+                    result['deleted'] += deleted
+                if not (result['inserted'] or result['updated'] or result['deleted']):
+                    # Same rows by key; the hashes differed only through duplicated rows
+                    result['status'] = 'unchanged'
+        
+        if any(result['inserted'] or result['updated'] or result['deleted'] for result in results):
+            write_delta(output_path, old_path, new_path, results, parts)
+        return results, old['notes'] + new['notes']
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def write_delta(output_path, old_path, new_path, results, parts):
+    """Join the part files of every changed table into output_path"""
+    temp_path = output_path + '.tmp'
+    with open_file(temp_path, 'w', compression_suffix(output_path)) as output:
+        output.write(f"-- Delta of {os.path.basename(new_path)} against {os.path.basename(old_path)}\n")
+        output.write("-- Rows matched by primary key: deletes, then INSERT ... ON CONFLICT DO UPDATE\n\n")
+        output.write("BEGIN;\n")
+        for result in results:
+            table = result['table']
+            if not (result['inserted'] or result['updated'] or result['deleted']):
+                continue
+            output.write(f"\n-- Table: {table} ({result['inserted']:,} new, {result['updated']:,} changed, "
+                         f"{result['deleted']:,} removed)\n")
+            for _, _, _, deletes, _ in parts[table]:
+                _copy_part(deletes, output)
+            for _, _, _, _, upserts in parts[table]:
+                _copy_part(upserts, output)
+            if result['inserted']:
+                for column in result['auto_increment']:
+                    output.write(sequence_sql(table, column))
+        output.write("\nCOMMIT;\n")
+    os.replace(temp_path, output_path)
+
+
+def _copy_part(path, output):
+    if path is None:
+        return
+    with open(path, 'r', encoding='utf-8') as source:
+        shutil.copyfileobj(source, output)
+
+
+def delta_path(new_path, output_dir=None):
+    """Default output for a new dump: users.sql and users.sql.gz both give users_delta.sql"""
+    name = strip_compression(os.path.basename(new_path))
+    return os.path.join(output_dir or os.path.dirname(os.path.abspath(new_path)), name[:-4] + DELTA_SUFFIX)
+
+
+def print_results(results, notes):
+    print("\nDELTA SUMMARY")
+    print("=" * 50)
+    width = max([len('Table')] + [len(result['table']) for result in results])
+    print(f"{'Table':<{width}}  {'Old rows':>10}  {'New rows':>10}  {'New':>8}  {'Changed':>8}  {'Removed':>8}  Status")
+    for result in results:
+        marker = '✓' if result['status'] in ('changed', 'unchanged') else '!'
+        print(f"{result['table']:<{width}}  {result['old_rows']:>10,}  {result['new_rows']:>10,}  "
+              f"{result['inserted']:>8,}  {result['updated']:>8,}  {result['deleted']:>8,}  "
+              f"{marker} {result['status']}")
+    for result in results:
+        if result['status'] == 'no primary key':
+            print(f"  ! {result['table']}: rows cannot be matched without a primary key; reload the table")
+        elif result['status'] == 'primary key changed':
+            print(f"  ! {result['table']}: the primary key is not the same in both dumps; reload the table")
+        elif result['status'] == 'not in new dump':
+            print(f"  ! {result['table']}: only in the old dump; left alone")
+    for note in sorted(set(notes)):
+        print(f"  ! {note}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Write upserts and deletes that bring a loaded table from one dump version to the next")
+    parser.add_argument('old', help="the previous MySQL dump, or its *_postgres.sql conversion")
+    parser.add_argument('new', help="the new MySQL dump")
+    parser.add_argument('--output', '-o', default=None,
+                        help="SQL file to write; .gz, .xz and .bz2 names are compressed "
+                             f"(default: <name>{DELTA_SUFFIX} next to the new dump)")
+    parser.add_argument('--rows-per-statement', type=int, default=DEFAULT_ROWS_PER_STATEMENT,
+                        help="rows per INSERT and keys per DELETE statement (default: %(default)s)")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="worker processes; 0 uses every CPU")
+    parser.add_argument('--work-dir', default=None,
+                        help="where the partition files go (default: the system temp dir)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    output_path = args.output or delta_path(args.new)
+    
+    print("MySQL Dump Delta")
+    print("=" * 50)
+    for path in (args.old, args.new):
+        if not os.path.exists(path):
+            print(f"\n✗ {path} does not exist")
+            sys.exit(1)
+    print(f"Old: {args.old}")
+    print(f"New: {args.new}")
+    
+    start = time.perf_counter()
+    results, notes = dump_delta(args.old, args.new, output_path, jobs, args.work_dir, args.rows_per_statement)
+    elapsed = time.perf_counter() - start
+    print_results(results, notes)
+    
+    if any(result['inserted'] or result['updated'] or result['deleted'] for result in results):
+        print(f"\n✓ Delta written to {output_path} ({elapsed:.2f}s)")
+    else:
+        print(f"\nNo row changes; nothing written ({elapsed:.2f}s)")
+    if any(result['status'] in ('no primary key', 'primary key changed') for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
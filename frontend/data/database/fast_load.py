@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Fast-load profile for converted SQL: UNLOGGED tables, COPY FREEZE and session tuning
+For staging rebuilds that do not need crash safety while the data goes in
+"""
+
+import re
+
+from sql_lexer import split_leading_trivia
+from sql_schema import parse_create_table, qualified_name, quote_table
+
+DEFAULT_MAINTENANCE_WORK_MEM = '1GB'
+
+# Written at the top of the file: commits do not wait for the WAL flush
+SESSION_SQL = "-- Fast-load profile: no crash safety until the tables are SET LOGGED\nSET synchronous_commit = off;\n"
+
+TRANSACTION_START_PATTERN = re.compile(r'(?:START\s+TRANSACTION|BEGIN)\b', re.IGNORECASE)
+TRANSACTION_END_PATTERN = re.compile(r'(?:COMMIT|ROLLBACK)\b', re.IGNORECASE)
+CREATE_TABLE_PATTERN = re.compile(r'CREATE\s+TABLE\b', re.IGNORECASE)
+COPY_PATTERN = re.compile(
+    r'COPY\s+(?P<table>(?:"[^"]*(?:""[^"]*)*"|[\w$]+)(?:\.(?:"[^"]*(?:""[^"]*)*"|[\w$]+))?)'
+    r'(?P<columns>\s*\([^()]*\))?\s+FROM\s+stdin\s*;',
+    re.IGNORECASE,
+)
+# A \copy line from BinaryCopyWriter
+BINARY_COPY_PATTERN = re.compile(
+    r"^(?P<head>\\copy\s+(?P<table>\S+)[^\n]*?)WITH \(FORMAT binary\)$", re.IGNORECASE | re.MULTILINE
+)
+
+
+def post_data_sql(maintenance_work_mem=DEFAULT_MAINTENANCE_WORK_MEM):
+    """Session setting written after the post-data marker, for the index builds"""
+    return f"SET maintenance_work_mem = '{maintenance_work_mem}';\n"
+
+
+class FastLoadProfile:
+    """Rewrite the converted statements of one file for a fast, unlogged load
+    
+    Fed the converted statements in order. CREATE TABLE becomes CREATE
+    UNLOGGED TABLE and opens a transaction that holds the table's rows,
+    unless the dump already has one open (its START TRANSACTION counts),
+    so COPY can use FREEZE: the table was created in the same transaction.
+    When that transaction commits, its tables are switched back with
+    ALTER TABLE ... SET LOGGED. DROP statements that the fix scripts add
+    in front of CREATE TABLE end up inside the same transaction.
+    """
+    
+    def __init__(self):
+        self.in_dump_transaction = False
+        self.own_transaction = False
+        self.created = []       # tables created UNLOGGED in the open transaction
+    
+    def format(self, converted):
+        """Return the output text for one converted statement"""
+        trivia, body = split_leading_trivia(converted)
+        if not body:
+            # Leading comments only, such as a diverted INSERT's \copy line
+            return BINARY_COPY_PATTERN.sub(self._freeze_binary_copy, trivia)
+        
+        if TRANSACTION_START_PATTERN.match(body):
+            pieces = [self.finish()]
+            self.in_dump_transaction = True
+            pieces.append(converted)
+            return ''.join(pieces)
+        if TRANSACTION_END_PATTERN.match(body):
+            self.in_dump_transaction = False
+            return converted + self._set_logged()
+        
+        if CREATE_TABLE_PATTERN.match(body):
+            pieces = [trivia]
+            if not self.in_dump_transaction:
+                # One transaction per table: close the previous table's first
+                pieces.insert(0, self.finish())
+                pieces.append('BEGIN;\n')
+                self.own_transaction = True
+            definition = parse_create_table(converted)
+            if definition is not None:
+                self.created.append(definition[0])
+            pieces.append('CREATE UNLOGGED TABLE' + body[CREATE_TABLE_PATTERN.match(body).end():])
+            return ''.join(pieces)
+        
+        copy = COPY_PATTERN.match(body)
+        if copy is not None and qualified_name(copy.group('table')) in self.created:
+            return trivia + body[:copy.end() - 1].rstrip() + ' WITH (FREEZE);' + body[copy.end():]
+        return converted
+    
+    def _freeze_binary_copy(self, match):
+        if qualified_name(match.group('table')) not in self.created:
+            return match.group()
+        return match.group('head') + 'WITH (FORMAT binary, FREEZE)'
+    
+    def _set_logged(self):
+        statements = ''.join(
+            f"ALTER TABLE {quote_table(table)} SET LOGGED;\n"
+            for table in self.created
+        )
+        self.created = []
+        return '\n' + statements if statements else ''
+    
+    def finish(self):
+        """Close a transaction opened by the profile; returns the text to write"""
+        if not self.own_transaction:
+            return ''
+        self.own_transaction = False
+        return '\nCOMMIT;' + self._set_logged()
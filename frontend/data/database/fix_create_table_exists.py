@@ -5,42 +5,22 @@
 """
 
 import os
-import re
-import glob
+
+from compressed_io import glob_files
+from postprocess_pipeline import run_pipeline
 
 def fix_create_table_syntax(file_path):
     """修改單個文件的CREATE TABLE語法"""
     print(f"修改文件: {os.path.basename(file_path)}")
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    original_content = content
-    modifications = []
-    
-    # 方法1: 在CREATE TABLE前添加DROP TABLE IF EXISTS
-    # 找到CREATE TABLE語句
-    create_table_pattern = r'CREATE TABLE\s+((?:public\.)?[\w"]+)\s*\('
-    
-    def add_drop_table(match):
-        table_name = match.group(1)
-        modifications.append(f"  添加: DROP TABLE IF EXISTS {table_name}")
-        return f"-- 如果表格已存在則刪除\nDROP TABLE IF EXISTS {table_name} CASCADE;\n\n{match.group(0)}"
-    
-    # 只在沒有DROP TABLE的情況下添加
-    if 'DROP TABLE IF EXISTS' not in content:
-        content = re.sub(create_table_pattern, add_drop_table, content, flags=re.IGNORECASE)
-    
-    # 方法2: 修改CREATE TABLE為CREATE TABLE IF NOT EXISTS
-    # 但這個方法在PostgreSQL中可能有限制，所以我們使用DROP TABLE方法
+    # 在CREATE TABLE前添加DROP TABLE IF EXISTS
+    # 只在該表還沒有DROP TABLE的情況下添加（由流水線步驟逐條語句判斷）
+    step, = run_pipeline(file_path, ['table_drop'])
     
     # 檢查是否有修改
-    if content != original_content:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print(f"  ✓ 已修改 {len(modifications)} 個CREATE TABLE:")
-        for mod in modifications:
+    if step.changes:
+        print(f"  ✓ 已修改 {step.changes} 個CREATE TABLE:")
+        for mod in step.messages:
             print(mod)
         return True
     else:
@@ -56,7 +36,7 @@ def main():
     print("=" * 60)
     
     # 找到所有PostgreSQL文件
-    postgres_files = glob.glob(os.path.join(database_dir, "*_postgres.sql"))
+    postgres_files = glob_files(database_dir, "*_postgres.sql")
     
     if not postgres_files:
         print("未找到PostgreSQL文件")
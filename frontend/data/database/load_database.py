@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Parallel loader for the converted *_postgres.sql files
+Loads tables in foreign key order over a pool of psql sessions, then runs the post-data statements in parallel
+"""
+
+import argparse
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from compressed_io import glob_files, open_file
+from sql_lexer import CopyData, is_copy_from_stdin, is_insert_statement, iter_statements, split_leading_trivia
+from sql_schema import (
+    POST_DATA_MARKER, parse_alter_table, parse_create_table, parse_foreign_key, referenced_tables,
+)
+
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATTERN = '*_postgres.sql'
+
+# psql stops at the first error and reads nothing from ~/.psqlrc
+PSQL_OPTIONS = ['--no-psqlrc', '--quiet', '-v', 'ON_ERROR_STOP=1']
+
+SET_PATTERN = re.compile(r'SET\b', re.IGNORECASE)
+
+
+class LoadError(Exception):
+    """A psql session ended with an error"""
+
+
+def is_data_statement(statement):
+    return isinstance(statement, CopyData) or is_insert_statement(statement) or is_copy_from_stdin(statement)
+
+
+class DumpFile:
+    """What the loader needs to know about one converted file
+    
+    The statements before POST_DATA_MARKER (types, tables, rows) are loaded
+    in one psql session; the ones after it are kept apart so they can run
+    in parallel once every table is loaded, foreign keys last. SET lines
+    in the post-data section (maintenance_work_mem from --fast-load) are
+    session settings, repeated in front of each of those sessions. Files
+    without the marker are loaded whole.
+    """
+    
+    def __init__(self, path, read=True):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.tables = []            # tables created here
+        self.references = []        # tables named by REFERENCES before the post-data section
+        self.main_statements = 0    # statements before the post-data section
+        self.post_data = []         # (table, statement) other than foreign keys
+        self.foreign_keys = []      # (table, statement)
+        self.settings = []          # SET statements for every post-data session
+        self.depends_on = set()     # DumpFile names to load first
+        self.status = 'pending'
+        self.error = None
+        self.load_time = 0.0
+        self.post_data_time = 0.0
+        self._in_post_data = False
+        if read:
+            self._read()
+    
+    def _read(self):
+        with open_file(self.path) as source:
+            for statement in iter_statements(source):
+                self.observe(statement)
+    
+    def observe(self, statement):
+        """Take in the next statement of the file; returns True while it belongs to the main part
+        
+        DumpFile(path, read=False) fed with observe() describes SQL that
+        never was a file: mysql_to_postgres_bulk.py --target sends the main
+        part to psql as it is converted and keeps the post-data statements.
+        """
+        if not self._in_post_data:
+            if is_data_statement(statement):
+                self.main_statements += 1
+                return True
+            if POST_DATA_MARKER not in split_leading_trivia(statement)[0]:
+                self.main_statements += 1
+                definition = parse_create_table(statement)
+                if definition is not None and definition[0] not in self.tables:
+                    self.tables.append(definition[0])
+                for table in referenced_tables(statement):
+                    if table not in self.references:
+                        self.references.append(table)
+                return True
+            self._in_post_data = True
+        if statement.strip() and split_leading_trivia(statement)[1]:
+            self._add_post_data(statement)
+        return False
+    
+    def _add_post_data(self, statement):
+        if SET_PATTERN.match(split_leading_trivia(statement)[1]):
+            self.settings.append(statement)
+            return
+        altered = parse_alter_table(statement)
+        table = altered[0] if altered else None
+        if altered and any(clause[0].group().upper() == 'ADD' and parse_foreign_key(clause[1:])
+                           for clause in altered[1]):
+            self.foreign_keys.append((table, statement))
+        else:
+            self.post_data.append((table or (self.tables[0] if self.tables else self.name), statement))
+    
+    def iter_main_sql(self):
+        """Stream the statements before the post-data section"""
+        with open_file(self.path) as source:
+            for index, statement in enumerate(iter_statements(source)):
+                if index == self.main_statements:
+                    return
+                yield statement
+    
+    @property
+    def label(self):
+        return ', '.join(self.tables) if self.tables else self.name
+
+
+def find_dump_files(directory, pattern=DEFAULT_PATTERN):
+    return [DumpFile(path) for path in glob_files(directory, pattern)]
+
+
+def resolve_dependencies(files):
+    """Fill in depends_on from REFERENCES; returns warnings about unknown or repeated tables
+    
+    A file waits for the files that create the tables it references, and
+    for an earlier file that creates one of its own tables (the later one
+    usually drops and recreates it, so they must not run at the same time).
+    """
+    warnings = []
+    owners = {}             # table -> name of the first file creating it
+    for dump in files:
+        for table in dump.tables:
+            if table in owners:
+                dump.depends_on.add(owners[table])
+                warnings.append(f"{table} is created by both {owners[table]} and {dump.name}; loading them in turn")
+            else:
+                owners[table] = dump.name
+    for dump in files:
+        for table in dump.references:
+            owner = owners.get(table)
+            if owner is None:
+                warnings.append(f"{dump.name} references {table}, which no file creates")
+            elif owner != dump.name:
+                dump.depends_on.add(owner)
+    return warnings
+
+
+def load_order(files):
+    """Group file names into waves whose files depend only on earlier waves
+    
+    Only used to print the plan; the loader itself starts every file as
+    soon as its own dependencies are done. Files in a cycle form a last
+    wave and are loaded in name order.
+    """
+    done = set()
+    remaining = {dump.name: dump for dump in files}
+    waves = []
+    while remaining:
+        ready = sorted(name for name, dump in remaining.items() if dump.depends_on <= done)
+        if not ready:
+            waves.append(sorted(remaining))
+            break
+        waves.append(ready)
+        done.update(ready)
+        for name in ready:
+            del remaining[name]
+    return waves
+
+
+def run_psql(dsn, statements, cwd, psql='psql'):
+    """Feed SQL text to one psql session; returns its wall time in seconds
+    
+    statements may be any iterable of strings and is streamed to psql's
+    standard input, so COPY ... FROM stdin data never has to fit in
+    memory. cwd is where relative \\copy paths are resolved.
+    """
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(
+            [psql, *PSQL_OPTIONS, *(['-d', dsn] if dsn else []), '-f', '-'],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=errors, cwd=cwd,
+        )
+        try:
+            for statement in statements:
+                process.stdin.write(statement.encode('utf-8'))
+        except BrokenPipeError:
+            pass                # psql stopped at an error; its message is in errors
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = process.wait()
+        if returncode != 0:
+            errors.seek(0)
+            message = errors.read().decode('utf-8', 'replace').strip().splitlines()
+            raise LoadError(message[-1] if message else f"psql exited with status {returncode}")
+    return time.perf_counter() - start
+
+
+def load_files(files, dsn, jobs, psql='psql'):
+    """Load the main part of every file, each as soon as the files it depends on are done"""
+    by_name = {dump.name: dump for dump in files}
+    pending = dict(by_name)
+    finished = set()
+    running = {}
+    
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            ready = [
+                dump for dump in pending.values()
+                if all(name in finished or name not in by_name for name in dump.depends_on)
+            ]
+            if not ready and not running:
+                # A reference cycle: load the first file and let psql report what is missing
+                ready = [pending[min(pending)]]
+            for dump in ready:
+                del pending[dump.name]
+                failed = [name for name in dump.depends_on if by_name[name].status in ('error', 'skipped')]
+                if failed:
+                    dump.status = 'skipped'
+                    dump.error = f"depends on {', '.join(sorted(failed))}"
+                    finished.add(dump.name)
+                    print(f"  - {dump.name}: skipped ({dump.error})")
+                    continue
+                running[executor.submit(run_psql, dsn, dump.iter_main_sql(), os.path.dirname(dump.path), psql)] = dump
+            if not running:
+                continue
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                dump = running.pop(future)
+                finished.add(dump.name)
+                try:
+                    dump.load_time = future.result()
+                    dump.status = 'loaded'
+                    print(f"  ✓ {dump.name} ({dump.load_time:.2f}s)")
+                except (LoadError, OSError) as e:
+                    dump.status = 'error'
+                    dump.error = str(e)
+                    print(f"  ✗ {dump.name}: {e}")
+
+
+def run_post_data(files, dsn, jobs, psql='psql'):
+    """Run every post-data statement in its own session, foreign keys after the rest"""
+    loaded = [dump for dump in files if dump.status == 'loaded']
+    waves = (
+        [(dump, table, statement) for dump in loaded for table, statement in dump.post_data],
+        [(dump, table, statement) for dump in loaded for table, statement in dump.foreign_keys],
+    )
+    failures = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for wave in waves:
+            futures = {
+                executor.submit(run_psql, dsn, dump.settings + [statement], os.path.dirname(dump.path), psql):
+                    (dump, table, statement)
+                for dump, table, statement in wave
+            }
+            for future, (dump, table, statement) in futures.items():
+                try:
+                    dump.post_data_time += future.result()
+                except (LoadError, OSError) as e:
+                    failures += 1
+                    dump.status = 'post-data error'
+                    dump.error = str(e)
+                    print(f"  ✗ {table}: {split_leading_trivia(statement)[1].strip()[:80]}\n      {e}")
+    return failures
+
+
+def print_plan(files, waves):
+    print("\nLoad plan:")
+    for number, wave in enumerate(waves, 1):
+        print(f"  Wave {number}: {', '.join(wave)}")
+    for dump in files:
+        if dump.depends_on:
+            print(f"  {dump.name} after {', '.join(sorted(dump.depends_on))}")
+    post_data = sum(len(dump.post_data) for dump in files)
+    foreign_keys = sum(len(dump.foreign_keys) for dump in files)
+    print(f"  Post-data: {post_data} statements, then {foreign_keys} foreign keys")
+
+
+def print_timings(files, total_time):
+    print("\nLOAD SUMMARY")
+    print("=" * 50)
+    width = max((len(dump.label) for dump in files), default=10)
+    print(f"{'Table':<{width}}  {'Load':>8}  {'Post-data':>9}  Status")
+    for dump in sorted(files, key=lambda dump: dump.load_time + dump.post_data_time, reverse=True):
+        print(f"{dump.label:<{width}}  {dump.load_time:>7.2f}s  {dump.post_data_time:>8.2f}s  {dump.status}")
+    failed = [dump for dump in files if dump.status != 'loaded']
+    print(f"\nLoaded {len(files) - len(failed)} of {len(files)} files in {total_time:.2f}s")
+    for dump in failed:
+        print(f"  ✗ {dump.name}: {dump.error}")
+
+
+def print_comparison(baseline, files):
+    """Per-table load time of files next to the same tables loaded from baseline"""
+    before = {dump.label: dump.load_time + dump.post_data_time for dump in baseline if dump.status == 'loaded'}
+    rows = [
+        (dump.label, before[dump.label], dump.load_time + dump.post_data_time)
+        for dump in files if dump.status == 'loaded' and dump.label in before
+    ]
+    print("\nLOAD TIME COMPARISON")
+    print("=" * 50)
+    width = max([len('Total')] + [len(row[0]) for row in rows])
+    print(f"{'Table':<{width}}  {'Before':>8}  {'After':>8}  {'Change':>7}")
+    for label, old, new in sorted(rows, key=lambda row: row[1], reverse=True):
+        change = f"{(new / old - 1) * 100:+.0f}%" if old else '-'
+        print(f"{label:<{width}}  {old:>7.2f}s  {new:>7.2f}s  {change:>7}")
+    total_before = sum(row[1] for row in rows)
+    total_after = sum(row[2] for row in rows)
+    change = f"{(total_after / total_before - 1) * 100:+.0f}%" if total_before else '-'
+    print(f"{'Total':<{width}}  {total_before:>7.2f}s  {total_after:>7.2f}s  {change:>7}")
+
+
+class TemporaryCluster:
+    """A throwaway PostgreSQL cluster made with initdb and pg_ctl
+    
+    Listens only on a Unix socket in its own data directory; stopped and
+    deleted on exit. dsn is usable once the with block is entered.
+    """
+    
+    def __init__(self, bin_dir=None, port=None):
+        self.bin_dir = bin_dir
+        self.port = port or _free_port()
+        self.directory = None
+        self.dsn = None
+    
+    def _command(self, name):
+        return os.path.join(self.bin_dir, name) if self.bin_dir else name
+    
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp(prefix='pgload-')
+        data_dir = os.path.join(self.directory, 'data')
+        try:
+            subprocess.run([self._command('initdb'), '-D', data_dir, '-U', 'postgres', '--auth=trust',
+                            '-E', 'UTF8', '--no-locale'], check=True, stdout=subprocess.DEVNULL)
+            subprocess.run([self._command('pg_ctl'), '-D', data_dir, '-w', '-l', os.path.join(self.directory, 'log'),
+                            '-o', f"-p {self.port} -k {self.directory} -c listen_addresses=''", 'start'],
+                           check=True, stdout=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError):
+            shutil.rmtree(self.directory, ignore_errors=True)
+            raise
+        self.dsn = f"host={self.directory} port={self.port} user=postgres dbname=postgres"
+        return self
+    
+    def __exit__(self, *exc_info):
+        subprocess.run([self._command('pg_ctl'), '-D', os.path.join(self.directory, 'data'), '-m', 'fast', 'stop'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def load_database(files, dsn, jobs, psql='psql'):
+    """Load files into dsn; returns True when everything, post-data included, succeeded"""
+    start = time.perf_counter()
+    print(f"\nLoading {len(files)} files with {jobs} sessions...")
+    load_files(files, dsn, jobs, psql)
+    print("\nRunning post-data statements...")
+    failures = run_post_data(files, dsn, jobs, psql)
+    print_timings(files, time.perf_counter() - start)
+    return failures == 0 and all(dump.status == 'loaded' for dump in files)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load converted PostgreSQL dumps in dependency order, in parallel")
+    parser.add_argument('directory', nargs='?', default=DATABASE_DIR,
+                        help="directory holding the converted files (default: this script's directory)")
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help="glob for the files to load; .gz, .xz and .bz2 versions of matching names "
+                             "are read directly (default: %(default)s)")
+    parser.add_argument('--dsn', default='',
+                        help="libpq connection string; empty uses the PG* environment variables")
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help="concurrent psql sessions; 0 uses every CPU")
+    parser.add_argument('--psql', default='psql', help="psql executable (default: %(default)s)")
+    parser.add_argument('--temp-cluster', action='store_true',
+                        help="load into a throwaway cluster made with initdb/pg_ctl, removed afterwards")
+    parser.add_argument('--pg-bin', default=None,
+                        help="directory holding initdb, pg_ctl and psql for --temp-cluster")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="print the load plan without connecting")
+    parser.add_argument('--compare', metavar='BASELINE_DIR', default=None,
+                        help="first load the same tables from BASELINE_DIR (for example a conversion "
+                             "without --fast-load) into its own temporary cluster and print the "
+                             "load time of each table before and after; needs --temp-cluster")
+    args = parser.parse_args()
+    if args.compare and not args.temp_cluster:
+        parser.error("--compare loads each directory into a fresh cluster; add --temp-cluster")
+    return args
+
+
+def main():
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    psql = os.path.join(args.pg_bin, 'psql') if args.pg_bin and args.psql == 'psql' else args.psql
+    
+    print("PostgreSQL Parallel Loader")
+    print("=" * 50)
+    files = find_dump_files(args.directory, args.pattern)
+    if not files:
+        print(f"\nNo files match {args.pattern} in {args.directory}")
+        sys.exit(1)
+    for warning in resolve_dependencies(files):
+        print(f"  ! {warning}")
+    print_plan(files, load_order(files))
+    if args.dry_run:
+        return
+    
+    baseline = None
+    if args.compare:
+        baseline = find_dump_files(args.compare, args.pattern)
+        resolve_dependencies(baseline)
+        with TemporaryCluster(args.pg_bin) as cluster:
+            print(f"\nBaseline {args.compare} in temporary cluster: {cluster.dsn}")
+            load_database(baseline, cluster.dsn, jobs, psql)
+    
+    if args.temp_cluster:
+        with TemporaryCluster(args.pg_bin) as cluster:
+            print(f"\nTemporary cluster: {cluster.dsn}")
+            succeeded = load_database(files, cluster.dsn, jobs, psql)
+    else:
+        succeeded = load_database(files, args.dsn, jobs, psql)
+    if baseline is not None:
+        print_comparison(baseline, files)
+    if not succeeded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
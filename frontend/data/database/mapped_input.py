@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped, bytes-level input for the conversion and post-processing scripts
+Maps a dump read-only, splits it into statements without decoding, and decodes only the spans a caller needs as text; compressed dumps are streamed through their codec instead
+"""
+
+import mmap
+import os
+import re
+
+from compressed_io import compression_suffix, open_file
+from sql_lexer import DEFAULT_CHUNK_SIZE, CopyData, is_insert_span, iter_statement_spans, iter_statements
+from sql_schema import ValuePlans
+
+# An empty file cannot be mapped; it reads as this instead
+EMPTY = b''
+QUOTE = ord("'")
+
+# String literals at least this long (in bytes) are kept in the map as spans.
+# Values a rewrite changes (zero-dates, '0'/'1' booleans) are far shorter
+# than the minimum, so a spanned literal is always one that passes through.
+DEFAULT_SPAN_THRESHOLD = 64 * 1024
+MIN_SPAN_THRESHOLD = 1024
+
+# Everything of a statement up to its next string literal, in runs of tokens
+# as sql_lexer's TOKEN_PATTERN sees them (quoted identifiers, comments and
+# dollar quotes are skipped whole); a quote it stops at opens a literal
+GAP_PATTERN = re.compile(rb"""(?:
+    --[^\n]*|\#[^\n]*|/\*.*?\*/
+  | "[^"\\]*(?:(?:\\.|"")[^"\\]*)*"
+  | `[^`]*(?:``[^`]*)*`
+  | \$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$
+  | [^'"`\-\#/$]+
+  | [^']
+){0,4096}""", re.DOTALL | re.VERBOSE)
+STRING_PATTERN = re.compile(rb"'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'")
+
+# Stands in for a spanned literal in decoded text: a short string literal to
+# every stage of the converter. NUL never occurs in a dump's text (LiteralSpans
+# checks), so it cannot be mistaken for input.
+PLACEHOLDER = "'\x00span:{}\x00'"
+PLACEHOLDER_PATTERN = re.compile("'\x00span:(\\d+)\x00'")
+
+
+class MappedFile:
+    """A dump mapped read-only into memory, used as a context manager
+    
+    buffer is the mmap itself (bytes patterns, find() and rfind() work on
+    it directly) and view a memoryview over it, so span() slices without
+    copying. The operating system pages the file in and out as it is
+    scanned: a multi-GB dump costs address space, not heap, and is never
+    decoded as a whole. Spans should be released before the file is closed.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else EMPTY
+        except Exception:
+            self._file.close()
+            raise
+        self.view = memoryview(self.buffer)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        if self._file is None:
+            return
+        self.view.release()
+        if self.buffer is not EMPTY:
+            try:
+                self.buffer.close()
+            except BufferError:
+                # A span is still referenced (an exception is on its way
+                # out); the map goes when the last span is collected
+                pass
+        self._file.close()
+        self._file = None
+    
+    def span(self, start, end):
+        """memoryview of buffer[start:end]; no bytes are copied"""
+        return self.view[start:end]
+    
+    def text(self, start=0, end=None):
+        """buffer[start:end] decoded as UTF-8, with \\r\\n and \\r line ends read as \\n as open() does"""
+        text = str(self.view[start:end], 'utf-8')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+    
+    def iter_spans(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield (start, end, is_data) for every statement and COPY data piece"""
+        return iter_statement_spans(self.buffer, chunk_size)
+    
+    def iter_statements(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield decoded statements and CopyData pieces, as sql_lexer.iter_statements does
+        
+        A drop-in replacement for iter_statements(open(path)) that skips
+        the stream's read buffers: each piece is decoded straight from the
+        map, and nothing else of the file is held as text.
+        """
+        for start, end, is_data in self.iter_spans(chunk_size):
+            text = self.text(start, end)
+            yield CopyData(text) if is_data else text
+
+
+class DecompressedFile:
+    """A compressed dump read through its codec, with the interface of MappedFile
+    
+    A compressed file cannot be mapped, and unpacking it to disk first
+    would double the I/O. It is decompressed and split by iter_statements
+    as it is read instead: while iter_spans() runs, buffer holds the
+    current statement or COPY data piece encoded as UTF-8 and the spans
+    point into it, so each span is only good until the next one is yielded.
+    Line ends are translated as the text is read.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = open_file(path, 'r')
+        self._text = ''
+        self.buffer = EMPTY
+        self.view = memoryview(EMPTY)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        self._file.close()
+    
+    def span(self, start, end):
+        """memoryview of buffer[start:end], the current piece"""
+        return self.view[start:end]
+    
+    def text(self, start=0, end=None):
+        """buffer[start:end] decoded as UTF-8; the whole piece is returned as it was read"""
+        if start == 0 and end in (None, len(self.buffer)):
+            return self._text
+        return str(self.view[start:end], 'utf-8')
+    
+    def iter_spans(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield (0, end, is_data) for every statement and COPY data piece, each in buffer in turn"""
+        for piece in iter_statements(self._file, chunk_size):
+            self._text = piece
+            self.buffer = piece.encode('utf-8')
+            self.view = memoryview(self.buffer)
+            yield 0, len(self.buffer), isinstance(piece, CopyData)
+    
+    def iter_statements(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield decoded statements and CopyData pieces, as sql_lexer.iter_statements does"""
+        return iter_statements(self._file, chunk_size)
+
+
+def open_input(path):
+    """MappedFile for a plain dump, DecompressedFile for a .gz, .xz or .bz2 one"""
+    return DecompressedFile(path) if compression_suffix(path) else MappedFile(path)
+
+
+def count_lines(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Number of line breaks in a bytes-like object
+    
+    memoryview has no count(); slices are copied chunk_size bytes at a time.
+    """
+    if isinstance(data, bytes):
+        return data.count(b'\n')
+    return sum(bytes(data[offset:offset + chunk_size]).count(b'\n') for offset in range(0, len(data), chunk_size))
+
+
+def iter_mapped_statements(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Decoded statements of the file at path, read through open_input()"""
+    with open_input(path) as mapped:
+        yield from mapped.iter_statements(chunk_size)
+
+
+def string_end(buffer, start, end):
+    """End of the string literal whose opening quote is at buffer[start], or -1 if it is unterminated
+    
+    A literal without escapes (a base64 image, say) ends at the next quote,
+    found by find() without the regex engine walking its bytes; ones with
+    backslashes or doubled quotes are matched by STRING_PATTERN.
+    """
+    close = buffer.find(b"'", start + 1, end)
+    if close < 0:
+        return -1
+    if buffer.find(b'\\', start + 1, close) >= 0 or (close + 1 < end and buffer[close + 1] == QUOTE):
+        match = STRING_PATTERN.match(buffer, start, end)
+        return match.end() if match else -1
+    return close + 1
+
+
+class LiteralSpans:
+    """Oversized string literals of a MappedFile kept as (offset, length) spans
+    
+    statements() decodes the dump like MappedFile.iter_statements, except
+    that in INSERT statements every string literal of threshold bytes or
+    more is replaced by a PLACEHOLDER naming its span. The literal itself is
+    never decoded, matched by a rewrite, sliced or joined: writer() copies
+    it from the map into the output file. Only for callers that pass string
+    values through unchanged; INSERTs into tables with JSON columns, whose
+    values get checked, are decoded in full.
+    """
+    
+    def __init__(self, mapped, threshold=DEFAULT_SPAN_THRESHOLD):
+        if threshold < MIN_SPAN_THRESHOLD:
+            raise ValueError(f"span threshold must be at least {MIN_SPAN_THRESHOLD} bytes")
+        self.mapped = mapped
+        self.threshold = threshold
+        self.spans = []           # (offset, length) per placeholder number
+        self.plans = ValuePlans()
+        # Spans need the whole file addressable, and a NUL in the input could
+        # pass for a placeholder: leave compressed files and such files alone
+        self.enabled = isinstance(mapped, MappedFile) and mapped.buffer.find(b'\x00') < 0
+    
+    def statements(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield decoded statements and CopyData pieces, oversized INSERT literals as placeholders"""
+        mapped = self.mapped
+        for start, end, is_data in mapped.iter_spans(chunk_size):
+            if is_data:
+                yield CopyData(mapped.text(start, end))
+            elif not is_insert_span(mapped.buffer, start, end):
+                statement = mapped.text(start, end)
+                self.plans.observe(statement)
+                yield statement
+            elif not self.enabled or end - start < self.threshold:
+                yield mapped.text(start, end)
+            else:
+                yield self._skeleton(start, end)
+    
+    def _skeleton(self, start, end):
+        mapped = self.mapped
+        buffer = mapped.buffer
+        first_span = len(self.spans)
+        pieces = []
+        last = position = start
+        while True:
+            position = GAP_PATTERN.match(buffer, position, end).end()
+            if position >= end:
+                break
+            if buffer[position] != QUOTE:
+                continue
+            close = string_end(buffer, position, end)
+            if close < 0:
+                # Unterminated: the quote is a token of its own
+                position += 1
+                continue
+            if close - position >= self.threshold:
+                pieces.append(mapped.text(last, position))
+                pieces.append(PLACEHOLDER.format(len(self.spans)))
+                self.spans.append((position, close - position))
+                last = close
+            position = close
+        if not pieces:
+            return mapped.text(start, end)
+        pieces.append(mapped.text(last, end))
+        skeleton = ''.join(pieces)
+        
+        plan = self.plans.plan(skeleton)
+        if plan and any(entry is not None and entry[0] == 'json' for entry in plan):
+            del self.spans[first_span:]
+            return mapped.text(start, end)
+        return skeleton
+    
+    def writer(self, stream):
+        """Wrap a text file opened for writing so placeholders are written as their spans"""
+        return SpanWriter(stream, self)
+
+
+class SpanWriter:
+    """Text stream wrapper that writes placeholders as the bytes of their spans
+    
+    The text around them goes through the text layer; each span is copied
+    from the map to the binary buffer below it, after a flush so the two
+    stay in order. Spans are copied byte for byte as they are in the dump.
+    """
+    
+    def __init__(self, stream, literals):
+        self.stream = stream
+        self.literals = literals
+    
+    def write(self, text):
+        if '\x00' not in text:
+            return self.stream.write(text)
+        last = 0
+        view = self.literals.mapped.view
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            self.stream.write(text[last:match.start()])
+            offset, length = self.literals.spans[int(match.group(1))]
+            self.stream.flush()
+            self.stream.buffer.write(view[offset:offset + length])
+            last = match.end()
+        self.stream.write(text[last:])
+        return len(text)
+    
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
@@ -4,219 +4,963 @@ MySQL to PostgreSQL bulk conversion script for laptopGuru project
 Converts all MySQL .sql files to PostgreSQL format
 """
 
+import argparse
+import hashlib
+import io
 import os
 import re
 import json
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from datetime import datetime
 
+from sql_lexer import (
+    DEFAULT_CHUNK_SIZE, TextPieces, TokenStream, is_insert_statement, iter_statements, quote_identifier,
+    split_insert_rows, split_leading_trivia, unquote_identifier,
+)
+from sql_rows import insert_to_copy, is_zero_date, rechunk_copy, rechunk_insert, string_value
+from mapped_input import DEFAULT_SPAN_THRESHOLD, MIN_SPAN_THRESHOLD, LiteralSpans, MappedFile, open_input
+from compressed_io import COMPRESSIONS, compression_suffix, open_file, strip_compression, with_compression
+from pgcopy_binary import BinaryCopyWriter
+from data_uri_store import DEFAULT_BLOB_DIR, DataURIStore, parse_column_spec
+from conversion_metrics import PROFILERS, FileProfiler, StageMetrics, TimedStatements, TimedWriter, new_counts
+from fast_load import DEFAULT_MAINTENANCE_WORK_MEM, FastLoadProfile
+from fast_load import SESSION_SQL as FAST_LOAD_SESSION_SQL, post_data_sql as fast_load_post_data_sql
+from sql_schema import (
+    POST_DATA_MARKER, PostDataSplitter, SequenceTracker, ValuePlans, alter_table_sql, column_maxima, create_table_sql,
+)
+from load_database import DumpFile, TemporaryCluster, run_post_data, run_psql
+from postprocess_pipeline import process_statements
+
+# Default database directory path
+DEFAULT_DATABASE_DIR = r"c:\Users\ken15.小恩\OneDrive\桌面\GURUlaptop\新增ckeditor版本(編輯中 render 用)\MFEE57-laptopGuru-ckeditor\frontend\data\database"
+
+# Bump whenever a change to the conversion rules changes the output, so the
+# manifest invalidates every file converted by an older version
+CONVERTER_VERSION = '2.3'
+
+# Converted string literals keep MySQL's backslash escapes, which is how
+# every tool here reads them back; PostgreSQL reads them the same way
+# with standard_conforming_strings off
+SESSION_SQL = "SET standard_conforming_strings = off;\nSET escape_string_warning = off;\n"
+
+# Incremental build manifest kept next to the converted files
+MANIFEST_FILENAME = '.conversion_manifest.json'
+
+# Conversion stages applied by rewrite_tokens, in the order they used to run
+CONVERSION_STAGES = ('types', 'syntax', 'timestamps', 'inserts')
+
+# MySQL data types to PostgreSQL equivalents, looked up by upper-cased keyword
+TYPE_CONVERSIONS = {
+    'TINYINT': 'SMALLINT',
+    'INT': 'INTEGER',
+    'BIGINT': 'BIGINT',
+    'VARCHAR': 'VARCHAR',
+    'TEXT': 'TEXT',
+    'LONGTEXT': 'TEXT',
+    'MEDIUMTEXT': 'TEXT',
+    'TIMESTAMP': 'TIMESTAMP',
+    'DATETIME': 'TIMESTAMP',
+    'DATE': 'DATE',
+    'TIME': 'TIME',
+    'FLOAT': 'REAL',
+    'DOUBLE': 'DOUBLE PRECISION',
+    'DECIMAL': 'DECIMAL',
+    'BOOLEAN': 'BOOLEAN',
+    'JSON': 'JSONB',
+}
+
+# MySQL-only table options removed together with their "= value"
+TABLE_OPTIONS = frozenset(('AUTO_INCREMENT', 'ENGINE', 'CHARSET', 'COLLATE', 'DEFAULT', 'COMMENT'))
+
+# MySQL session and database statements with no PostgreSQL counterpart;
+# they are dropped and only their leading comments are kept
+MYSQL_ONLY_PATTERN = re.compile(
+    r'(?:SET\s+(?:SQL_MODE|TIME_ZONE|NAMES|CHARACTER\s+SET|FOREIGN_KEY_CHECKS|UNIQUE_CHECKS|AUTOCOMMIT|@)'
+    r'|CREATE\s+(?:DATABASE|SCHEMA)\b|USE\s)',
+    re.IGNORECASE,
+)
+
+IDENTIFIER_KINDS = frozenset(('word', 'backtick', 'quoted'))
+
+ZERO_DATES = frozenset(("'0000-00-00 00:00:00'", "'0000-00-00'"))
+
+# Row values of TINYINT(1) / BOOLEAN columns
+BOOLEAN_VALUES = {'0': 'false', '1': 'true', "'0'": 'false', "'1'": 'true'}
+
+# Target size of the INSERT row batches handed to worker processes
+DEFAULT_BATCH_SIZE = 256 * 1024
+
+# How row data is written: multi-row INSERT statements or COPY FROM stdin blocks
+OUTPUT_FORMATS = ('insert', 'copy')
+
+# Statements that open or close a transaction in the dump itself
+TRANSACTION_START_PATTERN = re.compile(r'(?:START\s+TRANSACTION|BEGIN)\b', re.IGNORECASE)
+TRANSACTION_END_PATTERN = re.compile(r'(?:COMMIT|ROLLBACK)\b', re.IGNORECASE)
+DATA_STATEMENT_PATTERN = re.compile(r'(?:INSERT|COPY)\b', re.IGNORECASE)
+
+
+class StatementBatcher:
+    """Re-chunk converted data statements and group them into transactions
+    
+    Fed the converted statements of one file in order. INSERTs and COPY
+    FROM stdin blocks are split at row boundaries by rows_per_statement /
+    max_statement_bytes, each COPY block repeating its COPY line; with
+    statements_per_transaction every N data statements (INSERT or COPY)
+    are committed together. Inside the dump's own START TRANSACTION a
+    COMMIT/START TRANSACTION checkpoint is written instead, elsewhere the
+    group gets its own BEGIN/COMMIT and is closed before any other
+    statement, so DDL never runs inside it.
+    """
+    
+    def __init__(self, rows_per_statement=None, max_statement_bytes=None, statements_per_transaction=None):
+        self.rows_per_statement = rows_per_statement
+        self.max_statement_bytes = max_statement_bytes
+        self.statements_per_transaction = statements_per_transaction
+        self.in_dump_transaction = False
+        self.own_transaction = False
+        self.count = 0      # data statements since the last commit
+    
+    def format(self, converted):
+        """Return the output text for one converted statement"""
+        body = split_leading_trivia(converted)[1]
+        if not DATA_STATEMENT_PATTERN.match(body):
+            pieces = [self.finish()]
+            if TRANSACTION_START_PATTERN.match(body):
+                self.in_dump_transaction = True
+            elif TRANSACTION_END_PATTERN.match(body):
+                self.in_dump_transaction = False
+            self.count = 0
+            pieces.append(converted)
+            return ''.join(pieces)
+        
+        if not (self.rows_per_statement or self.max_statement_bytes):
+            statements = [converted]
+        elif body[:6].upper() == 'INSERT':
+            statements = rechunk_insert(converted, self.rows_per_statement, self.max_statement_bytes)
+        elif body[:4].upper() == 'COPY':
+            statements = rechunk_copy(converted, self.rows_per_statement, self.max_statement_bytes)
+        else:
+            statements = [converted]
+        if not self.statements_per_transaction:
+            return ''.join(statements)
+        
+        pieces = []
+        for statement in statements:
+            if not self.in_dump_transaction and not self.own_transaction:
+                pieces.append('\nBEGIN;')
+                self.own_transaction = True
+            pieces.append(statement)
+            self.count += 1
+            if self.count >= self.statements_per_transaction:
+                if self.own_transaction:
+                    pieces.append(self.finish())
+                else:
+                    pieces.append('\nCOMMIT;\nSTART TRANSACTION;')
+                self.count = 0
+        return ''.join(pieces)
+    
+    def finish(self):
+        """Close a transaction opened by the batcher; returns the text to write"""
+        if not self.own_transaction:
+            return ''
+        self.own_transaction = False
+        self.count = 0
+        return '\nCOMMIT;'
+
 class MySQLToPostgreSQLConverter:
-    def __init__(self, directory_path):
+    def __init__(self, directory_path, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, jobs=1,
+                 batch_size=DEFAULT_BATCH_SIZE, deterministic=False, force=False, output_format='insert',
+                 binary_tables=(), data_uri_columns=None, blob_dir=DEFAULT_BLOB_DIR,
+                 rows_per_statement=None, max_statement_bytes=None, statements_per_transaction=None,
+                 fast_load=False, maintenance_work_mem=DEFAULT_MAINTENANCE_WORK_MEM, profile=None,
+                 profile_dir=None, span_threshold=DEFAULT_SPAN_THRESHOLD, compress=None, target=None,
+                 psql='psql'):
+        if fast_load and statements_per_transaction:
+            raise ValueError("fast_load keeps each table in one transaction; it cannot be combined "
+                             "with statements_per_transaction")
+        if target is not None and (binary_tables or compress):
+            raise ValueError("a target database gets every row over its connection; binary_tables "
+                             "and compress write files")
         self.directory_path = directory_path
+        self.streaming = streaming
+        self.chunk_size = chunk_size
+        self.jobs = jobs
+        self.batch_size = batch_size
+        self.deterministic = deterministic
+        self.force = force
+        self.output_format = output_format
+        self.binary_tables = sorted(set(binary_tables))   # tables written as PGCOPY files
+        self.data_uri_columns = data_uri_columns or {}     # table -> columns whose data: URIs become files
+        self.blob_dir = blob_dir
+        self.rows_per_statement = rows_per_statement
+        self.max_statement_bytes = max_statement_bytes
+        self.statements_per_transaction = statements_per_transaction
+        self.fast_load = fast_load
+        self.maintenance_work_mem = maintenance_work_mem
+        self.profile = profile          # 'cprofile' or 'tracemalloc' output per file, or None
+        self.profile_dir = profile_dir or os.path.join(directory_path, 'profiles')
+        self.span_threshold = span_threshold    # string literals this long stay in the input map; 0 disables
+        self.compress = compress        # 'gz', 'xz' or 'bz2' to write compressed output, or None
+        self.target = target            # libpq connection string to load into instead of writing files, or None
+        self.psql = psql                # psql executable for target
         self.mysql_files = []
         self.conversion_log = []
-        
+        self.manifest = {}
+        self._pending_manifest = {}   # source fingerprints of the files about to be converted
+        self._executor = None     # process pool for INSERT row batches, set by convert_parallel
+        self._metrics = None      # StageMetrics of the file being converted, set by convert_file
+        self._loaded = []         # DumpFile per file sent to target, holding its post-data statements
+    
+    def __getstate__(self):
+        # Worker processes get a copy of the converter without the pool
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        state['_metrics'] = None
+        state['_loaded'] = []
+        return state
+    
     def find_mysql_files(self):
         """Find all MySQL files that need conversion"""
         print("Scanning for MySQL files...")
-        for filename in os.listdir(self.directory_path):
-            if filename.endswith('.sql') and not filename.endswith('_postgres.sql') and filename != 'export_202505240140.sql':
+        self.manifest = self.load_manifest()
+        
+        for filename in sorted(os.listdir(self.directory_path)):
+            name = strip_compression(filename)
+            if name.endswith('.sql') and not name.endswith(('_postgres.sql', '_delta.sql')) and name != 'export_202505240140.sql':
                 mysql_file = os.path.join(self.directory_path, filename)
-                postgres_file = os.path.join(self.directory_path, filename.replace('.sql', '_postgres.sql'))
+                postgres_file = os.path.join(self.directory_path, self.postgres_filename(filename))
                 
-                # Check if conversion is needed
-                mysql_size = os.path.getsize(mysql_file) if os.path.exists(mysql_file) else 0
+                mysql_stat = os.stat(mysql_file)
                 postgres_size = os.path.getsize(postgres_file) if os.path.exists(postgres_file) else 0
                 
-                print(f"  {filename}: {mysql_size:,} bytes → {postgres_size:,} bytes")
+                if self.target is None:
+                    print(f"  {filename}: {mysql_stat.st_size:,} bytes → {postgres_size:,} bytes")
+                else:
+                    print(f"  {filename}: {mysql_stat.st_size:,} bytes")
                 
-                # Convert if postgres file doesn't exist or is significantly smaller
-                if not os.path.exists(postgres_file) or postgres_size < mysql_size * 0.5:
+                # Check if conversion is needed
+                reason = self.rebuild_reason(filename, mysql_stat, postgres_file)
+                if reason:
                     self.mysql_files.append(filename)
-                    print(f"    → Will convert")
+                    print(f"    → Will convert ({reason})")
                 else:
-                    print(f"    → Already converted")
-                    
+                    print(f"    → Up to date")
+        
         return self.mysql_files
     
-    def convert_data_types(self, sql_content):
-        """Convert MySQL data types to PostgreSQL equivalents"""
-        # Data type conversions
-        conversions = {
-            r'\bTINYINT\b': 'SMALLINT',
-            r'\bINT\b': 'INTEGER',
-            r'\bBIGINT\b': 'BIGINT',
-            r'\bVARCHAR\((\d+)\)': r'VARCHAR(\1)',
-            r'\bTEXT\b': 'TEXT',
-            r'\bLONGTEXT\b': 'TEXT',
-            r'\bMEDIUMTEXT\b': 'TEXT',
-            r'\bTIMESTAMP\b': 'TIMESTAMP',
-            r'\bDATETIME\b': 'TIMESTAMP',
-            r'\bDATE\b': 'DATE',
-            r'\bTIME\b': 'TIME',
-            r'\bFLOAT\b': 'REAL',
-            r'\bDOUBLE\b': 'DOUBLE PRECISION',
-            r'\bDECIMAL\((\d+),(\d+)\)': r'DECIMAL(\1,\2)',
-            r'\bBOOLEAN\b': 'BOOLEAN',
-            r'\bTINYINT\(1\)': 'BOOLEAN',
-            r'\bJSON\b': 'JSONB',
+    def postgres_filename(self, mysql_filename):
+        """Output name for a dump: users.sql and users.sql.gz both give users_postgres.sql, plus the --compress suffix"""
+        return with_compression(strip_compression(mysql_filename).replace('.sql', '_postgres.sql'), self.compress)
+    
+    def manifest_path(self):
+        return os.path.join(self.directory_path, MANIFEST_FILENAME)
+    
+    def load_manifest(self):
+        """Load the incremental build manifest, or an empty one"""
+        try:
+            with open(self.manifest_path(), 'r', encoding='utf-8') as f:
+                return json.load(f).get('files', {})
+        except (OSError, ValueError):
+            return {}
+    
+    def save_manifest(self):
+        """Write the manifest atomically"""
+        temp_path = self.manifest_path() + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'converter_version': CONVERTER_VERSION, 'files': self.manifest},
+                      f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write('\n')
+        os.replace(temp_path, self.manifest_path())
+    
+    def output_options(self):
+        """Options that change the converted output, recorded in the manifest"""
+        return {
+            'deterministic': self.deterministic,
+            'output_format': self.output_format,
+            'binary_tables': self.binary_tables,
+            'data_uri_columns': sorted(
+                f"{table}.{column}" for table, columns in self.data_uri_columns.items() for column in columns
+            ),
+            'blob_dir': self.blob_dir,
+            'rows_per_statement': self.rows_per_statement,
+            'max_statement_bytes': self.max_statement_bytes,
+            'statements_per_transaction': self.statements_per_transaction,
+            'fast_load': self.maintenance_work_mem if self.fast_load else None,
+            'span_threshold': self.span_threshold,
+            'compress': self.compress,
         }
-        
-        for mysql_type, postgres_type in conversions.items():
-            sql_content = re.sub(mysql_type, postgres_type, sql_content, flags=re.IGNORECASE)
-        
-        return sql_content
     
-    def convert_syntax(self, sql_content):
-        """Convert MySQL-specific syntax to PostgreSQL"""
-        # Remove MySQL-specific keywords
-        sql_content = re.sub(r'\bAUTO_INCREMENT\b', '', sql_content, flags=re.IGNORECASE)
-        sql_content = re.sub(r'\bENGINE\s*=\s*\w+', '', sql_content, flags=re.IGNORECASE)
-        sql_content = re.sub(r'\bCHARSET\s*=\s*\w+', '', sql_content, flags=re.IGNORECASE)
-        sql_content = re.sub(r'\bCOLLATE\s*=\s*\w+', '', sql_content, flags=re.IGNORECASE)
-        sql_content = re.sub(r'\bDEFAULT\s+CHARSET\s*=\s*\w+', '', sql_content, flags=re.IGNORECASE)
-        
-        # Convert backticks to double quotes for identifiers
-        sql_content = re.sub(r'`([^`]+)`', r'"\1"', sql_content)
+    def rebuild_reason(self, filename, mysql_stat, postgres_file):
+        """Return why filename must be converted, or None when its output is current
         
-        # Convert INSERT IGNORE to INSERT ... ON CONFLICT DO NOTHING
-        sql_content = re.sub(r'\bINSERT\s+IGNORE\s+INTO\b', 'INSERT INTO', sql_content, flags=re.IGNORECASE)
+        An unchanged size and mtime is trusted without reading the file; if
+        only the mtime moved, the content hash decides.
+        """
+        if self.target is not None:
+            # Nothing is written, so there is nothing to be current
+            return 'loading into target'
+        entry = self.manifest.get(filename)
+        fingerprint = {'size': mysql_stat.st_size, 'mtime_ns': mysql_stat.st_mtime_ns}
         
-        # Handle ENUM types - we'll need to extract and create them separately
-        enum_pattern = r'\b(\w+)\s+ENUM\s*\(([^)]+)\)'
-        enums = re.findall(enum_pattern, sql_content, flags=re.IGNORECASE)
+        if self.force:
+            reason = 'forced'
+        elif not os.path.exists(postgres_file):
+            reason = 'no output'
+        elif entry is not None and not all(
+                os.path.exists(os.path.join(self.directory_path, name)) for name in entry.get('data_files', ())):
+            reason = 'no output'
+        elif entry is None:
+            reason = 'not in manifest'
+        elif entry.get('converter_version') != CONVERTER_VERSION:
+            reason = 'converter changed'
+        elif entry.get('options') != self.output_options():
+            reason = 'options changed'
+        elif entry['size'] == mysql_stat.st_size and entry['mtime_ns'] == mysql_stat.st_mtime_ns:
+            return None
+        elif entry['size'] != mysql_stat.st_size:
+            reason = 'content changed'
+        else:
+            fingerprint['sha256'] = file_sha256(os.path.join(self.directory_path, filename))
+            if fingerprint['sha256'] == entry['sha256']:
+                # Touched but identical: remember the new mtime and skip
+                entry['mtime_ns'] = mysql_stat.st_mtime_ns
+                return None
+            reason = 'content changed'
         
-        enum_definitions = []
-        for column_name, enum_values in enums:            # Clean up enum values
-            enum_values_clean = re.findall(r"'([^']*)'", enum_values)
-            if enum_values_clean:
-                enum_type_name = f"{column_name}_enum"
-                enum_values_formatted = ', '.join([f"'{val}'" for val in enum_values_clean])
-                enum_def = f"CREATE TYPE {enum_type_name} AS ENUM ({enum_values_formatted});\n"
-                enum_definitions.append(enum_def)
-                # Replace ENUM definition with type reference
-                sql_content = re.sub(
-                    rf'\b{column_name}\s+ENUM\s*\([^)]+\)',
-                    f'{column_name} {enum_type_name}',
-                    sql_content,
-                    flags=re.IGNORECASE
+        # Hash before converting so a file edited mid-run is caught next time
+        if 'sha256' not in fingerprint:
+            fingerprint['sha256'] = file_sha256(os.path.join(self.directory_path, filename))
+        self._pending_manifest[filename] = fingerprint
+        return reason
+    
+    def update_manifest(self):
+        """Record every successfully converted file in the manifest and save it"""
+        for log in self.conversion_log:
+            fingerprint = self._pending_manifest.get(log['file'])
+            if log['status'] == 'success' and fingerprint:
+                self.manifest[log['file']] = dict(
+                    fingerprint,
+                    converter_version=CONVERTER_VERSION,
+                    options=self.output_options(),
+                    data_files=log.get('data_files', []),
                 )
-        
-        return sql_content, enum_definitions
+        self.save_manifest()
+    
+    def convert_data_types(self, sql_content):
+        """Convert MySQL data types to PostgreSQL equivalents"""
+        return self.rewrite_typed(sql_content, ('types',))
+    
+    def convert_syntax(self, sql_content):
+        """Convert MySQL-specific syntax to PostgreSQL"""
+        return self.rewrite_typed(sql_content, ('syntax',))
     
     def convert_timestamps(self, sql_content):
         """Convert MySQL timestamp formats to PostgreSQL"""
-        # Convert '0000-00-00 00:00:00' to NULL
-        sql_content = re.sub(r"'0000-00-00 00:00:00'", 'NULL', sql_content)
-        sql_content = re.sub(r"'0000-00-00'", 'NULL', sql_content)
-        
-        # Convert CURRENT_TIMESTAMP
-        sql_content = re.sub(r'\bCURRENT_TIMESTAMP\b', 'CURRENT_TIMESTAMP', sql_content, flags=re.IGNORECASE)
-        
-        return sql_content
+        return self.rewrite_typed(sql_content, ('timestamps',))
     
     def extract_table_name(self, sql_content):
         """Extract table name from CREATE TABLE statement"""
         match = re.search(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?', sql_content, flags=re.IGNORECASE)
         return match.group(1) if match else None
     
-    def add_sequence_reset(self, sql_content, table_name):
-        """Add sequence reset for auto-increment columns"""
-        # Look for INSERT statements to find the maximum ID
-        insert_pattern = rf'INSERT\s+INTO\s+`?{table_name}`?\s*\([^)]*\)\s+VALUES\s*\(([^)]+)\)'
-        inserts = re.findall(insert_pattern, sql_content, flags=re.IGNORECASE | re.DOTALL)
-        
-        if inserts:
-            max_id = 0
-            for insert_values in inserts:
-                # Extract first value (usually ID)
-                first_value = insert_values.split(',')[0].strip()
-                try:
-                    id_val = int(first_value)
-                    max_id = max(max_id, id_val)
-                except ValueError:
-                    continue
-            
-            if max_id > 0:
-                sequence_reset = f"\n-- Reset sequence for {table_name}\nSELECT setval('{table_name}_id_seq', {max_id + 1});\n"
-                return sql_content + sequence_reset
+    def add_sequence_reset(self, sql_content, table_name=None):
+        """Append setval() statements for the serial columns found in sql_content
         
-        return sql_content
+        A standalone pass over a finished dump; convert_file tracks the same
+        values with a SequenceTracker while it converts instead.
+        """
+        tracker = SequenceTracker()
+        for statement in iter_statements(io.StringIO(sql_content), self.chunk_size):
+            tracker.observe(statement)
+        return sql_content + tracker.reset_sql()
     
     def process_insert_statements(self, sql_content):
         """Process INSERT statements for better PostgreSQL compatibility"""
-        # Handle complex INSERT statements with multiple values
-        lines = sql_content.split('\n')
-        processed_lines = []
-        
-        for line in lines:
-            if re.match(r'^\s*INSERT\s+INTO', line, flags=re.IGNORECASE):
-                # Ensure proper formatting
-                line = re.sub(r'\s+', ' ', line.strip())
-                
-            processed_lines.append(line)
-        
-        return '\n'.join(processed_lines)
+        return self.rewrite_typed(sql_content, ('inserts',))
     
-    def convert_file(self, mysql_filename):
-        """Convert a single MySQL file to PostgreSQL format"""
-        mysql_path = os.path.join(self.directory_path, mysql_filename)
-        postgres_filename = mysql_filename.replace('.sql', '_postgres.sql')
-        postgres_path = os.path.join(self.directory_path, postgres_filename)
+    def rewrite_typed(self, sql_content, stages):
+        """rewrite_tokens statement by statement, INSERT values planned from the CREATE TABLE before them"""
+        return self._rewrite_statements(sql_content, stages)[0]
+    
+    def _rewrite_statements(self, sql_content, stages, enum_names=None, counts=None):
+        """rewrite_tokens over every statement of sql_content; returns (converted_sql, enum_definitions)"""
+        plans = ValuePlans()
+        converted = []
+        enum_definitions = []
+        if enum_names is None:
+            enum_names = set()
+        for statement in iter_statements(io.StringIO(sql_content), self.chunk_size):
+            plan = None
+            if is_insert_statement(statement):
+                plan = plans.plan(statement)
+            else:
+                plans.observe(statement)
+            result = self.rewrite_tokens(statement, stages, enum_names, plan, counts=counts)
+            converted.append(result[0])
+            enum_definitions.extend(result[1])
+        return ''.join(converted), enum_definitions
+    
+    def _holds_statements(self, sql_content):
+        """True when sql_content is more than one statement"""
+        # One terminator at the very end is the common case, decided without lexing
+        if sql_content.find(';') >= len(sql_content.rstrip()) - 1:
+            return False
+        statements = 0
+        for statement in iter_statements(io.StringIO(sql_content), self.chunk_size):
+            if split_leading_trivia(statement)[1]:
+                statements += 1
+                if statements > 1:
+                    return True
+        return False
+    
+    def rewrite_tokens(self, sql_content, stages=CONVERSION_STAGES, enum_names=None, plan=None, headerless=False,
+                       counts=None):
+        """Apply the selected conversion stages to sql_content in a single token pass
         
-        try:
-            print(f"\nConverting {mysql_filename}...")
+        Only keyword, identifier and punctuation tokens are rewritten; string
+        literals and comments pass through untouched (except zero-dates).
+        Unchanged input is copied by slice between edits, so memory stays
+        proportional to the input rather than to its token count.
+        enum_names collects ENUM types already defined when sql_content is one
+        statement of a larger stream. Returns (converted_sql, enum_definitions).
+        
+        plan is the ValuePlans entry of an INSERT statement: row values are
+        then transformed by column (zero-dates to NULL in date columns, 0/1
+        to false/true in boolean columns, JSON checked in JSON columns) and
+        other columns are left alone. Without a plan every zero-date string
+        becomes NULL. headerless marks a row batch cut from after the header.
+        counts, if given, is a conversion_metrics.new_counts() dict that gets
+        the number of edits made (and JSON values checked) per stage.
+        
+        AUTO_INCREMENT columns become identity columns, whether declared in
+        CREATE TABLE or added later by ALTER TABLE ... MODIFY as phpMyAdmin
+        does, so the sequence resets after the data have a sequence to set.
+        Column definitions are cleaned up by sql_schema.create_table_sql and
+        MySQL session statements (SET SQL_MODE, USE, ...) are dropped. These
+        work on one statement, so text holding several is converted
+        statement by statement, as rewrite_typed does.
+        """
+        types = 'types' in stages
+        syntax = 'syntax' in stages
+        timestamps = 'timestamps' in stages
+        inserts = 'inserts' in stages
+        
+        if syntax and not headerless and plan is None and self._holds_statements(sql_content):
+            return self._rewrite_statements(sql_content, stages, enum_names, counts)
+        if syntax and not headerless:
+            trivia, body = split_leading_trivia(sql_content)
+            if MYSQL_ONLY_PATTERN.match(body):
+                if counts is not None:
+                    counts['syntax'] += 1
+                return trivia, []
+            altered = create_table_sql(alter_table_sql(sql_content))
+            if altered is not sql_content:
+                if counts is not None:
+                    counts['syntax'] += 1
+                sql_content = altered
+        
+        in_rows = plan is not None and headerless
+        row_depth = 0             # parenthesis depth inside VALUES
+        value_index = 0           # position of the current value in its row
+        boolean_column = False    # inside a column definition converted to BOOLEAN
+        
+        tokens = TokenStream(sql_content)
+        output = []
+        last = 0                  # end of the input already copied to output
+        enum_definitions = []
+        if enum_names is None:
+            enum_names = set()
+        previous = None           # last significant input token
+        previous_space = None     # whitespace token directly before the current one
+        in_insert_header = False
+        enum_table = None         # table named by the statement, looked up at the first ENUM
+        
+        def replace(start, end, replacement, stage):
+            nonlocal last
+            if counts is not None:
+                counts[stage] += 1
+            output.append(sql_content[last:start])
+            output.append(replacement)
+            last = end
+        
+        for token in tokens:
+            kind = token.lastgroup
             
-            # Read MySQL file
-            with open(mysql_path, 'r', encoding='utf-8') as f:
-                sql_content = f.read()
+            if kind == 'space':
+                # Collapse whitespace inside INSERT ... VALUES headers
+                if in_insert_header and token.group() != ' ':
+                    replace(token.start(), token.end(), ' ', 'inserts')
+                previous_space = token
+                continue
+            if kind == 'comment':
+                previous_space = None
+                continue
             
-            # Extract table name
-            table_name = self.extract_table_name(sql_content)
-            print(f"  Table: {table_name}")
+            text = token.group()
+            
+            if kind == 'word':
+                upper = text.upper()
+                
+                if types and upper == 'TINYINT' and [ahead.group() for ahead in tokens.peek(3)] == ['(', '1', ')']:
+                    # TINYINT(1) is MySQL's BOOLEAN
+                    replace(token.start(), tokens.consume(3).end(), 'BOOLEAN', 'types')
+                    boolean_column = True
+                
+                elif types and upper in TYPE_CONVERSIONS:
+                    if text != TYPE_CONVERSIONS[upper]:
+                        replace(token.start(), token.end(), TYPE_CONVERSIONS[upper], 'types')
+                
+                elif types and boolean_column and upper == 'DEFAULT':
+                    ahead = tokens.peek(1)
+                    if ahead and ahead[0].group() in BOOLEAN_VALUES:
+                        value = tokens.consume(1)
+                        replace(value.start(), value.end(), BOOLEAN_VALUES[value.group()], 'types')
+                
+                elif syntax and upper == 'AUTO_INCREMENT' and [ahead.group() for ahead in tokens.peek(1)] != ['=']:
+                    # Column attribute: the column takes its values from an owned sequence
+                    replace(token.start(), token.end(), 'GENERATED BY DEFAULT AS IDENTITY', 'syntax')
+                
+                elif syntax and upper in TABLE_OPTIONS:
+                    option_end = self._table_option_end(tokens, token, upper)
+                    if option_end is not None:
+                        # Remove MySQL table options (ENGINE=, CHARSET=, AUTO_INCREMENT ...)
+                        start = token.start()
+                        if (previous_space is not None and previous_space.start() >= last
+                                and '\n' not in previous_space.group()):
+                            start = previous_space.start()
+                        replace(start, option_end, '', 'syntax')
+                        previous_space = None
+                        continue
+                
+                elif syntax and upper == 'IGNORE' and previous is not None and previous.group().upper() == 'INSERT':
+                    # INSERT IGNORE INTO -> INSERT INTO
+                    space = tokens.skip_insignificant()
+                    replace(token.start(), space.end() if space else token.end(), '', 'syntax')
+                    previous_space = None
+                    continue
+                
+                elif syntax and upper == 'ENUM' and previous is not None and previous.lastgroup in IDENTIFIER_KINDS:
+                    enum_end, enum_values = self._parse_enum_values(tokens)
+                    if enum_values:
+                        column_name = unquote_identifier(previous.lastgroup, previous.group())
+                        # Types share one namespace: two tables may both have a "status" ENUM
+                        if enum_table is None:
+                            enum_table = self.extract_table_name(sql_content) or ''
+                        enum_type_name = f"{enum_table}_{column_name}_enum" if enum_table else f"{column_name}_enum"
+                        if enum_type_name not in enum_names:
+                            enum_names.add(enum_type_name)
+                            enum_definitions.append(
+                                f"CREATE TYPE {enum_type_name} AS ENUM ({', '.join(enum_values)});\n"
+                            )
+                        replace(token.start(), enum_end, enum_type_name, 'enums')
+                
+                elif timestamps and upper == 'CURRENT_TIMESTAMP':
+                    end = token.end()
+                    # MariaDB writes current_timestamp(), PostgreSQL rejects the empty parens
+                    parens = tokens.peek(2, significant=False)
+                    if len(parens) == 2 and parens[0].group() == '(' and parens[1].group() == ')':
+                        end = tokens.consume(2, significant=False).end()
+                    if end != token.end() or text != 'CURRENT_TIMESTAMP':
+                        replace(token.start(), end, 'CURRENT_TIMESTAMP', 'timestamps')
+                
+                elif inserts and upper == 'INSERT':
+                    in_insert_header = True
+                elif upper == 'VALUES':
+                    in_insert_header = False
+                    in_rows = plan is not None
+            
+            elif kind == 'backtick':
+                # Convert backticks to double quotes for identifiers
+                if syntax:
+                    replace(token.start(), token.end(), quote_identifier(unquote_identifier(kind, text)), 'syntax')
+            
+            elif kind == 'string':
+                if row_depth == 1:
+                    transform = plan[value_index] if value_index < len(plan) else None
+                    if transform is None:
+                        pass
+                    elif transform[0] == 'date':
+                        if timestamps and is_zero_date(text[1:-1]):
+                            replace(token.start(), token.end(), 'NULL', 'timestamps')
+                    elif transform[0] == 'boolean':
+                        if types and text in BOOLEAN_VALUES:
+                            replace(token.start(), token.end(), BOOLEAN_VALUES[text], 'types')
+                    elif inserts:
+                        check_json_value(text, transform[1])
+                        if counts is not None:
+                            counts['inserts'] += 1
+                elif timestamps and plan is None and text in ZERO_DATES:
+                    # Convert '0000-00-00 00:00:00' to NULL
+                    replace(token.start(), token.end(), 'NULL', 'timestamps')
+            
+            elif kind == 'number':
+                if types and row_depth == 1 and value_index < len(plan) and text in BOOLEAN_VALUES:
+                    transform = plan[value_index]
+                    if transform is not None and transform[0] == 'boolean':
+                        replace(token.start(), token.end(), BOOLEAN_VALUES[text], 'types')
             
-            # Apply conversions
-            sql_content = self.convert_data_types(sql_content)
-            sql_content, enum_definitions = self.convert_syntax(sql_content)
-            sql_content = self.convert_timestamps(sql_content)
-            sql_content = self.process_insert_statements(sql_content)
+            elif in_rows and kind == 'punct' and text in '(),':
+                if text == '(':
+                    row_depth += 1
+                    if row_depth == 1:
+                        value_index = 0
+                elif text == ')':
+                    row_depth -= 1
+                elif row_depth == 1:
+                    value_index += 1
             
-            # Add sequence reset if applicable
-            if table_name:
-                sql_content = self.add_sequence_reset(sql_content, table_name)
+            elif text == ';':
+                in_insert_header = False
+                boolean_column = False
             
-            # Prepare final content with header
-            header = f"""-- PostgreSQL version of {mysql_filename}
--- Converted from MySQL on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+            elif text == ',' or text == ')':
+                boolean_column = False
+            
+            previous = token
+            previous_space = None
+        
+        if last == 0:
+            return sql_content, enum_definitions
+        output.append(sql_content[last:])
+        return ''.join(output), enum_definitions
+    
+    def _table_option_end(self, tokens, token, upper):
+        """Consume the "= value" of a MySQL table option; return where it ends, or None"""
+        if upper == 'DEFAULT':
+            ahead = tokens.peek(3)
+            if len(ahead) == 3 and ahead[0].group().upper() == 'CHARSET' and ahead[1].group() == '=':
+                return tokens.consume(3).end()
+            return None
+        
+        ahead = tokens.peek(2)
+        if len(ahead) == 2 and ahead[0].group() == '=':
+            return tokens.consume(2).end()
+        if upper == 'COMMENT' and ahead and ahead[0].lastgroup == 'string':
+            return tokens.consume(1).end()
+        return None
+    
+    def _parse_enum_values(self, tokens):
+        """Consume ( 'a', 'b', ... ) after ENUM; return (end_offset, quoted_values)"""
+        ahead = tokens.peek(1)
+        if not ahead or ahead[0].group() != '(':
+            return None, []
+        
+        values = []
+        count = 2
+        while True:
+            ahead = tokens.peek(count + 1)
+            if len(ahead) < count + 1 or ahead[count - 1].lastgroup != 'string':
+                return None, []
+            values.append(ahead[count - 1].group())
+            separator = ahead[count].group()
+            if separator == ')':
+                return tokens.consume(count + 1).end(), values
+            if separator != ',':
+                return None, []
+            count += 2
+    
+    def build_header(self, mysql_filename, table_name, enum_definitions):
+        """Return the comment header and ENUM definitions written before the converted SQL"""
+        # A deterministic build leaves out the date so identical inputs give identical outputs
+        converted_on = '' if self.deterministic else f" on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        header = f"""-- PostgreSQL version of {mysql_filename}
+-- Converted from MySQL{converted_on}
 -- Table: {table_name if table_name else 'Unknown'}
 
-"""
-            
-            # Add ENUM definitions at the beginning if any
-            if enum_definitions:
-                header += "-- ENUM type definitions\n"
-                header += ''.join(enum_definitions)
-                header += "\n"
+""" + SESSION_SQL + "\n"
+        if self.fast_load:
+            header += FAST_LOAD_SESSION_SQL + "\n"
+        
+        # Add ENUM definitions at the beginning if any
+        if enum_definitions:
+            header += self.enum_block(enum_definitions)
+        
+        return header
+    
+    def enum_block(self, enum_definitions):
+        """Return the ENUM type definitions section"""
+        return "-- ENUM type definitions\n" + ''.join(enum_definitions) + "\n"
+    
+    def iter_converted_statements(self, statements, enum_names, binary=None, blobs=None, sequences=None):
+        """Convert a stream of statements lazily, yielding (statement, converted, new_enum_definitions)
+        
+        binary is an optional BinaryCopyWriter that takes over the rows of
+        its tables; the other INSERTs are written in self.output_format.
+        blobs is an optional DataURIStore applied to each MySQL statement
+        first, so later stages never see the inline payloads. sequences is
+        an optional SequenceTracker fed every MySQL statement. INSERT values
+        are transformed by the column types of the CREATE TABLE before them.
+        Statement re-chunking and transaction grouping are applied last,
+        then the fast-load profile if it is on.
+        
+        Keys, indexes and foreign keys are taken out of the DDL and yielded
+        after all the data, behind POST_DATA_MARKER, one statement each and
+        followed by the sequence resets.
+        """
+        plans = ValuePlans()
+        post_data = PostDataSplitter()
+        if self._executor is not None:
+            results = self._iter_converted_parallel(statements, enum_names, binary, blobs, sequences, plans, post_data)
+        else:
+            results = self._iter_converted_serial(statements, enum_names, binary, blobs, sequences, plans, post_data)
+        
+        batcher = self.statement_batcher()
+        profile = FastLoadProfile() if self.fast_load else None
+        if batcher is None and profile is None:
+            yield from results
+        else:
+            for statement, converted, enum_definitions in results:
+                if batcher is not None:
+                    converted = batcher.format(converted)
+                if profile is not None:
+                    converted = profile.format(converted)
+                yield statement, converted, enum_definitions
+            tail = (batcher.finish() if batcher is not None else '') + (profile.finish() if profile is not None else '')
+            if tail:
+                yield '', tail, []
+        
+        tail = post_data.post_data_sql() + (self._reset_sql(sequences) if sequences is not None else '')
+        if tail and profile is not None:
+            tail = fast_load_post_data_sql(self.maintenance_work_mem) + tail
+        if tail:
+            yield '', '\n' + POST_DATA_MARKER + tail, []
+    
+    def statement_batcher(self):
+        """Return a StatementBatcher for one file, or None when no option asks for one"""
+        if not (self.rows_per_statement or self.max_statement_bytes or self.statements_per_transaction):
+            return None
+        return StatementBatcher(self.rows_per_statement, self.max_statement_bytes, self.statements_per_transaction)
+    
+    def _iter_converted_serial(self, statements, enum_names, binary=None, blobs=None, sequences=None, plans=None,
+                               post_data=None):
+        """Convert statements one by one in this process"""
+        for statement in statements:
+            if blobs is not None:
+                statement = blobs.extract(statement)
+            if sequences is not None:
+                self._observe_sequences(sequences, statement)
+            is_insert = is_insert_statement(statement)
+            plan = None
+            source = statement
+            if plans is not None:
+                if is_insert:
+                    plan = plans.plan(statement)
+                else:
+                    plans.observe(statement)
+            if post_data is not None and not is_insert:
+                source = post_data.split(statement)
+            converted, enum_definitions = self._rewrite(source, enum_names, plan)
+            diverted = binary.take(converted) if binary is not None else None
+            if diverted is not None:
+                converted = diverted
+            elif self.output_format == 'copy' and is_insert:
+                converted = insert_to_copy(converted) or converted
+            yield statement, converted, enum_definitions
+    
+    def _iter_converted_parallel(self, statements, enum_names, binary=None, blobs=None, sequences=None, plans=None,
+                                 post_data=None):
+        """Like iter_converted_statements, with INSERT rows converted on the process pool
+        
+        INSERT statements are cut into row batches at tuple boundaries and
+        each batch is rewritten by a worker; batches tokenize exactly as they
+        would in the whole statement, so the joined result is byte-identical
+        to the serial path. Other statements (DDL with ENUMs) are converted
+        here because they share enum_names. Up to two batches per worker are
+        kept in flight and results are yielded in input order.
+        
+        With COPY output each worker also formats its rows; the statement
+        falls back to INSERT if any batch holds a value COPY cannot take.
+        Rows for a BinaryCopyWriter are encoded here from the joined INSERT.
+        Workers also return the column maxima a SequenceTracker asks for.
+        """
+        pending = deque()     # (statement, futures or None, result or None, tracked columns)
+        in_flight = 0
+        
+        for statement in statements:
+            if blobs is not None:
+                statement = blobs.extract(statement)
+            tracked = sequences.tracked_columns(statement) if sequences is not None else None
+            if is_insert_statement(statement):
+                batches = split_insert_rows(statement, self.batch_size)
+                as_copy = self.output_format == 'copy' and not (binary is not None and binary.wants(statement))
+                track = tracked[1] if tracked else {}
+                plan = plans.plan(statement) if plans is not None else None
+                futures = [
+                    self._executor.submit(
+                        rewrite_batch, self, batch, as_copy, index == 0, index == len(batches) - 1, track, plan
+                    )
+                    for index, batch in enumerate(batches)
+                ]
+                pending.append((statement, futures, None, tracked))
+                in_flight += len(futures)
+                if self._metrics is not None:
+                    self._metrics.add('rewrite', chars_in=len(statement))
+            else:
+                if sequences is not None:
+                    self._observe_sequences(sequences, statement)
+                if plans is not None:
+                    plans.observe(statement)
+                source = post_data.split(statement) if post_data is not None else statement
+                pending.append((statement, None, self._rewrite(source, enum_names), None))
             
-            final_content = header + sql_content
+            while pending and (pending[0][1] is None or in_flight > self.jobs * 2):
+                statement, futures, result, tracked = pending.popleft()
+                if futures is not None:
+                    in_flight -= len(futures)
+                    result = (self.join_batches(futures, sequences, tracked), [])
+                yield self._divert(binary, statement, result)
+        
+        while pending:
+            statement, futures, result, tracked = pending.popleft()
+            if futures is not None:
+                result = (self.join_batches(futures, sequences, tracked), [])
+            yield self._divert(binary, statement, result)
+    
+    def _rewrite(self, source, enum_names=None, plan=None):
+        """rewrite_tokens, measured as the rewrite stage of the file being converted"""
+        if self._metrics is None:
+            return self.rewrite_tokens(source, enum_names=enum_names, plan=plan)
+        counts = new_counts()
+        with self._metrics.measure('rewrite', len(source)) as entry:
+            result = self.rewrite_tokens(source, enum_names=enum_names, plan=plan, counts=counts)
+        entry['chars_out'] += len(result[0])
+        self._metrics.count(counts)
+        return result
+    
+    def _observe_sequences(self, sequences, statement):
+        if self._metrics is None:
+            sequences.observe(statement)
+            return
+        with self._metrics.measure('sequence_reset', len(statement)):
+            sequences.observe(statement)
+    
+    def _reset_sql(self, sequences):
+        if self._metrics is None:
+            return sequences.reset_sql()
+        with self._metrics.measure('sequence_reset') as entry:
+            reset_sql = sequences.reset_sql()
+        entry['chars_out'] += len(reset_sql)
+        return reset_sql
+    
+    def _divert(self, binary, statement, result):
+        """Hand a converted statement to the binary writer; returns the yielded triple"""
+        converted, enum_definitions = result
+        diverted = binary.take(converted) if binary is not None else None
+        return statement, converted if diverted is None else diverted, enum_definitions
+    
+    def join_batches(self, futures, sequences=None, tracked=None):
+        """Join the rewritten row batches of one INSERT statement in order
+        
+        Time spent waiting here counts as rewrite wall time; the CPU time and
+        replacement counts of the workers are added to it.
+        """
+        if self._metrics is None:
+            results = [future.result() for future in futures]
+        else:
+            with self._metrics.measure('rewrite'):
+                results = [future.result() for future in futures]
+            for converted, _, _, counts, cpu_seconds in results:
+                self._metrics.add('rewrite', cpu_seconds=cpu_seconds, chars_out=len(converted))
+                self._metrics.count(counts)
+        if tracked:
+            table, indexes = tracked
+            for _, _, maxima, _, _ in results:
+                sequences.update(table, indexes, maxima)
+        if all(result[1] is not None for result in results):
+            return ''.join(result[1] for result in results)
+        return ''.join(result[0] for result in results)
+    
+    def convert_text(self, sql_content, binary=None, blobs=None, sequences=None):
+        """Convert a whole dump held in memory; returns (converted_sql, enum_definitions)"""
+        statements = iter_statements(io.StringIO(sql_content), self.chunk_size)
+        converted, enum_definitions, _ = self.convert_statements(statements, binary, blobs, sequences)
+        return converted, enum_definitions
+    
+    def convert_statements(self, statements, binary=None, blobs=None, sequences=None):
+        """Convert a dump's statements into one string; returns (converted_sql, enum_definitions, table_name)"""
+        converted = []
+        enum_definitions = []
+        table_name = None
+        for statement, piece, new_enums in self.iter_converted_statements(statements, set(), binary, blobs, sequences):
+            if table_name is None:
+                table_name = self.extract_table_name(statement)
+            converted.append(piece)
+            enum_definitions.extend(new_enums)
+        return ''.join(converted), enum_definitions, table_name
+    
+    def convert_file(self, mysql_filename):
+        """Convert a single MySQL file to PostgreSQL format"""
+        mysql_path = os.path.join(self.directory_path, mysql_filename)
+        postgres_filename = self.postgres_filename(mysql_filename)
+        postgres_path = os.path.join(self.directory_path, postgres_filename)
+        
+        try:
+            print(f"\nConverting {mysql_filename}...")
             
-            # Write PostgreSQL file
-            with open(postgres_path, 'w', encoding='utf-8') as f:
-                f.write(final_content)
+            sequences = SequenceTracker()
+            self._metrics = StageMetrics()
+            profiler = FileProfiler(self.profile) if self.profile else None
+            if profiler:
+                profiler.start()
+            binary = BinaryCopyWriter(self.binary_tables, self.directory_path) if self.binary_tables else None
+            blobs = DataURIStore(self.data_uri_columns, self.directory_path, self.blob_dir) if self.data_uri_columns else None
+            try:
+                if self.target is not None:
+                    table_name, sent = self.convert_target(mysql_path, blobs, sequences)
+                elif self.streaming:
+                    table_name = self.convert_stream(mysql_filename, mysql_path, postgres_path, binary, blobs, sequences)
+                else:
+                    table_name = self.convert_whole(mysql_filename, mysql_path, postgres_path, binary, blobs, sequences)
+            except Exception:
+                if binary:
+                    binary.discard()
+                raise
+            finally:
+                profile_path = self.stop_profiler(profiler, mysql_filename) if profiler else None
+            data_files = binary.close() if binary else []
+            if blobs:
+                data_files += blobs.close(mysql_filename)
             
             # Log conversion
             original_size = os.path.getsize(mysql_path)
-            converted_size = os.path.getsize(postgres_path)
+            converted_size = sent if self.target is not None else os.path.getsize(postgres_path)
             
             self.conversion_log.append({
                 'file': mysql_filename,
                 'table': table_name,
                 'original_size': original_size,
                 'converted_size': converted_size,
+                'data_files': data_files,
+                'metrics': self._metrics.as_dict(),
+                'profile': profile_path,
                 'status': 'success'
             })
             
-            print(f"  ✓ Created {postgres_filename}")
+            if self.target is not None:
+                loaded = self._loaded[-1]
+                print(f"  ✓ Loaded into target in {loaded.load_time:.2f}s "
+                      f"({len(loaded.post_data) + len(loaded.foreign_keys)} post-data statements to follow)")
+            else:
+                print(f"  ✓ Created {postgres_filename}")
             print(f"  Size: {original_size:,} → {converted_size:,} bytes")
+            print("  Time: " + ', '.join(
+                f"{stage} {entry['wall_seconds']:.2f}s" for stage, entry in self._metrics.stages.items()
+                if entry['calls']
+            ))
+            if profile_path:
+                print(f"  ✓ Profile written to {profile_path}")
+            if blobs and blobs.extracted:
+                print(f"  ✓ Moved {blobs.extracted:,} data URIs into {len(blobs.blobs):,} files under "
+                      f"{self.blob_dir}/ ({blobs.bytes_saved:,} bytes out of the dump)")
+            for message in binary.messages if binary else []:
+                print(f"  ! {message}")
+            for target in binary.targets.values() if binary else []:
+                print(f"  ✓ Wrote {target.rows:,} rows to {os.path.basename(target.path)} "
+                      f"({os.path.getsize(target.path):,} bytes, binary COPY)")
             
         except Exception as e:
             self.conversion_log.append({
@@ -225,9 +969,196 @@ class MySQLToPostgreSQLConverter:
                 'status': 'error'
             })
             print(f"  ✗ Error: {e}")
+        finally:
+            self._metrics = None
+    
+    def stop_profiler(self, profiler, mysql_filename):
+        """Stop profiling one file; returns the path of the profile written under profile_dir"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        return profiler.stop(os.path.join(self.profile_dir, os.path.splitext(strip_compression(mysql_filename))[0]))
     
-    def run_conversion(self):
-        """Run the bulk conversion process"""
+    def convert_whole(self, mysql_filename, mysql_path, postgres_path, binary=None, blobs=None, sequences=None):
+        """Convert a file with its output held in memory; returns the table name
+        
+        The MySQL file is memory-mapped (or streamed through its codec when
+        compressed) and decoded one statement at a time, so the dump itself is never held as one string next to its bytes;
+        oversized string literals are not decoded at all (see literal_spans).
+        """
+        # Apply all conversions in a single token pass; keys, indexes and
+        # sequence resets come last
+        with open_input(mysql_path) as mapped:
+            literals = self.literal_spans(mapped)
+            statements = literals.statements(self.chunk_size) if literals else mapped.iter_statements(self.chunk_size)
+            sql_content, enum_definitions, table_name = self.convert_statements(
+                self.timed_statements(statements), binary, blobs, sequences
+            )
+            print(f"  Table: {table_name}")
+            
+            # Write PostgreSQL file
+            with open_file(postgres_path, 'w') as f:
+                output = self.timed_writer(literals.writer(f) if literals else f)
+                output.write(self.build_header(mysql_filename, table_name, enum_definitions))
+                output.write(sql_content)
+        
+        return table_name
+    
+    def literal_spans(self, mapped):
+        """LiteralSpans for a mapped MySQL file, or None when some stage has to read long string values
+        
+        Spanned literals skip decoding, the rewrite and every copy on the
+        way to the output, which matters where the whole converted file is
+        held until it is written; --stream holds one statement at a time,
+        so it keeps literals as text and skips the extra scan. COPY and
+        binary output re-encode every value, data: URI extraction reads
+        them and --max-statement-bytes measures them, so those do too, as
+        do compressed dumps, which have no map to point into.
+        """
+        if (not self.span_threshold or self.streaming or not isinstance(mapped, MappedFile)
+                or self.output_format != 'insert' or self.binary_tables or self.data_uri_columns
+                or self.max_statement_bytes):
+            return None
+        return LiteralSpans(mapped, self.span_threshold)
+    
+    def timed_statements(self, statements):
+        """statements, with reading each one measured when a file's metrics are being collected"""
+        return TimedStatements(statements, self._metrics) if self._metrics is not None else statements
+    
+    def timed_writer(self, stream):
+        """stream, with writes measured when a file's metrics are being collected"""
+        return TimedWriter(stream, self._metrics) if self._metrics is not None else stream
+    
+    def convert_stream(self, mysql_filename, mysql_path, postgres_path, binary=None, blobs=None, sequences=None):
+        """Convert a file statement by statement without holding it in memory
+        
+        The header needs the table name and ENUM definitions from CREATE TABLE,
+        so statements before it (dump comments, SET lines) are held back until
+        it has been converted or chunk_size is exceeded. The sequences tracker
+        follows the rows as they pass and its setval() statements end the
+        post-data trailer. Returns the table name.
+        """
+        table_name = None
+        enum_names = set()
+        enum_definitions = []
+        pending = []        # converted statements waiting for the header
+        pending_size = 0
+        temp_path = postgres_path + '.tmp'
+        
+        with open_input(mysql_path) as mapped, \
+                open_file(temp_path, 'w', compression_suffix(postgres_path)) as output:
+            output = self.timed_writer(output)
+            statements = self.timed_statements(mapped.iter_statements(self.chunk_size))
+            for statement, converted, new_enums in self.iter_converted_statements(
+                    statements, enum_names, binary, blobs, sequences):
+                if table_name is None:
+                    table_name = self.extract_table_name(statement)
+                    if table_name:
+                        print(f"  Table: {table_name}")
+                
+                if pending is None:
+                    # Header already written: new types go right before their first use
+                    if new_enums:
+                        output.write(self.enum_block(new_enums))
+                    output.write(converted)
+                    continue
+                
+                enum_definitions.extend(new_enums)
+                pending.append(converted)
+                pending_size += len(converted)
+                if table_name or pending_size > self.chunk_size:
+                    output.write(self.build_header(mysql_filename, table_name, enum_definitions))
+                    output.writelines(pending)
+                    pending = None
+            
+            if pending is not None:
+                output.write(self.build_header(mysql_filename, table_name, enum_definitions))
+                output.writelines(pending)
+        
+        os.replace(temp_path, postgres_path)
+        return table_name
+    
+    def convert_target(self, mysql_path, blobs=None, sequences=None):
+        """Convert a file straight into the target database; returns (table_name, bytes sent)
+        
+        The converted statements go through the rewrite passes of
+        postprocess_pipeline (DROP ... IF EXISTS before CREATE, sequence
+        resets) and on to psql's standard input as they are produced: rows
+        arrive as COPY ... FROM stdin data with output_format 'copy' (what
+        --target defaults to), after the types and the table they need,
+        and a blocking pipe holds the conversion back whenever
+        psql or the server falls behind, so memory stays at a statement or
+        two. Nothing is written to disk. The post-data statements are kept
+        in a DumpFile and run by load_target once every file is in.
+        """
+        loaded = DumpFile(mysql_path, read=False)
+        table_name = None
+        sent = 0
+        
+        def converted_sql(statements):
+            nonlocal table_name
+            enum_names = set()
+            yield SESSION_SQL
+            if self.fast_load:
+                yield FAST_LOAD_SESSION_SQL + "\n"
+            for statement, converted, new_enums in self.iter_converted_statements(
+                    statements, enum_names, blobs=blobs, sequences=sequences):
+                if table_name is None:
+                    table_name = self.extract_table_name(statement)
+                    if table_name:
+                        print(f"  Table: {table_name}")
+                if new_enums:
+                    yield self.enum_block(new_enums)
+                yield converted
+        
+        def main_sql(statements):
+            nonlocal sent
+            for statement in process_statements(iter_statements(TextPieces(statements), self.chunk_size)):
+                if loaded.observe(statement):
+                    sent += len(statement) if statement.isascii() else len(statement.encode('utf-8'))
+                    yield statement
+        
+        with open_input(mysql_path) as mapped:
+            statements = self.timed_statements(mapped.iter_statements(self.chunk_size))
+            loaded.load_time = run_psql(self.target, main_sql(converted_sql(statements)),
+                                        self.directory_path, self.psql)
+        loaded.status = 'loaded'
+        self._loaded.append(loaded)
+        return table_name, sent
+    
+    def load_target(self, filenames):
+        """Load every file into the target database, then run their post-data statements there
+        
+        Files go in one at a time, each in its own psql session; with jobs
+        the INSERT row batches of each are converted on a process pool.
+        Keys, indexes and sequence resets run after the last file, foreign
+        keys after those, as load_database.py runs them.
+        """
+        if self.jobs > 1:
+            # Forked workers would inherit the write end of the psql pipe
+            # open at the time and keep the session from ever seeing EOF
+            with ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context('spawn')) as executor:
+                self._executor = executor
+                try:
+                    for filename in filenames:
+                        self.convert_file(filename)
+                finally:
+                    self._executor = None
+        else:
+            for filename in filenames:
+                self.convert_file(filename)
+        
+        if not self._loaded:
+            return
+        print("\nRunning post-data statements...")
+        run_post_data(self._loaded, self.target, self.jobs, self.psql)
+        for log in self.conversion_log:
+            failed = next((loaded for loaded in self._loaded
+                           if loaded.name == log['file'] and loaded.status != 'loaded'), None)
+            if failed is not None:
+                log['status'] = 'error'
+                log['error'] = failed.error
+    
+    def run_conversion(self, summary_json=None):
+        """Run the bulk conversion process; summary_json is passed on to print_summary"""
         print("MySQL to PostgreSQL Bulk Converter")
         print("=" * 50)
         
@@ -236,6 +1167,7 @@ class MySQLToPostgreSQLConverter:
         
         if not files_to_convert:
             print("\nNo files need conversion.")
+            self.save_manifest()
             return
         
         print(f"\nFound {len(files_to_convert)} files to convert:")
@@ -246,14 +1178,61 @@ class MySQLToPostgreSQLConverter:
         print("-" * 30)
         
         # Convert each file
-        for filename in files_to_convert:
-            self.convert_file(filename)
+        if self.target is not None:
+            self.load_target(files_to_convert)
+        elif self.jobs > 1:
+            self.convert_parallel(files_to_convert)
+        else:
+            for filename in files_to_convert:
+                self.convert_file(filename)
+        
+        if self.target is None:
+            self.update_manifest()
         
         # Print summary
-        self.print_summary()
+        self.print_summary(summary_json)
+    
+    def convert_parallel(self, filenames):
+        """Convert files on a process pool, logging and printing results in filename order
+        
+        Files bigger than their fair share of the pool would dominate the run,
+        so they are converted here with their INSERT row batches fanned out
+        to the same pool; every other file is one pool task. A lone file is
+        always one of the big ones.
+        """
+        sizes = {name: os.path.getsize(os.path.join(self.directory_path, name)) for name in filenames}
+        fair_share = sum(sizes.values()) / self.jobs
+        # Start the largest files first so the run takes about as long as the largest file
+        by_size = sorted(filenames, key=sizes.get, reverse=True)
+        
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            futures = {
+                name: executor.submit(convert_file_worker, self, name)
+                for name in by_size if sizes[name] <= fair_share
+            }
+            
+            self._executor = executor
+            try:
+                for filename in filenames:
+                    if filename not in futures:
+                        self.convert_file(filename)
+                        continue
+                    try:
+                        log_entry, output = futures[filename].result()
+                    except Exception as e:
+                        log_entry = {'file': filename, 'error': str(e), 'status': 'error'}
+                        output = f"\nConverting {filename}...\n  ✗ Error: {e}\n"
+                    print(output, end='')
+                    self.conversion_log.append(log_entry)
+            finally:
+                self._executor = None
     
-    def print_summary(self):
-        """Print conversion summary"""
+    def print_summary(self, json_path=None):
+        """Print conversion summary; with json_path, also write the full conversion_log there as JSON
+        
+        The JSON holds every log entry, including the per-stage metrics of
+        each converted file, so slow stages can be compared across runs.
+        """
         print("\n" + "=" * 50)
         print("Conversion Summary")
         print("=" * 50)
@@ -280,16 +1259,171 @@ class MySQLToPostgreSQLConverter:
         total_converted = sum(log.get('converted_size', 0) for log in successful)
         
         print(f"\nTotal data converted: {total_original:,} → {total_converted:,} bytes")
+        
+        if json_path:
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({'converter_version': CONVERTER_VERSION, 'output_options': self.output_options(),
+                           'files': self.conversion_log}, f, indent=2, ensure_ascii=False)
+                f.write('\n')
+            print(f"✓ Summary written to {json_path}")
 
-def main():
-    # Set the database directory path
-    database_dir = r"c:\Users\ken15.小恩\OneDrive\桌面\GURUlaptop\新增ckeditor版本(編輯中 render 用)\MFEE57-laptopGuru-ckeditor\frontend\data\database"
+def file_sha256(path):
+    """Return the hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DEFAULT_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def convert_file_worker(converter, mysql_filename):
+    """Process-pool entry point: convert one file and return (log_entry, printed_output)"""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        converter.convert_file(mysql_filename)
+    return converter.conversion_log[-1], output.getvalue()
+
+def check_json_value(text, column):
+    """Raise ValueError unless the MySQL string literal text holds JSON that jsonb accepts"""
+    value = string_value(text)
+    try:
+        json.loads(value)
+    except ValueError as e:
+        raise ValueError(f"column {column}: invalid JSON value ({e})") from None
+    if '\\u0000' in value:
+        raise ValueError(f"column {column}: JSON value holds \\u0000, which jsonb rejects")
+
+def rewrite_batch(converter, sql_content, as_copy=False, first=True, last=True, track=None, plan=None):
+    """Process-pool entry point: rewrite one batch of INSERT rows
     
+    Returns (converted, copy_text, maxima, counts, cpu_seconds); copy_text is
+    None unless as_copy is set and every row in the batch can be written as
+    COPY text, maxima holds the largest value of each column index in track,
+    and counts the rewrite_tokens edits per stage. plan is the statement's
+    ValuePlans entry.
+    """
+    cpu = time.process_time()
+    counts = new_counts()
+    converted = converter.rewrite_tokens(sql_content, plan=plan, headerless=not first, counts=counts)[0]
+    copy_text = insert_to_copy(converted, first, last) if as_copy else None
+    maxima = column_maxima(sql_content, track) if track else {}
+    return converted, copy_text, maxima, counts, time.process_time() - cpu
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert MySQL dumps to PostgreSQL format")
+    parser.add_argument('directory', nargs='?', default=DEFAULT_DATABASE_DIR,
+                        help="directory holding the MySQL .sql files (.sql.gz, .sql.xz and .sql.bz2 "
+                             "are read directly)")
+    parser.add_argument('--stream', action='store_true',
+                        help="convert statement by statement with bounded memory")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="read size in bytes for --stream (default: %(default)s)")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="convert this many files in parallel; 0 uses every CPU")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="target size in bytes of the INSERT row batches converted "
+                             "on worker processes (default: %(default)s)")
+    parser.add_argument('--deterministic', action='store_true',
+                        help="leave the conversion date out of the header so identical "
+                             "inputs give byte-identical outputs")
+    parser.add_argument('--force', action='store_true',
+                        help="convert every file even if the manifest says it is up to date")
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default=None,
+                        help="write row data as multi-row INSERT statements or as "
+                             "COPY ... FROM stdin blocks (default: insert, copy with --target)")
+    parser.add_argument('--binary-tables', type=lambda value: [name for name in value.split(',') if name],
+                        default=[], metavar='TABLE[,TABLE...]',
+                        help="write the rows of these tables to <table>.pgcopy files in binary "
+                             "COPY format, loaded by a \\copy line in the SQL output")
+    parser.add_argument('--extract-data-uris', dest='data_uri_columns', type=parse_column_spec, default={},
+                        metavar='TABLE.COLUMN[,...]',
+                        help="move base64 data: URIs in these columns into hash-named files and "
+                             "store their relative paths instead")
+    parser.add_argument('--rows-per-statement', type=int, default=None,
+                        help="split INSERT statements and COPY blocks so each holds at most this many rows")
+    parser.add_argument('--max-statement-bytes', type=int, default=None,
+                        help="split INSERT statements and COPY blocks so each stays under this many bytes "
+                             "(a single larger row still gets its own statement)")
+    parser.add_argument('--statements-per-transaction', type=int, default=None,
+                        help="commit after every N INSERT/COPY statements so a failed row only "
+                             "rolls back its own group")
+    parser.add_argument('--fast-load', action='store_true',
+                        help="write a load profile without crash safety: UNLOGGED tables switched to "
+                             "LOGGED after their rows, one transaction per table with COPY FREEZE, "
+                             "and synchronous_commit off")
+    parser.add_argument('--maintenance-work-mem', default=DEFAULT_MAINTENANCE_WORK_MEM,
+                        help="maintenance_work_mem for the post-data index builds with --fast-load "
+                             "(default: %(default)s)")
+    parser.add_argument('--summary-json', metavar='PATH', default=None,
+                        help="also write the conversion log, with wall/CPU time, sizes, replacement "
+                             "counts and peak memory per stage of every file, to PATH as JSON")
+    parser.add_argument('--profile', choices=PROFILERS, default=None,
+                        help="profile the conversion of each file with cProfile (<file>.prof) or "
+                             "tracemalloc (<file>.tracemalloc.txt); tracemalloc is slow")
+    parser.add_argument('--profile-dir', default=None,
+                        help="directory for --profile output (default: profiles/ in the output directory)")
+    parser.add_argument('--span-threshold', type=int, default=DEFAULT_SPAN_THRESHOLD,
+                        help="copy INSERT string literals of at least this many bytes straight from the "
+                             "input to the output without decoding or rewriting them (not with --stream); "
+                             "0 turns this off, "
+                             f"otherwise at least {MIN_SPAN_THRESHOLD} (default: %(default)s)")
+    parser.add_argument('--compress', choices=COMPRESSIONS, default=None,
+                        help="write the converted files compressed, as <table>_postgres.sql.gz, .xz or .bz2")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--target', metavar='DSN', default=None,
+                        help="load the converted SQL straight into this database (a libpq connection "
+                             "string) through psql instead of writing files; DDL first, rows as COPY "
+                             "FROM stdin, keys and foreign keys after the last file")
+    target.add_argument('--temp-cluster', action='store_true',
+                        help="like --target, into a throwaway cluster made with initdb/pg_ctl and removed "
+                             "afterwards, to check that a conversion loads")
+    parser.add_argument('--psql', default='psql', help="psql executable for --target (default: %(default)s)")
+    parser.add_argument('--pg-bin', default=None,
+                        help="directory holding initdb, pg_ctl and psql for --temp-cluster")
+    parser.add_argument('--blob-dir', default=DEFAULT_BLOB_DIR,
+                        help="directory for --extract-data-uris files, relative to the output "
+                             "directory (default: %(default)s)")
+    args = parser.parse_args()
+    if args.fast_load and args.statements_per_transaction:
+        parser.error("--fast-load keeps each table in one transaction; drop --statements-per-transaction")
+    if 0 < args.span_threshold < MIN_SPAN_THRESHOLD:
+        parser.error(f"--span-threshold must be 0 or at least {MIN_SPAN_THRESHOLD}")
+    loading = args.target is not None or args.temp_cluster
+    if loading and (args.binary_tables or args.compress):
+        parser.error("--target and --temp-cluster write no files; drop --binary-tables and --compress")
+    if args.output_format is None:
+        args.output_format = 'copy' if loading else 'insert'
+    return args
+
+def convert(args):
+    """Build the converter the command line asks for and run it"""
     # Create converter instance
-    converter = MySQLToPostgreSQLConverter(database_dir)
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    psql = os.path.join(args.pg_bin, 'psql') if args.pg_bin and args.psql == 'psql' else args.psql
+    converter = MySQLToPostgreSQLConverter(
+        args.directory, streaming=args.stream, chunk_size=args.chunk_size, jobs=jobs,
+        batch_size=args.batch_size, deterministic=args.deterministic, force=args.force,
+        output_format=args.output_format, binary_tables=args.binary_tables,
+        data_uri_columns=args.data_uri_columns, blob_dir=args.blob_dir,
+        rows_per_statement=args.rows_per_statement, max_statement_bytes=args.max_statement_bytes,
+        statements_per_transaction=args.statements_per_transaction,
+        fast_load=args.fast_load, maintenance_work_mem=args.maintenance_work_mem,
+        profile=args.profile, profile_dir=args.profile_dir, span_threshold=args.span_threshold,
+        compress=args.compress, target=args.target, psql=psql,
+    )
     
     # Run conversion
-    converter.run_conversion()
+    converter.run_conversion(args.summary_json)
+
+def main():
+    args = parse_args()
+    
+    if args.temp_cluster:
+        with TemporaryCluster(args.pg_bin) as cluster:
+            print(f"Temporary cluster: {cluster.dsn}")
+            args.target = cluster.dsn
+            convert(args)
+    else:
+        convert(args)
 
 if __name__ == "__main__":
     main()
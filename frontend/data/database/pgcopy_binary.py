@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL binary COPY (PGCOPY) writer for converted INSERT rows
+Moves the rows of chosen tables into .pgcopy files loaded with \\copy
+"""
+
+import os
+import struct
+from datetime import date, datetime
+
+from sql_rows import Raw, insert_column_names, iter_row_values, parse_insert_header
+from sql_schema import base_type, parse_create_table, qualified_name
+
+# File header: signature, flags and header extension length
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('!h', -1)
+
+NULL_FIELD = struct.pack('!i', -1)
+
+# timestamp and date values count from the PostgreSQL epoch
+POSTGRES_EPOCH = datetime(2000, 1, 1)
+POSTGRES_EPOCH_DATE = date(2000, 1, 1)
+
+TEXT_TYPES = frozenset(('TEXT', 'VARCHAR', 'CHAR', 'CHARACTER', 'CHARACTER VARYING'))
+
+INT2 = struct.Struct('!h')
+INT4 = struct.Struct('!i')
+INT8 = struct.Struct('!q')
+FLOAT4 = struct.Struct('!f')
+FLOAT8 = struct.Struct('!d')
+
+
+def _number(value):
+    if isinstance(value, Raw):
+        if value.kind == 'word':
+            return 1 if value.text == 'true' else 0
+        return value.text
+    return value
+
+
+def encode_int2(value):
+    return INT2.pack(int(_number(value)))
+
+
+def encode_int4(value):
+    return INT4.pack(int(_number(value)))
+
+
+def encode_int8(value):
+    return INT8.pack(int(_number(value)))
+
+
+def encode_float4(value):
+    return FLOAT4.pack(float(_number(value)))
+
+
+def encode_float8(value):
+    return FLOAT8.pack(float(_number(value)))
+
+
+def encode_boolean(value):
+    text = str(_number(value)).lower()
+    return b'\x01' if text in ('1', 't', 'true') else b'\x00'
+
+
+def encode_timestamp(value):
+    delta = datetime.fromisoformat(value) - POSTGRES_EPOCH
+    return INT8.pack((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def encode_date(value):
+    return INT4.pack((date.fromisoformat(value[:10]) - POSTGRES_EPOCH_DATE).days)
+
+
+def encode_text(value):
+    # enum_recv and the text types all take the UTF-8 bytes of the value
+    return (value.text if isinstance(value, Raw) else value).encode('utf-8')
+
+
+# PostgreSQL type (as base_type() returns it) to binary field encoder
+BINARY_ENCODERS = {
+    'SMALLINT': encode_int2,
+    'INT2': encode_int2,
+    'INTEGER': encode_int4,
+    'INT': encode_int4,
+    'INT4': encode_int4,
+    'BIGINT': encode_int8,
+    'INT8': encode_int8,
+    'REAL': encode_float4,
+    'DOUBLE PRECISION': encode_float8,
+    'BOOLEAN': encode_boolean,
+    'TIMESTAMP': encode_timestamp,
+    'DATE': encode_date,
+}
+
+
+def column_encoder(column):
+    """Return the binary encoder for a Column, or raise ValueError"""
+    type_name = base_type(column.type)
+    if type_name in BINARY_ENCODERS:
+        return BINARY_ENCODERS[type_name]
+    if type_name in TEXT_TYPES or type_name.endswith('_ENUM'):
+        return encode_text
+    raise ValueError(f"column {column.name} has type {column.type} with no binary encoder")
+
+
+def encode_rows(rows, encoders, column_names):
+    """Encode row value lists as PGCOPY tuples; returns (bytes, row count)"""
+    field_count = INT2.pack(len(encoders))
+    parts = []
+    count = 0
+    for row in rows:
+        if len(row) != len(encoders):
+            raise ValueError(f"row {count + 1} has {len(row)} values for {len(encoders)} columns")
+        parts.append(field_count)
+        for value, encoder, name in zip(row, encoders, column_names):
+            if value is None:
+                parts.append(NULL_FIELD)
+                continue
+            if isinstance(value, Raw) and value.kind == 'expression':
+                raise ValueError(f"row {count + 1}, column {name}: {value.text} cannot be written in binary COPY")
+            try:
+                field = encoder(value)
+            except (ValueError, struct.error) as e:
+                raise ValueError(f"row {count + 1}, column {name}: {value!r}: {e}") from e
+            parts.append(INT4.pack(len(field)))
+            parts.append(field)
+        count += 1
+    return b''.join(parts), count
+
+
+class BinaryCopyTarget:
+    """One .pgcopy file being written for a table"""
+    
+    def __init__(self, path, column_names, encoders):
+        self.path = path
+        self.column_names = column_names
+        self.encoders = encoders
+        self.rows = 0
+        self.file = open(path + '.tmp', 'wb')
+        self.file.write(PGCOPY_HEADER)
+
+
+class BinaryCopyWriter:
+    """Divert the rows of chosen tables from the SQL output into PGCOPY files
+    
+    Fed every converted statement in order: CREATE TABLE supplies the column
+    types and each INSERT for a chosen table is replaced by its leading
+    comments, plus a psql \\copy loader line at the first one.
+    """
+    
+    def __init__(self, tables, directory):
+        self.tables = {qualified_name(table) for table in tables}
+        self.directory = directory
+        self.columns = {}     # table -> [Column] for chosen tables seen so far
+        self.targets = {}     # table -> BinaryCopyTarget
+        self.messages = []
+    
+    def data_filename(self, table):
+        return f"{table}.pgcopy"
+    
+    def wants(self, statement):
+        """Return True when statement is an INSERT whose rows go to a data file"""
+        header = parse_insert_header(statement)
+        return header is not None and qualified_name(header[1].group('table')) in self.columns
+    
+    def take(self, converted):
+        """Return the text to write to the SQL output in place of converted
+        
+        None means the statement is not diverted and is written as usual.
+        """
+        definition = parse_create_table(converted)
+        if definition is not None:
+            table, columns = definition
+            if table in self.tables:
+                self.columns[table] = columns
+            return None
+        
+        header = parse_insert_header(converted)
+        if header is None:
+            return None
+        trivia, match = header
+        table = qualified_name(match.group('table'))
+        if table not in self.columns:
+            return None
+        
+        columns = match.group('columns')
+        column_names = insert_column_names(columns) if columns else [column.name for column in self.columns[table]]
+        target = self.targets.get(table)
+        prefix = trivia
+        if target is None:
+            types = {column.name: column for column in self.columns[table]}
+            try:
+                encoders = []
+                for name in column_names:
+                    if name not in types:
+                        raise ValueError(f"column {name} is not in CREATE TABLE")
+                    encoders.append(column_encoder(types[name]))
+            except ValueError as e:
+                self.messages.append(f"{table}: {e}; rows kept in the SQL file")
+                del self.columns[table]
+                return None
+            path = os.path.join(self.directory, self.data_filename(table))
+            target = self.targets[table] = BinaryCopyTarget(path, column_names, encoders)
+            column_list = f" ({' '.join(columns.split())})" if columns else ''
+            if prefix and not prefix.endswith('\n'):
+                prefix += '\n'
+            prefix += (f"\\copy {match.group('table')}{column_list} "
+                       f"FROM '{self.data_filename(table)}' WITH (FORMAT binary)\n")
+        elif column_names != target.column_names:
+            raise ValueError(f"{table}: INSERT statements list different columns")
+        
+        rows = iter_row_values(converted, len(trivia) + match.end())
+        try:
+            data, count = encode_rows(rows, target.encoders, target.column_names)
+        except ValueError as e:
+            raise ValueError(f"{table}: {e}") from e
+        target.file.write(data)
+        target.rows += count
+        return prefix
+    
+    def close(self):
+        """Finish every data file; returns their file names"""
+        for target in self.targets.values():
+            target.file.write(PGCOPY_TRAILER)
+            target.file.close()
+            os.replace(target.path + '.tmp', target.path)
+        return [os.path.basename(target.path) for target in self.targets.values()]
+    
+    def discard(self):
+        """Drop the partly written data files after an error"""
+        for target in self.targets.values():
+            target.file.close()
+            os.remove(target.path + '.tmp')
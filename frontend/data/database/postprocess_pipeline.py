@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL文件後處理流水線
+把 ENUM DROP、DROP TABLE、序列語法修復和轉換驗證註冊為處理步驟，
+每個文件只解析一次、所有步驟依次處理語句流、最後原子性地寫入一次
+"""
+
+import argparse
+import os
+import re
+import time
+
+from compressed_io import compression_suffix, glob_files, open_file
+from mapped_input import count_lines, open_input
+from sql_lexer import LEADING_TRIVIA_BYTES_PATTERN, CopyData, split_leading_trivia
+
+# 數據庫目錄路徑
+DEFAULT_DATABASE_DIR = r"c:\Users\ken15.小恩\OneDrive\桌面\GURUlaptop\新增ckeditor版本(編輯中 render 用)\MFEE57-laptopGuru-ckeditor\frontend\data\database"
+
+# 已註冊的處理步驟，按註冊順序執行
+PASSES = {}
+
+
+def register_pass(pass_class):
+    """註冊處理步驟"""
+    PASSES[pass_class.name] = pass_class
+    return pass_class
+
+
+class PostProcessPass:
+    """處理步驟基類：逐條處理語句，記錄修改次數和耗時
+
+    文件經記憶體映射按位元組切分成語句；只有匹配 text_trigger 的語句才
+    解碼成文本交給 process()，其餘原樣複製，不解碼也不複製。
+    """
+    name = None
+    description = ''
+    read_only = False
+    # 位元組正則：只有匹配的語句才需要 process()，None 表示每條都要
+    text_trigger = None
+    # 同上，但只在語句開頭（前導註釋之後）匹配，用於只看語句類型的步驟
+    head_trigger = None
+    # 同上，針對 COPY 數據；None 表示不看數據
+    data_trigger = None
+
+    def __init__(self):
+        self.changes = 0
+        self.elapsed = 0.0
+        self.messages = []
+
+    def wants_text(self, data, is_data):
+        """data（位元組）是否需要解碼後交給 process() / process_data()"""
+        if is_data:
+            return self.data_trigger is not None and self.data_trigger.search(data) is not None
+        if self.head_trigger is not None:
+            body = LEADING_TRIVIA_BYTES_PATTERN.match(data).end()
+            return self.head_trigger.match(data, body) is not None
+        return self.text_trigger is None or self.text_trigger.search(data) is not None
+
+    def process(self, statement):
+        """處理一條語句（包含其前面的註釋和空白），返回處理後的文本"""
+        return statement
+
+    def process_data(self, data):
+        """處理 COPY ... FROM stdin 後面的一段數據行（不是 SQL），默認原樣返回"""
+        return data
+
+    def observe(self, data, is_data):
+        """每條語句或數據處理完後以位元組（UTF-8）呼叫，不論是否解碼過"""
+
+    def finish(self):
+        """文件處理完畢時呼叫，返回需要追加到文件末尾的內容"""
+        return ''
+
+
+def normalize_name(name):
+    """去掉引號和 public. 前綴，用於比較表名"""
+    return re.sub(r'^public\.', '', name.replace('"', ''))
+
+
+@register_pass
+class DropEnumTypesPass(PostProcessPass):
+    """在 CREATE TYPE 前添加 DROP TYPE IF EXISTS，避免ENUM重複創建錯誤"""
+    name = 'enum_drop'
+    description = 'ENUM類型 DROP TYPE IF EXISTS'
+    head_trigger = re.compile(rb'(?:CREATE|DROP) TYPE', re.IGNORECASE)
+
+    CREATE_TYPE_PATTERN = re.compile(r'CREATE TYPE\s+(\w+)\s+AS\s+ENUM\s*\([^)]+\);', re.IGNORECASE)
+    DROP_TYPE_PATTERN = re.compile(r'DROP TYPE IF EXISTS\s+(\w+)', re.IGNORECASE)
+
+    def __init__(self):
+        super().__init__()
+        self.enum_types = []
+        self.dropped = set()
+
+    def process(self, statement):
+        trivia, body = split_leading_trivia(statement)
+
+        drop_type = self.DROP_TYPE_PATTERN.match(body)
+        if drop_type:
+            self.dropped.add(drop_type.group(1))
+            return statement
+
+        create_type = self.CREATE_TYPE_PATTERN.match(body)
+        if not create_type:
+            return statement
+
+        enum_type = create_type.group(1)
+        self.enum_types.append(enum_type)
+        if enum_type in self.dropped:
+            return statement
+
+        # 在 CREATE TYPE 前插入 DROP 語句
+        drop_section = ''
+        if not self.changes:
+            drop_section += "\n-- 刪除現有的 ENUM 類型（如果存在）\n"
+        drop_section += f"DROP TYPE IF EXISTS {enum_type} CASCADE;\n"
+
+        self.dropped.add(enum_type)
+        self.changes += 1
+        self.messages.append(f"  添加: DROP TYPE IF EXISTS {enum_type}")
+        return trivia + drop_section + body
+
+
+@register_pass
+class DropTableIfExistsPass(PostProcessPass):
+    """在 CREATE TABLE 前添加 DROP TABLE IF EXISTS，避免表格已存在錯誤"""
+    name = 'table_drop'
+    description = 'DROP TABLE IF EXISTS'
+    head_trigger = re.compile(rb'CREATE\s+(?:UNLOGGED\s+)?TABLE|DROP TABLE', re.IGNORECASE)
+
+    CREATE_TABLE_PATTERN = re.compile(r'CREATE\s+(?:UNLOGGED\s+)?TABLE\s+((?:public\.)?[\w"]+)\s*\(', re.IGNORECASE)
+    DROP_TABLE_PATTERN = re.compile(r'DROP TABLE IF EXISTS\s+((?:public\.)?[\w"]+)', re.IGNORECASE)
+
+    def __init__(self):
+        super().__init__()
+        self.dropped = set()
+
+    def process(self, statement):
+        trivia, body = split_leading_trivia(statement)
+
+        drop_table = self.DROP_TABLE_PATTERN.match(body)
+        if drop_table:
+            self.dropped.add(normalize_name(drop_table.group(1)))
+            return statement
+
+        create_table = self.CREATE_TABLE_PATTERN.match(body)
+        if not create_table or normalize_name(create_table.group(1)) in self.dropped:
+            return statement
+
+        table_name = create_table.group(1)
+        self.dropped.add(normalize_name(table_name))
+        self.changes += 1
+        self.messages.append(f"  添加: DROP TABLE IF EXISTS {table_name}")
+        return f"{trivia}-- 如果表格已存在則刪除\nDROP TABLE IF EXISTS {table_name} CASCADE;\n\n{body}"
+
+
+def _reset_block(setval_call):
+    return f"-- 重置序列到下一個可用ID\nDO $$\nBEGIN\n    PERFORM {setval_call};\nEND $$;"
+
+
+@register_pass
+class SequenceSyntaxPass(PostProcessPass):
+    """將 SELECT setval() 替換為正確的序列重置語法"""
+    name = 'sequence'
+    description = '序列重置語法'
+    text_trigger = re.compile(rb'setval')
+
+    # 模式1: SELECT setval('sequence_name', (SELECT MAX(column) FROM table), true);
+    # 模式2: SELECT setval('sequence_name', (SELECT MAX(column) FROM table));
+    # 模式5: 帶有public schema的setval（已由模式2覆蓋，保留同樣的輸出）
+    MAX_PATTERN = re.compile(r"SELECT setval\('([^']+)',\s*\(SELECT MAX\(([^)]+)\) FROM ([^)]+)\)(?:,\s*true)?\);")
+    # 模式3: SELECT setval('sequence_name', number, false);
+    NUMBER_PATTERN = re.compile(r"SELECT setval\('([^']+)',\s*(\d+),\s*false\);")
+    # 模式4: 複雜的 pg_get_serial_sequence 語法
+    SERIAL_PATTERN = re.compile(
+        r"SELECT setval\(pg_get_serial_sequence\('([^']+)',\s*'([^']+)'\),\s*COALESCE\(MAX\(([^)]+)\),\s*1\)\)\s*FROM\s+([^;]+);"
+    )
+
+    def process(self, statement):
+        if 'setval' not in statement:
+            return statement
+        statement = self.MAX_PATTERN.sub(self._replace_max, statement)
+        statement = self.NUMBER_PATTERN.sub(self._replace_number, statement)
+        statement = self.SERIAL_PATTERN.sub(self._replace_serial, statement)
+        return statement
+
+    def _replace_max(self, match):
+        seq_name, column_name, table_name = match.groups()
+        self.changes += 1
+        self.messages.append(f"  修復: {seq_name} 序列重置")
+        return _reset_block(
+            f"setval('{seq_name}', COALESCE((SELECT MAX({column_name}) FROM {table_name}), 0) + 1, false)"
+        )
+
+    def _replace_number(self, match):
+        seq_name, number = match.groups()
+        self.changes += 1
+        self.messages.append(f"  修復: {seq_name} 序列重置到 {number}")
+        return f"ALTER SEQUENCE {seq_name} RESTART WITH {number};"
+
+    def _replace_serial(self, match):
+        table_name, column, max_column, from_table = match.groups()
+        seq_name = f"{table_name.replace('public.', '')}_{column}_seq"
+        self.changes += 1
+        self.messages.append(f"  修復: {seq_name} 序列重置")
+        return _reset_block(
+            f"setval(pg_get_serial_sequence('{table_name}', '{column}'), "
+            f"COALESCE((SELECT MAX({max_column}) FROM {from_table}), 0) + 1, false)"
+        )
+
+
+@register_pass
+class ValidationPass(PostProcessPass):
+    """驗證PostgreSQL轉換質量（只讀，不修改文件）
+
+    所有檢查規則合併為一個正則，字符串、帶引號的標識符和注釋整體跳過，
+    所以數據裡的反引號、TINYINT 等不會誤報；大多數語句沒有候選詞，
+    在位元組上一次 search 即可跳過，不必解碼。每處問題記錄行號和列號。
+    """
+    name = 'validate'
+    description = '轉換質量驗證'
+    read_only = True
+
+    # 检查是否还有MySQL特有语法：規則名 -> 說明，順序即報告順序
+    RULES = {
+        'auto_increment': 'MySQL AUTO_INCREMENT 未转换',
+        'engine': 'MySQL ENGINE 未转换',
+        'charset': 'MySQL CHARSET 未转换',
+        'backtick': '仍有MySQL反引号',
+        'zero_date': 'MySQL零日期未转换',
+        'tinyint': 'TINYINT未转换为SMALLINT',
+        'datetime': 'DATETIME未转换为TIMESTAMP',
+    }
+    SCAN_PATTERN = re.compile(r"""
+        (?P<zero_date>'0000-00-00[^'\\]*')
+      | '[^'\\]*(?:(?:\\.|'')[^'\\]*)*'
+      | "[^"\\]*(?:(?:\\.|"")[^"\\]*)*"
+      | \$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$
+      | --[^\n]*|/\*.*?\*/
+      | (?P<backtick>`[^`]+`)
+      | \b(?P<auto_increment>AUTO_INCREMENT)\b
+      | \b(?P<engine>ENGINE)\s*=
+      | \b(?P<charset>CHARSET)\s*=
+      | \b(?P<tinyint>TINYINT)\b
+      | \b(?P<datetime>DATETIME)\b
+    """, re.IGNORECASE | re.DOTALL | re.VERBOSE)
+    # 只有含這些片段的語句（或還要從中找表名的 CREATE TABLE）才需要解碼後逐個記號掃描
+    text_trigger = re.compile(
+        rb"`|'0000-00-00|AUTO_INCREMENT|ENGINE|CHARSET|TINYINT|DATETIME|CREATE\s+(?:UNLOGGED\s+)?TABLE", re.IGNORECASE
+    )
+    data_trigger = re.compile(rb'0000-00-00')
+    CANDIDATE_PATTERN = re.compile(r"`|'0000-00-00|AUTO_INCREMENT|ENGINE|CHARSET|TINYINT|DATETIME", re.IGNORECASE)
+    # COPY 數據裡整個字段是零日期
+    COPY_ZERO_DATE_PATTERN = re.compile(r'(?:^|\t)(0000-00-00[^\t\n]*)', re.MULTILINE)
+    INSERT_PATTERN = re.compile(rb'^INSERT INTO', re.MULTILINE)
+    CREATE_TABLE_PATTERN = re.compile(r'CREATE\s+(?:UNLOGGED\s+)?TABLE\s+"?(\w+)"?', re.IGNORECASE)
+
+    # 每個文件最多保留的問題明細，計數不受限制
+    MAX_FINDINGS = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.counts = dict.fromkeys(self.RULES, 0)
+        self.findings = []      # {'line', 'column', 'rule', 'message', 'text'}
+        self.insert_count = 0
+        self.table_name = None
+        self.size = 0           # 位元組
+        self.line = 1           # 當前語句開頭所在行
+        self.issues = []
+
+    def process(self, statement):
+        if self.CANDIDATE_PATTERN.search(statement):
+            for match in self.SCAN_PATTERN.finditer(statement):
+                rule = match.lastgroup
+                if rule in self.RULES:
+                    self._record(statement, match.start(rule), rule, match.group(rule))
+        if self.table_name is None:
+            create_table = self.CREATE_TABLE_PATTERN.search(statement)
+            if create_table:
+                self.table_name = create_table.group(1)
+        return statement
+
+    def process_data(self, data):
+        for match in self.COPY_ZERO_DATE_PATTERN.finditer(data):
+            self._record(data, match.start(1), 'zero_date', match.group(1))
+        return data
+
+    def observe(self, data, is_data):
+        if not is_data:
+            self.insert_count += len(self.INSERT_PATTERN.findall(data))
+        self.size += len(data)
+        self.line += count_lines(data)
+
+    def _record(self, text, offset, rule, found):
+        self.counts[rule] += 1
+        if len(self.findings) < self.MAX_FINDINGS:
+            line_start = text.rfind('\n', 0, offset) + 1
+            self.findings.append({
+                'line': self.line + text.count('\n', 0, offset),
+                'column': offset - line_start + 1,
+                'rule': rule,
+                'message': self.RULES[rule],
+                'text': found[:80],
+            })
+
+    def finish(self):
+        self.issues = [
+            f"{message}: 发现 {self.counts[rule]} 处"
+            for rule, message in self.RULES.items() if self.counts[rule]
+        ]
+        return ''
+
+
+def run_pipeline(file_path, pass_names=None):
+    """對單個文件依次執行處理步驟：只讀一次，有修改時原子性地寫入一次
+
+    返回各步驟的實例（包含修改次數、耗時和訊息）
+    """
+    passes = [PASSES[name]() for name in (pass_names or PASSES)]
+    read_only = all(step.read_only for step in passes)
+    temp_path = file_path + '.tmp'
+
+    with open_input(file_path) as mapped:
+        # 壓縮文件（.gz/.xz/.bz2）邊解壓邊處理，寫回時用同一種壓縮
+        output = None if read_only else open_file(temp_path, 'wb', compression_suffix(file_path))
+        try:
+            for start, end, is_data in mapped.iter_spans():
+                # 語句先以記憶體映射上的位元組切片傳遞；某個步驟需要時才解碼，
+                # 有步驟改動了文本才重新編碼
+                data = mapped.span(start, end)
+                statement = None
+                for step in passes:
+                    begin = time.perf_counter()
+                    if statement is None and step.wants_text(data, is_data):
+                        statement = mapped.text(start, end)
+                        if is_data:
+                            statement = CopyData(statement)
+                    if statement is not None:
+                        processed = step.process_data(statement) if is_data else step.process(statement)
+                        if processed != statement:
+                            data = processed.encode('utf-8')
+                        statement = processed
+                    step.observe(data, is_data)
+                    step.elapsed += time.perf_counter() - begin
+                if output:
+                    output.write(data)
+                if isinstance(data, memoryview):
+                    data.release()
+
+            for step in passes:
+                begin = time.perf_counter()
+                trailer = step.finish()
+                step.elapsed += time.perf_counter() - begin
+                if trailer and output:
+                    step.changes += 1
+                    output.write(trailer.encode('utf-8'))
+        finally:
+            if output:
+                output.close()
+
+    if not read_only:
+        if any(step.changes for step in passes):
+            os.replace(temp_path, file_path)
+        else:
+            os.remove(temp_path)
+    return passes
+
+
+def process_statements(statements, pass_names=None):
+    """對語句流依次執行處理步驟，逐條產出處理後的語句，不讀寫文件
+
+    statements 為 sql_lexer.iter_statements 產出的語句和 CopyData，
+    用於轉換結果不落地、直接送入資料庫的情況（mysql_to_postgres_bulk.py --target）。
+    默認執行所有會修改語句的步驟；CopyData 處理後仍是 CopyData。
+    """
+    names = pass_names or [name for name, pass_class in PASSES.items() if not pass_class.read_only]
+    passes = [PASSES[name]() for name in names]
+    for statement in statements:
+        is_data = isinstance(statement, CopyData)
+        for step in passes:
+            if is_data:
+                processed = step.process_data(statement)
+                statement = processed if isinstance(processed, CopyData) else CopyData(processed)
+            else:
+                statement = step.process(statement)
+        yield statement
+
+    for step in passes:
+        trailer = step.finish()
+        if trailer:
+            step.changes += 1
+            yield trailer
+
+
+def print_pass_report(passes):
+    """打印各步驟的修改次數和耗時"""
+    for step in passes:
+        print(f"  [{step.name}] {step.description}: {step.changes} 處修改, {step.elapsed * 1000:.1f} ms")
+        for message in step.messages:
+            print(f"  {message}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="PostgreSQL文件後處理流水線")
+    parser.add_argument('directory', nargs='?', default=DEFAULT_DATABASE_DIR, help="PostgreSQL文件所在目錄")
+    parser.add_argument('--passes', default=','.join(PASSES),
+                        help="要執行的步驟，逗號分隔（默認: %(default)s）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pass_names = [name.strip() for name in args.passes.split(',') if name.strip()]
+
+    print("PostgreSQL後處理流水線")
+    print(f"步驟: {', '.join(pass_names)}")
+    print("=" * 60)
+
+    # 找到所有PostgreSQL文件
+    postgres_files = glob_files(args.directory, "*_postgres.sql")
+
+    if not postgres_files:
+        print("未找到PostgreSQL文件")
+        return
+
+    print(f"找到 {len(postgres_files)} 個PostgreSQL文件")
+    print("-" * 40)
+
+    totals = {name: [0, 0.0] for name in pass_names}
+    modified_files = 0
+    for file_path in postgres_files:
+        print(f"處理文件: {os.path.basename(file_path)}")
+        passes = run_pipeline(file_path, pass_names)
+        print_pass_report(passes)
+
+        for step in passes:
+            totals[step.name][0] += step.changes
+            totals[step.name][1] += step.elapsed
+            if isinstance(step, ValidationPass):
+                for issue in step.issues:
+                    print(f"    - {issue}")
+        if any(step.changes for step in passes if not step.read_only):
+            modified_files += 1
+        print()
+
+    print("=" * 60)
+    print("處理完成！")
+    print(f"總文件數: {len(postgres_files)}")
+    print(f"已修改文件: {modified_files}")
+    for name, (changes, elapsed) in totals.items():
+        print(f"  {name}: {changes} 處修改, {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
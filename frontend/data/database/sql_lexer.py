@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Single-pass SQL lexer for the MySQL to PostgreSQL conversion scripts
+Tells keywords/identifiers, string literals and comments apart in one scan
+"""
+
+import re
+from collections import deque
+
+# One compiled alternation scanned left to right: every character of the
+# input belongs to exactly one token, so a full scan is linear in its size.
+# String literals use the unrolled-loop form so 500 KB base64 values are
+# consumed by the regex engine in one step without backtracking.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+  | (?P<string>'[^'\\]*(?:(?:\\.|'')[^'\\]*)*')
+  | (?P<quoted>"[^"\\]*(?:(?:\\.|"")[^"\\]*)*")
+  | (?P<backtick>`[^`]*(?:``[^`]*)*`)
+  | (?P<dollar>\$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<space>\s+)
+  | (?P<punct>.)
+""", re.DOTALL | re.VERBOSE)
+
+# Tokens that never change the meaning of a statement
+INSIGNIFICANT = frozenset(('space', 'comment'))
+
+
+def tokenize(sql_content):
+    """Yield (kind, text) tokens for sql_content in a single left-to-right scan"""
+    for match in TOKEN_PATTERN.finditer(sql_content):
+        yield match.lastgroup, match.group()
+
+
+class TokenStream:
+    """Lazy token iterator with lookahead, yielding re match objects
+    
+    Rewrites only need a few tokens of context, so the full token list is
+    never built; match positions let callers copy unchanged input by slice.
+    """
+    
+    def __init__(self, sql_content, start=0):
+        self._matches = TOKEN_PATTERN.finditer(sql_content, start)
+        self._lookahead = deque()
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self._lookahead:
+            return self._lookahead.popleft()
+        return next(self._matches)
+    
+    def peek(self, count, significant=True):
+        """Return up to count upcoming tokens without consuming them
+        
+        With significant=True, space and comment tokens are skipped over.
+        """
+        found = []
+        index = 0
+        while len(found) < count:
+            if index == len(self._lookahead):
+                token = next(self._matches, None)
+                if token is None:
+                    break
+                self._lookahead.append(token)
+            token = self._lookahead[index]
+            index += 1
+            if not significant or token.lastgroup not in INSIGNIFICANT:
+                found.append(token)
+        return found
+    
+    def consume(self, count, significant=True):
+        """Drop the next count tokens (and any space/comment before them); return the last one"""
+        token = None
+        while count:
+            token = next(self, None)
+            if token is None:
+                break
+            if not significant or token.lastgroup not in INSIGNIFICANT:
+                count -= 1
+        return token
+    
+    def skip_insignificant(self):
+        """Drop upcoming space/comment tokens; return the last one dropped, or None"""
+        token = None
+        while self.peek(1, significant=False) and self.peek(1, significant=False)[0].lastgroup in INSIGNIFICANT:
+            token = next(self)
+        return token
+
+
+def unquote_identifier(kind, text):
+    """Return the bare name of a word, `backtick` or "quoted" identifier token"""
+    if kind == 'backtick':
+        return text[1:-1].replace('``', '`')
+    if kind == 'quoted':
+        return text[1:-1].replace('""', '"')
+    return text
+
+
+def quote_identifier(name):
+    """Quote name as a PostgreSQL identifier"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+
+# Statement boundary scanner for streamed input: complete literals, comments
+# and plain runs are skipped, ';' ends a statement, and an opening quote,
+# dollar quote or comment marker without its terminator means the token
+# continues in the next chunk.
+STATEMENT_PATTERN = re.compile(r"""
+    (?P<skip>'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'
+           |"[^"\\]*(?:(?:\\.|"")[^"\\]*)*"
+           |`[^`]*(?:``[^`]*)*`
+           |\$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$
+           |--[^\n]*\n|\#[^\n]*\n|/\*.*?\*/
+           |[^'"`;\-\#/$]+)
+  | (?P<end>;)
+  | (?P<partial>['"`\#]|--|/\*|\$(?:[A-Za-z_]\w*)?\$)
+  | (?P<other>[-/$])
+""", re.DOTALL | re.VERBOSE)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# A statement after which raw data lines follow, up to a line holding only \.
+COPY_FROM_STDIN_PATTERN = re.compile(r'COPY\b[^;]*\bFROM\s+STDIN\b', re.IGNORECASE)
+
+COPY_DATA_END = '\n\\.\n'
+
+
+class CopyData(str):
+    """Data lines of a COPY ... FROM stdin block as yielded by iter_statements
+    
+    Not SQL: callers that inspect statements should pass these through.
+    """
+    __slots__ = ()
+
+
+def is_copy_from_stdin(statement):
+    """Return True when statement (after any leading comments) is COPY ... FROM stdin"""
+    end = LEADING_TRIVIA_PATTERN.match(statement).end()
+    return COPY_FROM_STDIN_PATTERN.match(statement, end) is not None
+
+
+def _copy_data_end(buffer, start, scan):
+    """Return the offset just past the \\. line of COPY data in buffer, or -1"""
+    if buffer.startswith(COPY_DATA_END[1:], start):
+        # The previous piece ended on a line break
+        return start + len(COPY_DATA_END) - 1
+    end = buffer.find(COPY_DATA_END, scan)
+    return end + len(COPY_DATA_END) if end >= 0 else -1
+
+
+def iter_statements(stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield statements from a text stream, each including its terminating ';'
+    
+    Leading comments and whitespace stay attached to the statement that
+    follows them, so ''.join() of the output reproduces the input exactly.
+    Memory is bounded by chunk_size plus the largest single statement.
+    
+    The data lines after a COPY ... FROM stdin statement are yielded as
+    CopyData pieces of about chunk_size, the last one ending with the \\.
+    line, so table data never has to fit in memory at once.
+    """
+    buffer = ''
+    scan = 0
+    read_size = chunk_size
+    eof = False
+    in_copy = False
+    
+    while not eof:
+        chunk = stream.read(read_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+        
+        start = 0
+        while True:
+            if in_copy:
+                end = _copy_data_end(buffer, start, scan)
+                if end < 0 and eof:
+                    end = len(buffer)
+                elif end < 0:
+                    # Hand over whole lines; the terminator may straddle chunks
+                    last_line = buffer.rfind('\n', start, len(buffer) - 3) + 1
+                    if last_line - start >= chunk_size:
+                        yield CopyData(buffer[start:last_line])
+                        start = last_line
+                    scan = max(start, len(buffer) - len(COPY_DATA_END) + 1)
+                    break
+                if end > start:
+                    yield CopyData(buffer[start:end])
+                start = scan = end
+                in_copy = False
+                continue
+            
+            match = STATEMENT_PATTERN.match(buffer, scan)
+            if match is None:
+                break
+            if not eof and (match.lastgroup == 'partial' or match.end() == len(buffer)):
+                # The token may continue in the next chunk
+                break
+            scan = match.end()
+            if match.lastgroup == 'end':
+                statement = buffer[start:scan]
+                yield statement
+                start = scan
+                in_copy = is_copy_from_stdin(statement)
+        
+        buffer = buffer[start:]
+        scan -= start
+        # Grow reads while one statement spans many chunks so that rescanning
+        # an unfinished literal stays linear overall
+        read_size = max(chunk_size, len(buffer))
+    
+    if buffer:
+        yield CopyData(buffer) if in_copy else buffer
+
+
+class TextPieces:
+    """A read-only text stream over an iterable of strings, for iter_statements()
+    
+    Lets SQL that is produced piece by piece (a converter's output, say)
+    be split into statements as it is produced, without joining it first.
+    Pieces are taken from the iterable only as read() needs them.
+    """
+    
+    def __init__(self, pieces):
+        self._pieces = iter(pieces)
+        self._piece = ''
+        self._offset = 0
+    
+    def read(self, size=-1):
+        parts = []
+        wanted = size
+        while wanted:
+            if self._offset >= len(self._piece):
+                self._piece = next(self._pieces, None)
+                self._offset = 0
+                if self._piece is None:
+                    self._piece = ''
+                    break
+            end = len(self._piece) if wanted < 0 else self._offset + wanted
+            part = self._piece[self._offset:end]
+            self._offset += len(part)
+            if wanted > 0:
+                wanted -= len(part)
+            parts.append(part)
+        return ''.join(parts)
+
+
+# Bytes counterpart of STATEMENT_PATTERN for input that is addressable as a
+# whole (a memory map). Every delimiter is ASCII and UTF-8 never uses ASCII
+# bytes inside a multi-byte character, so scanning undecoded bytes finds the
+# same boundaries. One match consumes up to 4096 tokens: few Python-level
+# steps per statement, and the regex engine's backtracking stack stays small.
+STATEMENT_RUN_PATTERN = re.compile(rb"""
+    (?:'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'
+      |"[^"\\]*(?:(?:\\.|"")[^"\\]*)*"
+      |`[^`]*(?:``[^`]*)*`
+      |\$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$
+      |--[^\n]*\n|\#[^\n]*\n|/\*.*?\*/
+      |[^'"`;\-\#/$]+
+      |['"`\-\#/$]
+    ){1,4096}
+""", re.DOTALL | re.VERBOSE)
+
+COPY_FROM_STDIN_BYTES_PATTERN = re.compile(COPY_FROM_STDIN_PATTERN.pattern.encode('ascii'), re.IGNORECASE)
+# The \. line; text streams have their line ends translated already, bytes may
+# still hold Windows line ends
+COPY_DATA_END_BYTES_PATTERN = re.compile(rb'\n\\\.\r?\n')
+COPY_DATA_END_AT_START_PATTERN = re.compile(rb'\\\.\r?\n')
+
+
+def iter_statement_spans(buffer, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (start, end, is_data) for the statements of a bytes-like buffer
+    
+    The bytes counterpart of iter_statements for a buffer holding the whole
+    input, such as an mmap: nothing is decoded or copied, and the spans
+    split the buffer exactly as iter_statements splits the decoded text.
+    COPY data comes in spans of about chunk_size ending on a line break,
+    with is_data set. buffer needs find() and rfind() (bytes or mmap).
+    """
+    size = len(buffer)
+    start = 0
+    while start < size:
+        scan = start
+        while True:
+            match = STATEMENT_RUN_PATTERN.match(buffer, scan)
+            if match is None:
+                break
+            scan = match.end()
+        if scan == size:
+            yield start, size, False
+            return
+        end = scan + 1      # the ';'
+        yield start, end, False
+        
+        body = LEADING_TRIVIA_BYTES_PATTERN.match(buffer, start, end).end()
+        start = end
+        if COPY_FROM_STDIN_BYTES_PATTERN.match(buffer, body, end) is None:
+            continue
+        
+        terminator = COPY_DATA_END_AT_START_PATTERN.match(buffer, start) \
+            or COPY_DATA_END_BYTES_PATTERN.search(buffer, start)
+        data_end = terminator.end() if terminator else size
+        while data_end - start > chunk_size:
+            cut = buffer.rfind(b'\n', start, start + chunk_size) + 1
+            if cut <= start:
+                # One line longer than chunk_size
+                cut = buffer.find(b'\n', start + chunk_size, data_end) + 1 or data_end
+            yield start, cut, True
+            start = cut
+        if data_end > start:
+            yield start, data_end, True
+        start = data_end
+
+
+# Tuple scanner for INSERT ... VALUES statements: literals and comments are
+# skipped whole, so only parentheses outside them change the nesting depth.
+ROW_PATTERN = re.compile(r"""
+    (?P<skip>'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'
+           |"[^"\\]*(?:(?:\\.|"")[^"\\]*)*"
+           |`[^`]*(?:``[^`]*)*`
+           |\$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$
+           |--[^\n]*|\#[^\n]*|/\*.*?\*/
+           |[^'"`\-\#/()$]+|[-/$])
+  | (?P<open>\()
+  | (?P<next_row>\)\s*,)
+  | (?P<close>\))
+""", re.DOTALL | re.VERBOSE)
+
+# Separator plus a whole row tuple without nested parentheses or comments,
+# matched in one go; anything else is walked with ROW_PATTERN. A literal
+# without a backslash before its closing quote or a doubled quote is read as
+# '[^']*', which sre runs several times faster than a class of two or more
+# characters; only the others take the escape-aware form. The lookaheads
+# give every literal a single parse, so a row that does not match fails
+# without backtracking through the alternatives.
+FLAT_ROW_PATTERN = re.compile(r"""
+    [\s,]*
+    (?P<row>\(
+        [^'"`()\-\#/]*
+        (?:(?:'[^']*(?<!\\)'(?!')
+            |"[^"]*(?<!\\)"(?!")
+            |(?!'[^']*(?<!\\)'(?!'))'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'(?!')
+            |(?!"[^"]*(?<!\\)"(?!"))"[^"\\]*(?:(?:\\.|"")[^"\\]*)*"(?!")
+            |-(?!-)|/(?!\*)
+        )[^'"`()\-\#/]*)*
+    \))
+""", re.DOTALL | re.VERBOSE)
+
+# Whitespace, commas and comments between row tuples
+ROW_GAP_PATTERN = re.compile(r'(?:\s+|,|--[^\n]*|\#[^\n]*|/\*.*?\*/)*', re.DOTALL)
+
+# Whitespace, comments and psql meta-command lines (\copy ...) in front of a statement
+LEADING_TRIVIA_PATTERN = re.compile(
+    r'(?:\s+|--[^\n]*(?:\n|$)|\#[^\n]*(?:\n|$)|/\*.*?\*/|\\[^\n]*(?:\n|$))*', re.DOTALL
+)
+
+LEADING_TRIVIA_BYTES_PATTERN = re.compile(LEADING_TRIVIA_PATTERN.pattern.encode('ascii'), re.DOTALL)
+
+INSERT_START_PATTERN = re.compile(r'INSERT\b', re.IGNORECASE)
+INSERT_START_BYTES_PATTERN = re.compile(rb'INSERT\b', re.IGNORECASE)
+
+
+def split_leading_trivia(statement):
+    """Split statement into (leading whitespace/comments, statement body)"""
+    end = LEADING_TRIVIA_PATTERN.match(statement).end()
+    return statement[:end], statement[end:]
+
+
+def is_insert_statement(statement):
+    """Return True when statement (after any leading comments) is an INSERT"""
+    end = LEADING_TRIVIA_PATTERN.match(statement).end()
+    return INSERT_START_PATTERN.match(statement, end) is not None
+
+
+def is_insert_span(buffer, start, end):
+    """is_insert_statement for buffer[start:end] of a bytes-like buffer, without decoding it"""
+    body = LEADING_TRIVIA_BYTES_PATTERN.match(buffer, start, end).end()
+    return INSERT_START_BYTES_PATTERN.match(buffer, body, end) is not None
+
+
+def split_insert_rows(statement, batch_size):
+    """Split an INSERT ... VALUES statement into pieces of about batch_size characters
+    
+    Cuts are made only right after the comma that follows a complete row
+    tuple, so every piece tokenizes exactly as it would inside the whole
+    statement and ''.join(pieces) == statement.
+    """
+    if len(statement) <= batch_size:
+        return [statement]
+    
+    pieces = []
+    start = 0
+    depth = 0
+    for match in ROW_PATTERN.finditer(statement):
+        kind = match.lastgroup
+        if kind == 'open':
+            depth += 1
+        elif kind == 'close':
+            depth -= 1
+        elif kind == 'next_row':
+            depth -= 1
+            if depth == 0 and match.end() - start >= batch_size:
+                pieces.append(statement[start:match.end()])
+                start = match.end()
+    pieces.append(statement[start:])
+    return pieces
+
+
+def iter_row_spans(statement, start=0):
+    """Yield (start, end) of every top-level (...) row tuple from start onwards
+    
+    Flat tuples take one FLAT_ROW_PATTERN match each; from the first tuple
+    that needs more (a function call, a comment) the rest is walked token
+    by token. The pattern's scanner anchors every match where the last one
+    ended, so the flat tuples are contiguous without a check per row.
+    """
+    match = None
+    for match in iter(FLAT_ROW_PATTERN.scanner(statement, start).match, None):
+        yield match.span('row')
+    position = start if match is None else match.end()
+    yield from _walk_row_spans(statement, ROW_GAP_PATTERN.match(statement, position).end())
+
+
+def _walk_row_spans(statement, start):
+    depth = 0
+    row_start = None
+    for match in ROW_PATTERN.finditer(statement, start):
+        kind = match.lastgroup
+        if kind == 'open':
+            if depth == 0:
+                row_start = match.start()
+            depth += 1
+        elif kind == 'close' or kind == 'next_row':
+            depth -= 1
+            if depth == 0:
+                yield row_start, match.start() + 1
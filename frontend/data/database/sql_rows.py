@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Row-level view of INSERT ... VALUES statements
+Decodes each row tuple into Python values and writes COPY text format
+"""
+
+import calendar
+import re
+from collections import namedtuple
+
+from sql_lexer import (
+    INSIGNIFICANT, ROW_GAP_PATTERN, TokenStream, is_copy_from_stdin, iter_row_spans, split_leading_trivia, tokenize,
+    unquote_identifier,
+)
+
+INSERT_HEADER_PATTERN = re.compile(r"""
+    INSERT\s+(?:IGNORE\s+)?INTO\s+
+    (?P<table>`[^`]*(?:``[^`]*)*`|"[^"]*(?:""[^"]*)*"|[\w.$]+)\s*
+    (?:\((?P<columns>[^()]*)\)\s*)?
+    VALUES\s*
+""", re.IGNORECASE | re.VERBOSE)
+
+# Unquoted SQL in a row: kind is 'number', 'word' (TRUE/FALSE) or
+# 'expression' for anything that would need evaluating, such as NOW()
+Raw = namedtuple('Raw', 'kind text')
+
+# One literal row value and the ',' or ')' after it
+SIMPLE_VALUE_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<string>'[^'\\]*(?:(?:\\.|'')[^'\\]*)*')
+      | (?P<number>[+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<word>NULL|TRUE|FALSE)
+    )\s*(?P<end>[,)])
+""", re.IGNORECASE | re.DOTALL | re.VERBOSE)
+
+WORD_VALUES = {'NULL': None, 'TRUE': Raw('word', 'true'), 'FALSE': Raw('word', 'false')}
+
+# MySQL string escapes; \% and \_ keep their backslash outside LIKE
+MYSQL_ESCAPES = {
+    '0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a',
+    '%': '\\%', '_': '\\_',
+}
+
+MYSQL_ESCAPE_PATTERN = re.compile(r"\\(.)|''", re.DOTALL)
+
+# COPY text format: backslash, tab and line breaks are the only characters
+# that cannot appear literally in a column value
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+COPY_NULL = '\\N'
+
+# Date values MySQL keeps as zero-dates; dumps set a non-strict SQL_MODE, in
+# which impossible dates such as 2024-11-31 are stored as zero-dates too
+DATE_PATTERN = re.compile(r'(\d{4})-(\d\d)-(\d\d)')
+
+
+def _unescape(match):
+    char = match.group(1)
+    if char is None:
+        return "'"
+    return MYSQL_ESCAPES.get(char, char)
+
+
+def string_value(text):
+    """Decode a MySQL 'string' token into the text it stands for"""
+    body = text[1:-1]
+    if '\\' not in body and "''" not in body:
+        return body
+    return MYSQL_ESCAPE_PATTERN.sub(_unescape, body)
+
+
+def is_zero_date(value):
+    """True for a date value MySQL stores as a zero-date, which becomes NULL in PostgreSQL"""
+    match = DATE_PATTERN.match(value)
+    if match is None:
+        return False
+    year, month, day = match.groups()
+    if '01' <= month <= '12' and '01' <= day <= '28':
+        return year == '0000'
+    if year == '0000' or not '01' <= month <= '12' or day == '00':
+        return True
+    return int(day) > calendar.monthrange(int(year), int(month))[1]
+
+
+def _make_value(tokens):
+    """Turn the significant tokens of one row value into None, str or Raw"""
+    if len(tokens) == 1:
+        kind = tokens[0].lastgroup
+        text = tokens[0].group()
+        if kind == 'string':
+            return string_value(text)
+        if kind == 'number':
+            return Raw('number', text)
+        if kind == 'word':
+            upper = text.upper()
+            if upper == 'NULL':
+                return None
+            if upper in ('TRUE', 'FALSE'):
+                return Raw('word', upper.lower())
+    elif len(tokens) == 2 and tokens[0].group() in '+-' and tokens[1].lastgroup == 'number':
+        return Raw('number', tokens[0].group().lstrip('+') + tokens[1].group())
+    
+    if not tokens:
+        return Raw('expression', '')
+    return Raw('expression', tokens[0].string[tokens[0].start():tokens[-1].end()])
+
+
+def _read_value(tokens):
+    """Consume one row value; return it with the ',' or ')' token that ended it"""
+    parts = []
+    depth = 0
+    for token in tokens:
+        if token.lastgroup in INSIGNIFICANT:
+            continue
+        text = token.group()
+        if depth == 0 and (text == ',' or text == ')'):
+            return _make_value(parts), token
+        if text == '(':
+            depth += 1
+        elif text == ')':
+            depth -= 1
+        parts.append(token)
+    raise ValueError('unterminated row tuple')
+
+
+def iter_row_values(sql_content, start=0):
+    """Yield a list of values for every (...) row tuple from start onwards
+    
+    Strings come back decoded, NULL as None and anything unquoted as a Raw.
+    Works on a whole VALUES list or on one piece of it from split_insert_rows.
+    Plain literals are read with one regex match each; anything else goes
+    through the tokenizer.
+    """
+    position = start
+    while True:
+        gap = ROW_GAP_PATTERN.match(sql_content, position)
+        position = gap.end()
+        if position == len(sql_content) or sql_content[position] == ';':
+            return
+        if sql_content[position] != '(':
+            raise ValueError(f'unexpected {sql_content[position]!r} between row tuples')
+        position += 1
+        
+        row = []
+        while True:
+            match = SIMPLE_VALUE_PATTERN.match(sql_content, position)
+            if match is not None:
+                string, number, word, terminator = match.group('string', 'number', 'word', 'end')
+                if string is not None:
+                    row.append(string_value(string))
+                elif number is not None:
+                    row.append(Raw('number', number.lstrip('+')))
+                else:
+                    row.append(WORD_VALUES[word.upper()])
+                position = match.end()
+            else:
+                value, token = _read_value(TokenStream(sql_content, position))
+                row.append(value)
+                terminator = token.group()
+                position = token.end()
+            if terminator == ')':
+                break
+        yield row
+
+
+def parse_insert_header(statement):
+    """Match the INSERT ... VALUES header of statement
+    
+    Returns (leading trivia, header match) or None for other statements;
+    the rows start at len(trivia) + match.end().
+    """
+    trivia, body = split_leading_trivia(statement)
+    match = INSERT_HEADER_PATTERN.match(body)
+    if match is None:
+        return None
+    return trivia, match
+
+
+def insert_column_names(column_list):
+    """Bare column names from the (...) list of an INSERT header"""
+    return [
+        unquote_identifier(kind, text)
+        for kind, text in tokenize(column_list)
+        if kind in ('word', 'backtick', 'quoted')
+    ]
+
+
+def copy_field(value):
+    """Format one decoded value for COPY text format"""
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, Raw):
+        return value.text
+    return value.translate(COPY_ESCAPES)
+
+
+def insert_to_copy(statement, first=True, last=True):
+    """Rewrite an INSERT ... VALUES statement as a COPY ... FROM stdin block
+    
+    first/last mark a piece from split_insert_rows that carries the header
+    or the end of the statement. Returns None when a value is an expression
+    that COPY cannot evaluate; the caller keeps the INSERT then.
+    """
+    start = 0
+    lines = []
+    if first:
+        header = parse_insert_header(statement)
+        if header is None:
+            return None
+        trivia, match = header
+        columns = match.group('columns')
+        column_list = f" ({' '.join(columns.split())})" if columns else ''
+        lines.append(f"{trivia}COPY {match.group('table')}{column_list} FROM stdin;\n")
+        start = len(trivia) + match.end()
+    
+    for row in iter_row_values(statement, start):
+        fields = []
+        for value in row:
+            if isinstance(value, Raw) and value.kind == 'expression':
+                return None
+            fields.append(copy_field(value))
+        lines.append('\t'.join(fields) + '\n')
+    
+    if last:
+        lines.append('\\.\n')
+    return ''.join(lines)
+
+
+def _row_groups(row_bytes, header_bytes, rows_per_statement=None, max_statement_bytes=None):
+    """Cut rows into runs of at most rows_per_statement rows and max_statement_bytes bytes
+    
+    row_bytes holds the size of every row with its separator; a row bigger
+    than the limit on its own gets a run of its own. Returns (first, end)
+    row index ranges.
+    """
+    groups = []
+    first = 0
+    size = 0
+    for index, row_size in enumerate(row_bytes):
+        if index > first and (
+                (rows_per_statement and index - first >= rows_per_statement)
+                or (max_statement_bytes and header_bytes + size + row_size > max_statement_bytes)):
+            groups.append((first, index))
+            first = index
+            size = 0
+        size += row_size
+    if len(row_bytes) > first:
+        groups.append((first, len(row_bytes)))
+    return groups
+
+
+def rechunk_insert(statement, rows_per_statement=None, max_statement_bytes=None):
+    """Split one INSERT ... VALUES statement into several at row boundaries
+    
+    Each piece repeats the INSERT header and holds at most rows_per_statement
+    rows and, unless a single row is bigger, at most max_statement_bytes
+    bytes of UTF-8. Rows keep their original text. Returns a list of
+    statements; the first keeps the leading comments of the original.
+    """
+    header = parse_insert_header(statement)
+    if header is None:
+        return [statement]
+    trivia, match = header
+    values_start = len(trivia) + match.end()
+    insert_header = statement[len(trivia):values_start]
+    header_bytes = len(insert_header.encode('utf-8')) + 1
+    
+    spans = list(iter_row_spans(statement, values_start))
+    if max_statement_bytes:
+        row_bytes = [len(statement[row_start:row_end].encode('utf-8')) + 2 for row_start, row_end in spans]
+    else:
+        row_bytes = [0] * len(spans)
+    groups = _row_groups(row_bytes, header_bytes, rows_per_statement, max_statement_bytes)
+    
+    if len(groups) <= 1:
+        return [statement]
+    return [
+        (trivia if index == 0 else '\n') + insert_header + statement[spans[first][0]:spans[end - 1][1]] + ';'
+        for index, (first, end) in enumerate(groups)
+    ]
+
+
+def rechunk_copy(block, rows_per_statement=None, max_statement_bytes=None):
+    """Split one COPY ... FROM stdin block into several at row lines
+    
+    The COPY counterpart of rechunk_insert: each block repeats the COPY
+    line and the \\. terminator and holds at most rows_per_statement rows
+    and, unless a single row is bigger, at most max_statement_bytes bytes
+    of UTF-8. Returns a list of blocks; the first keeps the leading
+    comments of the original.
+    """
+    trivia, body = split_leading_trivia(block)
+    header_end = body.find('\n') + 1
+    if not header_end or not is_copy_from_stdin(body) or not body.endswith('\n\\.\n'):
+        return [block]
+    copy_header = body[:header_end]
+    lines = body[header_end:-len('\\.\n')].split('\n')[:-1]
+    header_bytes = len(copy_header.encode('utf-8')) + len('\\.\n')
+    
+    if max_statement_bytes:
+        row_bytes = [len(line.encode('utf-8')) + 1 for line in lines]
+    else:
+        row_bytes = [0] * len(lines)
+    groups = _row_groups(row_bytes, header_bytes, rows_per_statement, max_statement_bytes)
+    
+    if len(groups) <= 1:
+        return [block]
+    return [
+        (trivia if index == 0 else '\n') + copy_header + '\n'.join(lines[first:end]) + '\n\\.\n'
+        for index, (first, end) in enumerate(groups)
+    ]
@@ -0,0 +1,946 @@
+#!/usr/bin/env python3
+"""
+Table definitions parsed from CREATE TABLE statements
+Gives the column names and declared types the row writers need
+"""
+
+import re
+from collections import namedtuple
+
+from sql_lexer import INSIGNIFICANT, TokenStream, quote_identifier, split_leading_trivia, unquote_identifier
+from sql_rows import Raw, insert_column_names, iter_row_values, parse_insert_header, string_value
+
+CREATE_TABLE_PATTERN = re.compile(r'CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?', re.IGNORECASE)
+ALTER_TABLE_PATTERN = re.compile(r'ALTER\s+TABLE\s+(?:ONLY\s+)?', re.IGNORECASE)
+
+# MySQL's next AUTO_INCREMENT value, as a table option or in ALTER TABLE
+AUTO_INCREMENT_COUNTER_PATTERN = re.compile(r'\bAUTO_INCREMENT\s*=\s*(\d+)', re.IGNORECASE)
+
+# A column definition: type is the declared type as written, e.g. 'VARCHAR(30)';
+# comment is the decoded COMMENT text and check the CHECK (...) expression
+Column = namedtuple('Column', 'name type nullable default auto_increment primary_key comment check',
+                    defaults=(None, None))
+
+# A key from CREATE TABLE or ALTER TABLE ADD: kind is 'PRIMARY', 'UNIQUE',
+# 'INDEX', 'FULLTEXT' or 'SPATIAL'; name is None when the dump gives none
+Index = namedtuple('Index', 'name kind columns')
+
+# A FOREIGN KEY constraint; actions is the ON DELETE / ON UPDATE text
+ForeignKey = namedtuple('ForeignKey', 'name columns table references actions')
+
+INTEGER_TYPES = frozenset((
+    'TINYINT', 'SMALLINT', 'MEDIUMINT', 'INT', 'INTEGER', 'BIGINT', 'INT2', 'INT4', 'INT8',
+    'SMALLSERIAL', 'SERIAL', 'BIGSERIAL',
+))
+SERIAL_TYPES = frozenset(('SMALLSERIAL', 'SERIAL', 'BIGSERIAL'))
+
+# PostgreSQL type for a MySQL integer type, which drops the display width
+SIGNED_TYPES = {
+    'TINYINT': 'SMALLINT',
+    'SMALLINT': 'SMALLINT',
+    'MEDIUMINT': 'INTEGER',
+    'INT': 'INTEGER',
+    'INTEGER': 'INTEGER',
+    'BIGINT': 'BIGINT',
+}
+
+# UNSIGNED integers need the next wider type to keep their range
+UNSIGNED_TYPES = {
+    'TINYINT': 'SMALLINT',
+    'SMALLINT': 'INTEGER',
+    'MEDIUMINT': 'INTEGER',
+    'INT': 'BIGINT',
+    'INTEGER': 'BIGINT',
+    'BIGINT': 'NUMERIC(20)',
+}
+
+# Type modifiers PostgreSQL has no form for
+UNSIGNED_PATTERN = re.compile(r'\s+(?:UNSIGNED|ZEROFILL)\b', re.IGNORECASE)
+
+TEXT_TYPES = frozenset(('TINYTEXT', 'TEXT', 'MEDIUMTEXT', 'LONGTEXT', 'VARCHAR', 'CHAR'))
+DATE_TYPES = frozenset(('DATETIME', 'TIMESTAMP', 'DATE'))
+BOOLEAN_TYPES = frozenset(('BOOL', 'BOOLEAN'))
+
+# Definitions in the column list that are constraints, not columns
+CONSTRAINT_WORDS = frozenset((
+    'PRIMARY', 'KEY', 'UNIQUE', 'INDEX', 'CONSTRAINT', 'FOREIGN', 'CHECK', 'FULLTEXT', 'SPATIAL', 'EXCLUDE',
+))
+
+# Words that may follow CONSTRAINT directly when the constraint has no name
+CONSTRAINT_KINDS = frozenset(('PRIMARY', 'UNIQUE', 'FOREIGN', 'CHECK'))
+
+# Column attributes that end the type part of a definition
+ATTRIBUTE_WORDS = frozenset((
+    'NOT', 'NULL', 'DEFAULT', 'PRIMARY', 'UNIQUE', 'KEY', 'COMMENT', 'REFERENCES', 'CHECK', 'COLLATE',
+    'AUTO_INCREMENT', 'GENERATED', 'CONSTRAINT', 'ON',
+))
+
+# PostgreSQL truncates identifiers to this many bytes
+MAX_IDENTIFIER_LENGTH = 63
+
+# Converted files are laid out like pg_restore sections: types and tables,
+# then rows, then keys, indexes, foreign keys and sequence resets. The
+# post-data statements are independent of each other except that foreign
+# keys come last, after the keys they reference.
+SECTIONS = ('pre-data', 'data', 'post-data')
+SECTION_MARKER = '-- Section: {}\n'
+POST_DATA_MARKER = SECTION_MARKER.format('post-data')
+
+TYPE_NAME_PATTERN = re.compile(r'[A-Za-z_][\w$]*(?:\s+(?:PRECISION|VARYING|WITH(?:OUT)?\s+TIME\s+ZONE))?', re.IGNORECASE)
+
+
+def qualified_name(name):
+    """Return a table name without quotes or the public. schema, for comparisons"""
+    name = name.strip()
+    parts = re.findall(r'`[^`]*`|"[^"]*"|[^."`]+', name)
+    bare = [part[1:-1] if part[0] in '`"' else part for part in parts]
+    if len(bare) == 2 and bare[0].lower() == 'public':
+        bare = bare[1:]
+    return '.'.join(bare)
+
+
+def base_type(type_text):
+    """Upper-cased type name without length, precision or modifiers
+    
+    'INTEGER(6) UNSIGNED' -> 'INTEGER', 'double precision' -> 'DOUBLE PRECISION'
+    """
+    match = TYPE_NAME_PATTERN.match(type_text.strip())
+    return ' '.join(match.group().upper().split()) if match else ''
+
+
+def column_kind(column):
+    """How a column's values change on the way to PostgreSQL
+    
+    'boolean' for BOOLEAN and TINYINT(1), 'date' for DATE/DATETIME/TIMESTAMP,
+    'json' for JSON and text columns checked with json_valid(), else None.
+    """
+    type_name = base_type(column.type)
+    if type_name in BOOLEAN_TYPES or column.type.replace(' ', '').upper().startswith('TINYINT(1)'):
+        return 'boolean'
+    if type_name in DATE_TYPES:
+        return 'date'
+    if type_name == 'JSON' or (
+            type_name in TEXT_TYPES and column.check is not None and 'json_valid' in column.check.lower()):
+        return 'json'
+    return None
+
+
+def takes_zero_dates(column):
+    """True for a NOT NULL date column: MySQL lets it hold zero-dates, whatever its default
+    
+    Zero-dates become NULL on the way to PostgreSQL, so such a column has
+    to be created without its NOT NULL.
+    """
+    return not column.nullable and column_kind(column) == 'date'
+
+
+def _split_definitions(tokens):
+    """Group the significant tokens of a column list into one list per definition"""
+    definitions = [[]]
+    depth = 0
+    for token in tokens:
+        if token.lastgroup in INSIGNIFICANT:
+            continue
+        text = token.group()
+        if text == '(':
+            depth += 1
+        elif text == ')':
+            if depth == 0:
+                break
+            depth -= 1
+        elif text == ',' and depth == 0:
+            definitions.append([])
+            continue
+        elif text == ';' and depth == 0:
+            break
+        definitions[-1].append(token)
+    return [definition for definition in definitions if definition]
+
+
+def _parse_column(definition):
+    """Build a Column from the tokens of one definition, or None for constraints"""
+    first = definition[0]
+    if first.lastgroup == 'word' and first.group().upper() in CONSTRAINT_WORDS:
+        return None
+    
+    source = first.string
+    index = _type_end(definition)
+    type_start = definition[1].start() if len(definition) > 1 else first.end()
+    type_end = definition[index - 1].end() if index > 1 else type_start
+    nullable = True
+    default = None
+    auto_increment = False
+    primary_key = False
+    comment = None
+    check = None
+    
+    while index < len(definition):
+        upper = definition[index].group().upper()
+        if upper == 'NOT' and index + 1 < len(definition) and definition[index + 1].group().upper() == 'NULL':
+            nullable = False
+            index += 1
+        elif upper == 'PRIMARY':
+            nullable = False
+            primary_key = True
+        elif upper == 'AUTO_INCREMENT':
+            auto_increment = True
+        elif upper == 'DEFAULT' and index + 1 < len(definition):
+            default, index = _default_text(definition, index + 1)
+        elif upper == 'COMMENT' and index + 1 < len(definition) and definition[index + 1].lastgroup == 'string':
+            index += 1
+            comment = string_value(definition[index].group())
+        elif upper == 'CHECK' and index + 1 < len(definition):
+            check, index = _default_text(definition, index + 1)
+        index += 1
+    
+    return Column(
+        unquote_identifier(first.lastgroup, first.group()),
+        ' '.join(source[type_start:type_end].split()),
+        nullable,
+        default,
+        auto_increment,
+        primary_key,
+        comment,
+        check,
+    )
+
+
+def _type_end(definition):
+    """Index of the first token after the column type in the tokens of a column definition"""
+    index = 1
+    while index < len(definition):
+        token = definition[index]
+        upper = token.group().upper() if token.lastgroup == 'word' else None
+        following = definition[index + 1].group().upper() if index + 1 < len(definition) else ''
+        if upper in ATTRIBUTE_WORDS or (upper == 'CHARACTER' and following == 'SET'):
+            break
+        index += 1
+    return index
+
+
+def _primary_key_columns(definition):
+    """Column names of a PRIMARY KEY (...) definition, or None for anything else"""
+    words = [token.group().upper() for token in definition[:2]]
+    if words != ['PRIMARY', 'KEY']:
+        return None
+    return [
+        unquote_identifier(token.lastgroup, token.group())
+        for token in definition[2:]
+        if token.lastgroup in ('word', 'backtick', 'quoted')
+    ]
+
+
+def _key_columns(tokens):
+    """Column names in the (...) list of a key, without prefix lengths or ASC/DESC"""
+    names = []
+    depth = 0
+    expects_name = False
+    for token in tokens:
+        text = token.group()
+        if text == '(':
+            depth += 1
+            expects_name = depth == 1
+        elif text == ')':
+            depth -= 1
+            if depth == 0:
+                break
+        elif text == ',' and depth == 1:
+            expects_name = True
+        elif expects_name and token.lastgroup in ('word', 'backtick', 'quoted'):
+            names.append(unquote_identifier(token.lastgroup, text))
+            expects_name = False
+    return names
+
+
+def _constraint_name(definition):
+    """Skip CONSTRAINT [name]; returns (name or None, remaining tokens)"""
+    if not definition or definition[0].group().upper() != 'CONSTRAINT':
+        return None, definition
+    token = definition[1] if len(definition) > 1 else None
+    if token is not None and (token.lastgroup != 'word' or token.group().upper() not in CONSTRAINT_KINDS):
+        return unquote_identifier(token.lastgroup, token.group()), definition[2:]
+    return None, definition[1:]
+
+
+def parse_index(definition):
+    """Build an Index from the tokens of a key definition, or None for anything else"""
+    name, definition = _constraint_name(definition)
+    words = [token.group().upper() for token in definition[:2] if token.lastgroup == 'word']
+    if not words:
+        return None
+    if words[:2] == ['PRIMARY', 'KEY']:
+        kind, rest = 'PRIMARY', definition[2:]
+    elif words[0] in ('UNIQUE', 'FULLTEXT', 'SPATIAL'):
+        kind, rest = words[0], definition[1:]
+        if words[1:2] and words[1] in ('KEY', 'INDEX'):
+            rest = rest[1:]
+    elif words[0] in ('KEY', 'INDEX'):
+        kind, rest = 'INDEX', definition[1:]
+    else:
+        return None
+    if rest and rest[0].group() != '(':
+        if rest[0].lastgroup in ('word', 'backtick', 'quoted'):
+            name = unquote_identifier(rest[0].lastgroup, rest[0].group())
+        rest = rest[1:]
+    return Index(name, kind, _key_columns(rest))
+
+
+def parse_foreign_key(definition):
+    """Build a ForeignKey from [CONSTRAINT name] FOREIGN KEY ... REFERENCES ..., or None"""
+    name, definition = _constraint_name(definition)
+    words = [token.group().upper() for token in definition[:2]]
+    if words != ['FOREIGN', 'KEY']:
+        return None
+    rest = definition[2:]
+    if rest and rest[0].group() != '(':
+        rest = rest[1:]         # MySQL allows an index name here
+    references = next((index for index, token in enumerate(rest) if token.group().upper() == 'REFERENCES'), None)
+    if references is None or references + 1 >= len(rest):
+        return None
+    columns = _key_columns(rest[:references])
+    table_end = next((index for index, token in enumerate(rest) if index > references and token.group() == '('), len(rest))
+    table = qualified_name(''.join(token.group() for token in rest[references + 1:table_end]))
+    tail = rest[table_end:]
+    referenced = _key_columns(tail)
+    closing = next((index for index, token in enumerate(tail) if token.group() == ')'), len(tail) - 1)
+    actions = tail[closing + 1:]
+    actions_text = ' '.join(token.group().upper() for token in actions)
+    return ForeignKey(name, columns, table, referenced, actions_text)
+
+
+def _default_text(definition, index):
+    """Return (default expression text, index of its last token)"""
+    start = index
+    depth = 0
+    while index < len(definition):
+        text = definition[index].group()
+        if text == '(':
+            depth += 1
+        elif text == ')':
+            depth -= 1
+        if depth == 0 and (index + 1 == len(definition) or definition[index + 1].group() != '('):
+            break
+        index += 1
+    index = min(index, len(definition) - 1)
+    source = definition[start].string
+    return source[definition[start].start():definition[index].end()], index
+
+
+def _create_table_body(statement):
+    """Return (table name, token stream after the opening parenthesis) or None"""
+    trivia, body = split_leading_trivia(statement)
+    match = CREATE_TABLE_PATTERN.match(body)
+    if match is None:
+        return None
+    
+    tokens = TokenStream(statement, len(trivia) + match.end())
+    name_parts = []
+    for token in tokens:
+        if token.lastgroup in INSIGNIFICANT:
+            continue
+        if token.group() == '(':
+            break
+        name_parts.append(token.group())
+    else:
+        return None
+    return qualified_name(''.join(name_parts)), tokens
+
+
+def parse_create_table(statement):
+    """Parse a CREATE TABLE statement into (table name, [Column, ...])
+    
+    Returns None for other statements. Works on MySQL and PostgreSQL DDL;
+    table constraints and index definitions are skipped.
+    """
+    parsed = _create_table_body(statement)
+    if parsed is None:
+        return None
+    table, tokens = parsed
+    
+    columns = []
+    primary_key = []
+    for definition in _split_definitions(tokens):
+        column = _parse_column(definition)
+        if column is not None:
+            columns.append(column)
+        else:
+            primary_key = _primary_key_columns(definition) or primary_key
+    columns = [
+        column._replace(primary_key=True, nullable=False) if column.name in primary_key else column
+        for column in columns
+    ]
+    return table, columns
+
+
+def parse_create_table_details(statement):
+    """The parts of a CREATE TABLE that parse_create_table skips
+    
+    Returns ([Index], [ForeignKey], table comment or None), or None for
+    other statements.
+    """
+    parsed = _create_table_body(statement)
+    if parsed is None:
+        return None
+    _, tokens = parsed
+    
+    indexes = []
+    foreign_keys = []
+    for definition in _split_definitions(tokens):
+        index = parse_index(definition)
+        if index is not None:
+            indexes.append(index)
+            continue
+        foreign_key = parse_foreign_key(definition)
+        if foreign_key is not None:
+            foreign_keys.append(foreign_key)
+    
+    comment = None
+    ahead = [token for token in tokens if token.lastgroup not in INSIGNIFICANT]
+    for index, token in enumerate(ahead):
+        if token.group().upper() == 'COMMENT':
+            value = ahead[index + 2] if index + 2 < len(ahead) and ahead[index + 1].group() == '=' else \
+                ahead[index + 1] if index + 1 < len(ahead) else None
+            if value is not None and value.lastgroup == 'string':
+                comment = string_value(value.group())
+    return indexes, foreign_keys, comment
+
+
+def parse_alter_table(statement):
+    """Split an ALTER TABLE statement into (table name, [clause tokens, ...]) or None"""
+    trivia, body = split_leading_trivia(statement)
+    match = ALTER_TABLE_PATTERN.match(body)
+    if match is None:
+        return None
+    table, token = _table_name_tokens(TokenStream(statement, len(trivia) + match.end()))
+    if token is None:
+        return table, []
+    return table, _split_definitions(TokenStream(statement, token.start()))
+
+
+def parse_alter_column(clause):
+    """The new Column of a MODIFY [COLUMN] / CHANGE [COLUMN] old clause, or None"""
+    words = [token.group().upper() for token in clause[:2]]
+    if not words or words[0] not in ('MODIFY', 'CHANGE'):
+        return None
+    skip = 2 if len(words) > 1 and words[1] == 'COLUMN' else 1
+    if words[0] == 'CHANGE':
+        skip += 1
+    if len(clause) <= skip:
+        return None
+    return _parse_column(clause[skip:])
+
+
+def referenced_tables(statement):
+    """Names of the tables a DDL statement points at with REFERENCES, in order"""
+    tables = []
+    tokens = TokenStream(statement)
+    for token in tokens:
+        if token.lastgroup == 'word' and token.group().upper() == 'REFERENCES':
+            table = _table_name_tokens(tokens)[0]
+            if table and table not in tables:
+                tables.append(table)
+    return tables
+
+
+def _table_name_tokens(tokens):
+    """Consume a possibly schema-qualified table name; returns (name, next token)"""
+    name_parts = []
+    for token in tokens:
+        if token.lastgroup in INSIGNIFICANT:
+            continue
+        expects_name = not name_parts or name_parts[-1] == '.'
+        if expects_name and token.lastgroup in ('word', 'backtick', 'quoted'):
+            name_parts.append(token.group())
+        elif not expects_name and token.group() == '.':
+            name_parts.append('.')
+        else:
+            return qualified_name(''.join(name_parts)), token
+    return qualified_name(''.join(name_parts)), None
+
+
+def column_maxima(sql_content, indexes):
+    """Largest integer value per column index over the row tuples in sql_content
+    
+    sql_content is an INSERT statement or a headerless row batch of one.
+    Returns {index: max}; NULLs and non-integer values are ignored.
+    """
+    header = parse_insert_header(sql_content)
+    start = len(header[0]) + header[1].end() if header else 0
+    maxima = {}
+    for row in iter_row_values(sql_content, start):
+        for index in indexes:
+            value = row[index]
+            if value is None:
+                continue
+            try:
+                number = int(value.text if isinstance(value, Raw) else value)
+            except ValueError:
+                continue
+            if index not in maxima or number > maxima[index]:
+                maxima[index] = number
+    return maxima
+
+
+def quote_table(table):
+    """Quote a table name from qualified_name() as a PostgreSQL identifier"""
+    return '.'.join(quote_identifier(part) for part in table.split('.'))
+
+
+def _quote_list(names):
+    return ', '.join(quote_identifier(name) for name in names)
+
+
+def index_name(table, index):
+    """Name for a PostgreSQL index; index names share one namespace per schema"""
+    name = index.name or '_'.join(index.columns)
+    if name.startswith('idx_'):
+        name = name[4:]
+    return f"idx_{table.split('.')[-1]}_{name}"[:MAX_IDENTIFIER_LENGTH]
+
+
+def index_sql(table, index):
+    """The PostgreSQL statement creating index on table, ALTER TABLE for a primary key"""
+    if index.kind == 'PRIMARY':
+        return f"ALTER TABLE {quote_table(table)} ADD PRIMARY KEY ({_quote_list(index.columns)});\n"
+    if index.kind in ('FULLTEXT', 'SPATIAL'):
+        return (f"-- {index.kind} KEY {index.name} ({', '.join(index.columns)}) skipped: "
+                f"no direct PostgreSQL equivalent\n")
+    unique = 'UNIQUE ' if index.kind == 'UNIQUE' else ''
+    return (f"CREATE {unique}INDEX {quote_identifier(index_name(table, index))} "
+            f"ON {quote_table(table)} ({_quote_list(index.columns)});\n")
+
+
+def foreign_key_sql(table, foreign_key):
+    """The ALTER TABLE statement adding foreign_key to table"""
+    constraint = f"CONSTRAINT {quote_identifier(foreign_key.name)} " if foreign_key.name else ''
+    actions = f" {foreign_key.actions}" if foreign_key.actions else ''
+    return (f"ALTER TABLE {quote_table(table)} ADD {constraint}"
+            f"FOREIGN KEY ({_quote_list(foreign_key.columns)}) "
+            f"REFERENCES {quote_table(foreign_key.table)} ({_quote_list(foreign_key.references)}){actions};\n")
+
+
+def setval_sql(table, column, next_value):
+    """A setval() that makes the sequence behind table.column return next_value next"""
+    table_literal = quote_table(table).replace("'", "''")
+    column_literal = column.replace("'", "''")
+    return (f"SELECT setval(pg_get_serial_sequence('{table_literal}', '{column_literal}'), "
+            f"{next_value}, false);\n")
+
+
+class TableSequences:
+    """What SequenceTracker knows about one table"""
+    
+    def __init__(self, columns):
+        self.columns = columns                      # [Column] in CREATE TABLE order
+        self.primary_key = [column.name for column in columns if column.primary_key]
+        self.auto_increment = {column.name for column in columns if column.auto_increment}
+        self.counter = None                         # MySQL AUTO_INCREMENT=N
+        self.maxima = {}                            # column name -> largest value seen
+    
+    def serial_columns(self):
+        """Columns backed by a sequence: AUTO_INCREMENT or serial, else a lone integer key"""
+        serial = [
+            column.name for column in self.columns
+            if column.name in self.auto_increment or base_type(column.type) in SERIAL_TYPES
+        ]
+        if serial:
+            return serial
+        integer_key = [
+            name for name in self.primary_key
+            if any(column.name == name and base_type(column.type) in INTEGER_TYPES for column in self.columns)
+        ]
+        return integer_key if len(self.primary_key) == 1 else []
+
+
+class SequenceTracker:
+    """Follow serial / primary key columns and their largest values through a dump
+    
+    Fed the MySQL statements in order: CREATE TABLE gives the integer
+    columns, INSERT rows update their maxima, and ALTER TABLE may add the
+    primary key or AUTO_INCREMENT afterwards (phpMyAdmin dumps do). The
+    setval() statements come from reset_sql() once the dump is through,
+    without a second scan over the data.
+    """
+    
+    def __init__(self):
+        self.tables = {}        # table -> TableSequences
+    
+    def observe(self, statement):
+        """Update the tracked state from one statement"""
+        tracked = self.tracked_columns(statement)
+        if tracked is not None:
+            table, indexes = tracked
+            self.update(table, indexes, column_maxima(statement, indexes))
+            return
+        
+        definition = parse_create_table(statement)
+        if definition is not None:
+            table, columns = definition
+            self.tables[table] = TableSequences(columns)
+            self._read_counter(table, statement[statement.rfind(')'):])
+            return
+        
+        altered = parse_alter_table(statement)
+        if altered is not None:
+            self._observe_alter(statement, *altered)
+    
+    def tracked_columns(self, statement):
+        """For an INSERT into a known table, return (table, {index: column name}) to track"""
+        header = parse_insert_header(statement)
+        if header is None:
+            return None
+        table = qualified_name(header[1].group('table'))
+        sequences = self.tables.get(table)
+        if sequences is None:
+            return None
+        column_list = header[1].group('columns')
+        names = insert_column_names(column_list) if column_list else [column.name for column in sequences.columns]
+        integer_columns = {
+            column.name for column in sequences.columns if base_type(column.type) in INTEGER_TYPES
+        }
+        return table, {index: name for index, name in enumerate(names) if name in integer_columns}
+    
+    def update(self, table, indexes, maxima):
+        """Merge {index: max} from column_maxima, for the columns tracked_columns named"""
+        known = self.tables[table].maxima
+        for index, value in maxima.items():
+            name = indexes[index]
+            if name not in known or value > known[name]:
+                known[name] = value
+    
+    def _observe_alter(self, statement, table, clauses):
+        sequences = self.tables.get(table)
+        if sequences is None:
+            return
+        for clause in clauses:
+            words = [token.group().upper() for token in clause[:3]]
+            if words[:3] == ['ADD', 'PRIMARY', 'KEY']:
+                sequences.primary_key = _primary_key_columns(clause[1:])
+            else:
+                column = parse_alter_column(clause)
+                if column is not None and column.auto_increment:
+                    sequences.auto_increment.add(column.name)
+        self._read_counter(table, statement)
+    
+    def _read_counter(self, table, text):
+        match = AUTO_INCREMENT_COUNTER_PATTERN.search(text)
+        if match:
+            self.tables[table].counter = int(match.group(1))
+    
+    def reset_sql(self):
+        """setval() statements for every sequence, or '' when there is nothing to reset"""
+        statements = []
+        for table, sequences in self.tables.items():
+            for name in sequences.serial_columns():
+                next_value = max(sequences.maxima.get(name, 0) + 1, sequences.counter or 1)
+                if next_value > 1:
+                    statements.append(setval_sql(table, name, next_value))
+        if not statements:
+            return ''
+        return "\n-- Reset sequences to continue after the imported rows\n" + ''.join(statements)
+
+
+class ValuePlans:
+    """Per-table value transforms for the INSERT rows of a dump
+    
+    Fed the non-INSERT statements in order, it keeps the columns of every
+    CREATE TABLE (and ALTER TABLE ... MODIFY/CHANGE). plan() turns an INSERT
+    header into one entry per value position, (column_kind, column name) or
+    None, computed once per table and column list so the row rewriters
+    index it by position instead of looking up column types per row.
+    """
+    
+    def __init__(self):
+        self.tables = {}        # table -> [Column] in CREATE TABLE order
+        self._plans = {}        # (table, column list text) -> plan
+    
+    def observe(self, statement):
+        """Update the known columns from a CREATE TABLE or ALTER TABLE statement"""
+        definition = parse_create_table(statement)
+        if definition is not None:
+            table, columns = definition
+            self.tables[table] = columns
+            self._plans.clear()
+            return
+        
+        altered = parse_alter_table(statement)
+        if altered is None or altered[0] not in self.tables:
+            return
+        columns = self.tables[altered[0]]
+        for clause in altered[1]:
+            column = parse_alter_column(clause)
+            if column is None:
+                continue
+            name = column.name
+            if clause[0].group().upper() == 'CHANGE':
+                old = clause[2] if clause[1].group().upper() == 'COLUMN' else clause[1]
+                name = unquote_identifier(old.lastgroup, old.group())
+            columns[:] = [column if existing.name == name else existing for existing in columns]
+            self._plans.clear()
+    
+    def plan(self, statement):
+        """Transforms per value position for an INSERT into a known table, else None"""
+        header = parse_insert_header(statement)
+        if header is None:
+            return None
+        table = qualified_name(header[1].group('table'))
+        columns = self.tables.get(table)
+        if columns is None:
+            return None
+        column_list = header[1].group('columns')
+        key = (table, column_list)
+        if key not in self._plans:
+            kinds = {column.name: column_kind(column) for column in columns}
+            names = insert_column_names(column_list) if column_list else [column.name for column in columns]
+            self._plans[key] = tuple((kinds[name], name) if kinds.get(name) else None for name in names)
+        return self._plans[key]
+
+
+def _definition_cuts(definitions, removed):
+    """(start, end) ranges that take the definitions flagged in removed out, commas included
+    
+    Returns None when every definition is removed.
+    """
+    cuts = []
+    kept_end = None         # end of the last kept definition
+    leading_start = None    # start of removed definitions before the first kept one
+    for definition, remove in zip(definitions, removed):
+        if remove:
+            if kept_end is not None:
+                cuts.append((kept_end, definition[-1].end()))
+                kept_end = definition[-1].end()
+            elif leading_start is None:
+                leading_start = definition[0].start()
+        else:
+            if leading_start is not None:
+                cuts.append((leading_start, definition[0].start()))
+                leading_start = None
+            kept_end = definition[-1].end()
+    if leading_start is not None:
+        return None         # nothing left
+    return cuts
+
+
+def _cut_definitions(statement, definitions, removed):
+    """statement without the definitions flagged in removed, commas included"""
+    cuts = _definition_cuts(definitions, removed)
+    return None if cuts is None else _apply_cuts(statement, cuts)
+
+
+def _apply_cuts(statement, cuts):
+    return _apply_edits(statement, [(start, end, '') for start, end in cuts])
+
+
+def _apply_edits(statement, edits):
+    """statement with each (start, end, replacement) in edits applied; edits are in order"""
+    pieces = []
+    last = 0
+    for start, end, replacement in edits:
+        pieces.append(statement[last:start])
+        pieces.append(replacement)
+        last = end
+    pieces.append(statement[last:])
+    return ''.join(pieces)
+
+
+def _string_literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _column_type_sql(column):
+    """PostgreSQL text for the type of a MySQL column, or None to leave it to rewrite_tokens"""
+    type_name = base_type(column.type)
+    kind = column_kind(column)
+    if kind == 'json':
+        return 'JSONB'
+    if kind is None and type_name in SIGNED_TYPES:
+        unsigned = UNSIGNED_PATTERN.search(column.type) is not None
+        return (UNSIGNED_TYPES if unsigned else SIGNED_TYPES)[type_name]
+    if type_name in ('ENUM', 'SET'):
+        return column.type
+    return UNSIGNED_PATTERN.sub('', column.type)
+
+
+def _attribute_end(definition, index, column):
+    """Index of the last token of a column attribute PostgreSQL has no form for, or None"""
+    upper = definition[index].group().upper()
+    following = definition[index + 1].group().upper() if index + 1 < len(definition) else ''
+    kind = column_kind(column)
+    if upper == 'NOT' and following == 'NULL' and takes_zero_dates(column):
+        return index + 1
+    if upper == 'CHARACTER' and following == 'SET' and index + 2 < len(definition):
+        return index + 2
+    if upper in ('CHARSET', 'COLLATE') and following:
+        return index + 1
+    if upper == 'COMMENT' and index + 1 < len(definition) and definition[index + 1].lastgroup == 'string':
+        return index + 1
+    if upper == 'ON' and following == 'UPDATE' and index + 2 < len(definition):
+        return _default_text(definition, index + 2)[1]
+    if upper == 'CHECK' and kind == 'json' and following == '(':
+        return _default_text(definition, index + 1)[1]
+    return None
+
+
+def create_table_sql(statement):
+    """Rewrite the column definitions of a MySQL CREATE TABLE that PostgreSQL has no form for
+    
+    As in table_converter, integers lose their display width and UNSIGNED
+    ones take the next wider type, JSON columns (text checked with
+    json_valid()) become JSONB, date columns that take zero-dates lose
+    their NOT NULL, and CHARACTER SET, COLLATE, ON UPDATE and COMMENT
+    attributes are dropped. The table and column comments follow
+    the statement as COMMENT ON statements. Other statements are returned
+    unchanged.
+    """
+    parsed = _create_table_body(statement)
+    if parsed is None:
+        return statement
+    table, tokens = parsed
+    edits = []
+    comments = []
+    for definition in _split_definitions(tokens):
+        column = _parse_column(definition)
+        if column is None:
+            continue
+        index = _type_end(definition)
+        type_sql = _column_type_sql(column)
+        if index > 1 and type_sql != column.type:
+            edits.append((definition[1].start(), definition[index - 1].end(), type_sql))
+        while index < len(definition):
+            end = _attribute_end(definition, index, column)
+            if end is not None:
+                edits.append((definition[index - 1].end(), definition[end].end(), ''))
+                index = end
+            index += 1
+        if column.comment:
+            comments.append(
+                f"COMMENT ON COLUMN {quote_table(table)}.{quote_identifier(column.name)} "
+                f"IS {_string_literal(column.comment)};"
+            )
+    table_comment = parse_create_table_details(statement)[2]
+    if table_comment:
+        comments.insert(0, f"COMMENT ON TABLE {quote_table(table)} IS {_string_literal(table_comment)};")
+    if not edits and not comments:
+        return statement
+    return _apply_edits(statement, edits) + ''.join('\n' + comment for comment in comments)
+
+
+def alter_table_sql(statement):
+    """Rewrite the clauses of a MySQL ALTER TABLE that PostgreSQL has no form for
+    
+    MODIFY ... AUTO_INCREMENT becomes an identity column, so the column
+    owns the sequence that SequenceTracker's setval() resets point at, and
+    the AUTO_INCREMENT = N counter clause is dropped. Other MODIFY clauses
+    only restate a column of the CREATE TABLE before them (phpMyAdmin
+    writes them next to the keys) and are dropped too. When no clause is
+    left only the leading comments remain. Other statements are returned
+    unchanged.
+    """
+    altered = parse_alter_table(statement)
+    if altered is None or not altered[1]:
+        return statement
+    removed = []
+    edits = []
+    for clause in altered[1]:
+        upper = clause[0].group().upper()
+        column = parse_alter_column(clause) if upper == 'MODIFY' else None
+        removed.append(upper == 'AUTO_INCREMENT' or (column is not None and not column.auto_increment))
+        if column is None or not column.auto_increment:
+            continue
+        name = quote_identifier(column.name)
+        identity = f"ALTER COLUMN {name} ADD GENERATED BY DEFAULT AS IDENTITY"
+        if not column.nullable:
+            identity = f"ALTER COLUMN {name} SET NOT NULL, {identity}"
+        edits.append((clause[0].start(), clause[-1].end(), identity))
+    if not any(removed) and not edits:
+        return statement
+    cuts = _definition_cuts(altered[1], removed)
+    if cuts is None:
+        return split_leading_trivia(statement)[0]
+    edits.extend((start, end, '') for start, end in cuts)
+    return _apply_edits(statement, sorted(edits))
+
+
+class PostDataSplitter:
+    """Take keys, indexes and foreign keys out of the table definitions of a dump
+    
+    split() is given the MySQL DDL statements in order and returns them
+    without their PRIMARY KEY, KEY / INDEX, UNIQUE and FOREIGN KEY parts,
+    whether written in CREATE TABLE (inline on a column too) or in ALTER
+    TABLE ... ADD. post_data_sql() gives them back as one PostgreSQL
+    statement each, to run once the rows are loaded: building an index
+    over loaded data is much cheaper than maintaining it row by row.
+    """
+    
+    def __init__(self):
+        self.indexes = []           # (table, Index), primary keys and unique keys included
+        self.foreign_keys = []      # (table, ForeignKey)
+    
+    def split(self, statement):
+        """Return statement without its key definitions; only its leading comments when nothing else is left"""
+        parsed = _create_table_body(statement)
+        if parsed is not None:
+            table, tokens = parsed
+            return self._split_create(statement, table, _split_definitions(tokens))
+        altered = parse_alter_table(statement)
+        if altered is not None and altered[1]:
+            table, clauses = altered
+            removed = [
+                clause[0].group().upper() == 'ADD' and self._take(table, clause[1:])
+                for clause in clauses
+            ]
+            if any(removed):
+                remaining = _cut_definitions(statement, clauses, removed)
+                # Keep the comments in front even when no clause is left
+                return split_leading_trivia(statement)[0] if remaining is None else remaining
+        return statement
+    
+    def _take(self, table, definition):
+        """Keep definition if it is a key or foreign key; returns True when it was"""
+        index = parse_index(definition)
+        if index is not None:
+            self.indexes.append((table, index))
+            return True
+        foreign_key = parse_foreign_key(definition)
+        if foreign_key is not None:
+            self.foreign_keys.append((table, foreign_key))
+            return True
+        return False
+    
+    def _split_create(self, statement, table, definitions):
+        removed = []
+        inline_cuts = []
+        for definition in definitions:
+            if self._take(table, definition):
+                removed.append(True)
+                continue
+            removed.append(False)
+            column = _parse_column(definition)
+            if column is None:
+                continue
+            # Column attributes PRIMARY KEY and UNIQUE [KEY]
+            for index in range(1, len(definition)):
+                upper = definition[index].group().upper() if definition[index].lastgroup == 'word' else None
+                following = definition[index + 1].group().upper() if index + 1 < len(definition) else None
+                if upper == 'PRIMARY' and following == 'KEY':
+                    kind, last = 'PRIMARY', index + 1
+                elif upper == 'UNIQUE':
+                    kind, last = 'UNIQUE', index + 1 if following == 'KEY' else index
+                else:
+                    continue
+                self.indexes.append((table, Index(None, kind, [column.name])))
+                inline_cuts.append((definition[index - 1].end(), definition[last].end()))
+        
+        if not any(removed) and not inline_cuts:
+            return statement
+        statement = _apply_cuts(statement, inline_cuts)
+        # Offsets after the inline cuts moved; parse again for the definition list
+        parsed = _create_table_body(statement)
+        definitions = _split_definitions(parsed[1])
+        return _cut_definitions(statement, definitions, removed) or statement
+    
+    def post_data_sql(self):
+        """Primary keys, unique keys and indexes, then foreign keys; '' when there are none"""
+        indexes = sorted(self.indexes, key=lambda item: item[1].kind != 'PRIMARY')
+        return (''.join(index_sql(table, index) for table, index in indexes)
+                + ''.join(foreign_key_sql(table, foreign_key) for table, foreign_key in self.foreign_keys))
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Schema-driven converter for MySQL table dumps
+Builds the PostgreSQL types, tables, comments and indexes from the dump's own DDL
+"""
+
+import argparse
+import os
+import re
+import sys
+from bisect import bisect_right
+from itertools import repeat
+
+from compressed_io import COMPRESSIONS, compression_suffix, find_file, open_file, strip_compression, with_compression
+from mapped_input import open_input
+from sql_lexer import is_insert_span, iter_row_spans, quote_identifier, tokenize
+from sql_rows import (
+    SIMPLE_VALUE_PATTERN, Raw, copy_field, insert_column_names, is_zero_date, iter_row_values, parse_insert_header,
+    string_value,
+)
+from sql_schema import (
+    SECTION_MARKER, UNSIGNED_TYPES, Index, SequenceTracker, base_type, column_kind, foreign_key_sql, index_sql,
+    parse_alter_column, parse_alter_table, parse_create_table, parse_create_table_details, parse_foreign_key,
+    parse_index, qualified_name, takes_zero_dates,
+)
+
+ORIGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'origin')
+OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+OUTPUT_FORMATS = ('insert', 'copy')
+
+# MySQL base type to PostgreSQL type
+COLUMN_TYPES = {
+    'TINYINT': 'SMALLINT',
+    'SMALLINT': 'SMALLINT',
+    'MEDIUMINT': 'INTEGER',
+    'INT': 'INTEGER',
+    'INTEGER': 'INTEGER',
+    'BIGINT': 'BIGINT',
+    'FLOAT': 'REAL',
+    'DOUBLE': 'DOUBLE PRECISION',
+    'DOUBLE PRECISION': 'DOUBLE PRECISION',
+    'REAL': 'DOUBLE PRECISION',
+    'DECIMAL': 'NUMERIC',
+    'NUMERIC': 'NUMERIC',
+    'CHAR': 'CHAR',
+    'VARCHAR': 'VARCHAR',
+    'TINYTEXT': 'TEXT',
+    'TEXT': 'TEXT',
+    'MEDIUMTEXT': 'TEXT',
+    'LONGTEXT': 'TEXT',
+    'SET': 'TEXT',
+    'DATETIME': 'TIMESTAMP',
+    'TIMESTAMP': 'TIMESTAMP',
+    'DATE': 'DATE',
+    'TIME': 'TIME',
+    'YEAR': 'SMALLINT',
+    'JSON': 'JSONB',
+    'BOOL': 'BOOLEAN',
+    'BOOLEAN': 'BOOLEAN',
+    'BINARY': 'BYTEA',
+    'VARBINARY': 'BYTEA',
+    'TINYBLOB': 'BYTEA',
+    'BLOB': 'BYTEA',
+    'MEDIUMBLOB': 'BYTEA',
+    'LONGBLOB': 'BYTEA',
+}
+
+# Types whose (length) or (precision, scale) carries over
+SIZED_TYPES = frozenset(('CHAR', 'VARCHAR', 'DECIMAL', 'NUMERIC'))
+
+SERIAL_TYPES = {'SMALLINT': 'SMALLSERIAL', 'INTEGER': 'SERIAL', 'BIGINT': 'BIGSERIAL'}
+
+CURRENT_TIMESTAMP_DEFAULTS = frozenset(('CURRENT_TIMESTAMP', 'CURRENT_TIMESTAMP()', 'NOW()', 'LOCALTIMESTAMP'))
+
+ZERO_DATES = frozenset(('0000-00-00', '0000-00-00 00:00:00'))
+
+# TINYINT(1) values and defaults as PostgreSQL booleans
+BOOLEAN_LITERALS = {'0': 'false', '1': 'true'}
+
+# Characters that mean a row cannot be copied over verbatim: MySQL escapes,
+# double-quoted strings and # comments
+DECODE_MARKERS = ('\\', '"', '#')
+
+# Dates that may be zero-dates; rows holding one that is (see
+# sql_rows.is_zero_date) are decoded when the table has date columns
+ZERO_DATE_CANDIDATE_PATTERN = re.compile(r"'(?:0000-|[0-9]{4}-(?:00|1[3-9]|[2-9][0-9])-|[0-9]{4}-[0-9][0-9]-(?:00|29|3[0-9]))")
+
+# One value of a row tuple and its comma, as SIMPLE_VALUE_PATTERN reads it
+SKIPPED_VALUE = r"""\s*(?:'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'|[+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|NULL|TRUE|FALSE)\s*,"""
+
+
+def sql_literal(value):
+    """Format a decoded row value as a PostgreSQL literal"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, Raw):
+        return value.text
+    return "'" + value.replace("'", "''") + "'"
+
+
+def bytea_hex(value):
+    """Hex digits of a binary string value or a 0x... literal"""
+    if isinstance(value, Raw):
+        return value.text[2:] if value.text[:2].lower() == '0x' else value.text
+    return value.encode('utf-8').hex()
+
+
+def bytea_literal(value):
+    """Format a decoded binary string value as a bytea hex literal"""
+    return 'NULL' if value is None else "'\\x" + bytea_hex(value) + "'"
+
+
+def _quote_list(names):
+    return ', '.join(quote_identifier(name) for name in names)
+
+
+class TableSchema:
+    """One MySQL table as declared by CREATE TABLE and the ALTER TABLE statements after it"""
+    
+    def __init__(self, name, columns, indexes, foreign_keys, comment):
+        self.name = name
+        self.columns = columns                    # [Column] in CREATE TABLE order
+        self.indexes = indexes                    # [Index], the primary key included
+        self.foreign_keys = foreign_keys          # [ForeignKey]
+        self.comment = comment
+        self.auto_increment = {column.name for column in columns if column.auto_increment}
+    
+    @classmethod
+    def from_statement(cls, statement):
+        """Build a TableSchema from a CREATE TABLE statement, or return None"""
+        definition = parse_create_table(statement)
+        if definition is None:
+            return None
+        name, columns = definition
+        indexes, foreign_keys, comment = parse_create_table_details(statement)
+        return cls(name, columns, indexes, foreign_keys, comment)
+    
+    def apply_alter(self, clauses):
+        """Take keys, foreign keys and AUTO_INCREMENT from ALTER TABLE clauses"""
+        for clause in clauses:
+            if clause[0].group().upper() == 'ADD':
+                index = parse_index(clause[1:])
+                if index is not None:
+                    self.indexes.append(index)
+                    continue
+                foreign_key = parse_foreign_key(clause[1:])
+                if foreign_key is not None:
+                    self.foreign_keys.append(foreign_key)
+                continue
+            column = parse_alter_column(clause)
+            if column is not None and column.auto_increment:
+                self.auto_increment.add(column.name)
+    
+    @property
+    def primary_key(self):
+        for index in self.indexes:
+            if index.kind == 'PRIMARY':
+                return index.columns
+        return [column.name for column in self.columns if column.primary_key]
+    
+    def enum_type_name(self, column):
+        return f"{self.name}_{column.name}_enum"
+    
+    def column_type(self, column):
+        """PostgreSQL type for column, SERIAL types for AUTO_INCREMENT columns"""
+        type_name = base_type(column.type)
+        if type_name == 'ENUM':
+            return self.enum_type_name(column)
+        kind = column_kind(column)
+        if kind == 'json':
+            return 'JSONB'
+        if kind == 'boolean':
+            return 'BOOLEAN'
+        if 'UNSIGNED' in column.type.upper() and type_name in UNSIGNED_TYPES:
+            postgres_type = UNSIGNED_TYPES[type_name]
+        else:
+            postgres_type = COLUMN_TYPES.get(type_name, 'TEXT')
+            if type_name in SIZED_TYPES and '(' in column.type:
+                postgres_type += column.type[column.type.index('('):column.type.index(')') + 1].replace(' ', '')
+        if column.name in self.auto_increment:
+            return SERIAL_TYPES.get(postgres_type, postgres_type)
+        return postgres_type
+    
+    def column_default(self, column):
+        """PostgreSQL DEFAULT expression for column, or None"""
+        default = column.default
+        if default is None or column.name in self.auto_increment:
+            return None
+        upper = default.replace(' ', '').upper()
+        if upper == 'NULL':
+            return 'NULL'
+        if upper in CURRENT_TIMESTAMP_DEFAULTS:
+            return 'CURRENT_TIMESTAMP'
+        if default.startswith("'"):
+            value = string_value(default)
+            if value in ZERO_DATES:
+                return None
+            if value in BOOLEAN_LITERALS and column_kind(column) == 'boolean':
+                return BOOLEAN_LITERALS[value]
+            return sql_literal(value)
+        if default in BOOLEAN_LITERALS and column_kind(column) == 'boolean':
+            return BOOLEAN_LITERALS[default]
+        return default
+    
+    def enum_values(self, column):
+        return [string_value(text) for kind, text in tokenize(column.type) if kind == 'string']
+    
+    def types_sql(self):
+        """CREATE TYPE statements for the ENUM columns"""
+        return ''.join(
+            f"CREATE TYPE {self.enum_type_name(column)} AS ENUM "
+            f"({', '.join(sql_literal(value) for value in self.enum_values(column))});\n"
+            for column in self.columns if base_type(column.type) == 'ENUM'
+        )
+    
+    def create_sql(self):
+        """CREATE TABLE without keys; indexes_sql() adds them after the data"""
+        lines = []
+        for column in self.columns:
+            line = f"    {quote_identifier(column.name)} {self.column_type(column)}"
+            if not column.nullable and column.name not in self.auto_increment and not takes_zero_dates(column):
+                line += ' NOT NULL'
+            default = self.column_default(column)
+            if default is not None:
+                line += f" DEFAULT {default}"
+            lines.append(line)
+        return f"CREATE TABLE {quote_identifier(self.name)} (\n" + ',\n'.join(lines) + "\n);\n"
+    
+    def comments_sql(self):
+        table = quote_identifier(self.name)
+        statements = []
+        if self.comment:
+            statements.append(f"COMMENT ON TABLE {table} IS {sql_literal(self.comment)};\n")
+        for column in self.columns:
+            if column.comment:
+                statements.append(
+                    f"COMMENT ON COLUMN {table}.{quote_identifier(column.name)} IS {sql_literal(column.comment)};\n"
+                )
+        return ''.join(statements)
+    
+    def indexes_sql(self):
+        """The primary key, then the other keys, one statement each"""
+        statements = []
+        if self.primary_key:
+            statements.append(index_sql(self.name, Index(None, 'PRIMARY', self.primary_key)))
+        for index in self.indexes:
+            if index.kind != 'PRIMARY':
+                statements.append(index_sql(self.name, index))
+        return ''.join(statements)
+    
+    def foreign_keys_sql(self):
+        return ''.join(foreign_key_sql(self.name, foreign_key) for foreign_key in self.foreign_keys)
+    
+    def value_formatters(self, column_names, copy=False):
+        """One formatter per INSERT column, picked once from the column's kind"""
+        columns = {column.name: column for column in self.columns}
+        formatters = []
+        for name in column_names:
+            column = columns.get(name)
+            kind = column_kind(column) if column is not None else None
+            if kind == 'date':
+                formatters.append(_zero_date_copy if copy else _zero_date_sql)
+            elif kind == 'boolean':
+                formatters.append(copy_field if copy else _boolean_sql)
+            elif column is not None and self.column_type(column) == 'BYTEA':
+                formatters.append(_bytea_copy if copy else bytea_literal)
+            else:
+                formatters.append(copy_field if copy else sql_literal)
+        return formatters
+
+
+def _zero_date_sql(value):
+    return 'NULL' if isinstance(value, str) and is_zero_date(value) else sql_literal(value)
+
+
+def _boolean_sql(value):
+    text = value.text if isinstance(value, Raw) else value
+    return BOOLEAN_LITERALS.get(text, sql_literal(value))
+
+
+def _zero_date_copy(value):
+    return copy_field(None if isinstance(value, str) and is_zero_date(value) else value)
+
+
+def _bytea_copy(value):
+    return copy_field(None) if value is None else '\\\\x' + bytea_hex(value)
+
+
+def _decode_positions(statement, start):
+    """Offsets from start of the decode markers in statement"""
+    positions = []
+    for marker in DECODE_MARKERS:
+        position = statement.find(marker, start)
+        while position != -1:
+            positions.append(position)
+            position = statement.find(marker, position + 1)
+    return positions
+
+
+def _zero_date_positions(statement, start):
+    """Offsets from start of the zero-date literals in statement"""
+    return [
+        match.start() for match in ZERO_DATE_CANDIDATE_PATTERN.finditer(statement, start)
+        if is_zero_date(statement[match.start() + 1:match.start() + 11])
+    ]
+
+
+def _rows_at(starts, ends, positions):
+    """Indices of the rows (starts[i], ends[i]) that hold one of positions"""
+    rows = set()
+    for position in positions:
+        index = bisect_right(starts, position) - 1
+        if index >= 0 and position < ends[index]:
+            rows.add(index)
+    return rows
+
+
+def _numbers_at(statement, starts, index):
+    """The index-th value of every row tuple starting at starts, where it is a number read with SIMPLE_VALUE_PATTERN"""
+    pattern = re.compile(
+        r'\((?:' + SKIPPED_VALUE + r'){%d}\s*([+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\s*[,)]' % index,
+        re.IGNORECASE | re.DOTALL,
+    )
+    return [match.group(1) for match in map(pattern.match, repeat(statement), starts) if match is not None]
+
+
+class DumpConverter:
+    """Convert one MySQL dump file with the DDL read from the dump itself
+    
+    The first pass reads CREATE TABLE and ALTER TABLE statements (phpMyAdmin
+    puts the keys and AUTO_INCREMENT after the data), the second writes the
+    pg_restore-style sections: types, tables and comments (pre-data), the
+    rows (data), then keys, indexes, foreign keys and sequence resets
+    (post-data). Rows are split by one compiled regex match per
+    tuple and copied verbatim unless they hold MySQL escapes or values a
+    column needs changed; only then are they decoded.
+    """
+    
+    def __init__(self, output_format='insert'):
+        self.output_format = output_format
+        self.tables = {}              # name -> TableSchema, in dump order
+        self.sequences = SequenceTracker()
+        self.rows = 0
+    
+    def read_schema(self, mysql_path):
+        """First pass: collect the table definitions of mysql_path
+        
+        INSERT statements are recognised on the mapped bytes and never decoded.
+        """
+        with open_input(mysql_path) as mapped:
+            for start, end, is_data in mapped.iter_spans():
+                if is_data or is_insert_span(mapped.buffer, start, end):
+                    continue
+                statement = mapped.text(start, end)
+                schema = TableSchema.from_statement(statement)
+                if schema is not None:
+                    self.tables[schema.name] = schema
+                    self.sequences.observe(statement)
+                    continue
+                altered = parse_alter_table(statement)
+                if altered is not None and altered[0] in self.tables:
+                    self.tables[altered[0]].apply_alter(altered[1])
+                    self.sequences.observe(statement)
+    
+    def schema_sql(self):
+        parts = []
+        # Same-named ENUM columns of several tables share one type
+        types = ''.join(dict.fromkeys(
+            line for schema in self.tables.values() for line in schema.types_sql().splitlines(True)
+        ))
+        if types:
+            parts.append("-- Create custom enum types for PostgreSQL\n" + types)
+        for schema in self.tables.values():
+            parts.append(f"-- Create {schema.name} table\n" + schema.create_sql())
+            comments = schema.comments_sql()
+            if comments:
+                parts.append("-- Table and column comments\n" + comments)
+        return '\n'.join(parts) + '\n'
+    
+    def post_data_sql(self):
+        """Keys, indexes, foreign keys and sequence resets, one independent statement each"""
+        parts = []
+        indexes = ''.join(schema.indexes_sql() for schema in self.tables.values())
+        if indexes:
+            parts.append("-- Create keys and indexes after the data is loaded\n" + indexes)
+        foreign_keys = ''.join(schema.foreign_keys_sql() for schema in self.tables.values())
+        if foreign_keys:
+            parts.append("-- Foreign keys (load the referenced tables first)\n" + foreign_keys)
+        return '\n' + SECTION_MARKER.format('post-data') + '\n'.join(parts) + self.sequences.reset_sql()
+    
+    def convert_insert(self, statement):
+        """Return the PostgreSQL text for one MySQL INSERT statement"""
+        trivia, match = parse_insert_header(statement)
+        schema = self.tables.get(qualified_name(match.group('table')))
+        if schema is None:
+            return ''
+        column_list = match.group('columns')
+        names = insert_column_names(column_list) if column_list else [column.name for column in schema.columns]
+        copy = self.output_format == 'copy'
+        formatters = schema.value_formatters(names, copy)
+        decode_always = copy or any(formatter in (bytea_literal, _boolean_sql) for formatter in formatters)
+        dates = _zero_date_sql in formatters
+        serial = {
+            index: name for index, name in enumerate(names)
+            if name in self.sequences.tables[schema.name].serial_columns()
+        }
+        maxima = {}
+        
+        start = len(trivia) + match.end()
+        spans = list(iter_row_spans(statement, start))
+        starts = [row_start for row_start, _ in spans]
+        lines = [statement[row_start:row_end] for row_start, row_end in spans]
+        if decode_always:
+            decoded = range(len(spans))
+        else:
+            # One scan of the whole statement finds what forces a row to be
+            # decoded; every other row is copied over verbatim
+            positions = _decode_positions(statement, start)
+            if dates:
+                positions += _zero_date_positions(statement, start)
+            decoded = sorted(_rows_at(starts, [row_end for _, row_end in spans], positions))
+        for row in decoded:
+            values = next(iter_row_values(lines[row]))
+            for index in serial:
+                value = values[index]
+                if isinstance(value, Raw) and value.kind == 'number':
+                    maxima[index] = max(maxima.get(index, 0), int(value.text))
+            if copy:
+                for value in values:
+                    if isinstance(value, Raw) and value.kind == 'expression':
+                        raise ValueError(f"{schema.name}: {value.text} cannot be written in COPY format")
+                lines[row] = '\t'.join(formatter(value) for formatter, value in zip(formatters, values)) + '\n'
+            else:
+                lines[row] = '(' + ', '.join(formatter(value) for formatter, value in zip(formatters, values)) + ')'
+        if serial and len(decoded) < len(spans):
+            if decoded:
+                skipped = set(decoded)
+                starts = [row_start for row, row_start in enumerate(starts) if row not in skipped]
+            for index in serial:
+                numbers = _numbers_at(statement, starts, index)
+                if numbers:
+                    maxima[index] = max(maxima.get(index, 0), max(map(int, numbers)))
+        self.sequences.update(schema.name, serial, maxima)
+        self.rows += len(lines)
+        
+        table = quote_identifier(schema.name)
+        if copy:
+            return f"COPY {table} ({_quote_list(names)}) FROM stdin;\n" + ''.join(lines) + "\\.\n"
+        return f"INSERT INTO {table} ({_quote_list(names)}) VALUES\n" + ',\n'.join(lines) + ";\n"
+    
+    def convert(self, mysql_path, postgres_path):
+        """Convert mysql_path into postgres_path; returns the number of rows written"""
+        self.read_schema(mysql_path)
+        if not self.tables:
+            raise ValueError(f"{os.path.basename(mysql_path)} has no CREATE TABLE statement")
+        
+        names = ', '.join(self.tables)
+        temp_path = postgres_path + '.tmp'
+        with open_input(mysql_path) as mapped, \
+                open_file(temp_path, 'w', compression_suffix(postgres_path)) as output:
+            output.write(f"-- PostgreSQL version of {names}\n"
+                         f"-- Converted from MySQL by table_converter.py\n"
+                         f"-- Original file: {os.path.basename(mysql_path)}\n\n")
+            output.write(SECTION_MARKER.format('pre-data'))
+            output.write(self.schema_sql())
+            output.write(SECTION_MARKER.format('data'))
+            output.write(f"-- Insert {names} data\n")
+            for start, end, is_data in mapped.iter_spans():
+                if is_data or not is_insert_span(mapped.buffer, start, end):
+                    continue
+                statement = mapped.text(start, end)
+                if parse_insert_header(statement) is not None:
+                    output.write(self.convert_insert(statement))
+            output.write(self.post_data_sql())
+        os.replace(temp_path, postgres_path)
+        return self.rows
+
+
+def convert_table_file(mysql_path, postgres_path, output_format='insert'):
+    """Convert one MySQL table dump; returns the number of rows written"""
+    return DumpConverter(output_format).convert(mysql_path, postgres_path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert MySQL table dumps using the DDL they contain")
+    parser.add_argument('tables', nargs='*',
+                        help="tables to convert, by dump name (default: every .sql, .sql.gz, .sql.xz "
+                             "and .sql.bz2 file in --origin)")
+    parser.add_argument('--origin', default=ORIGIN_DIR,
+                        help="directory holding the MySQL dumps (default: %(default)s)")
+    parser.add_argument('--output', default=OUTPUT_DIR,
+                        help="directory for the <table>_postgres.sql files (default: %(default)s)")
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='insert',
+                        help="write the rows as INSERT statements or COPY ... FROM stdin blocks")
+    parser.add_argument('--compress', choices=COMPRESSIONS, default=None,
+                        help="write <table>_postgres.sql.gz, .xz or .bz2 instead of plain files")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    tables = args.tables or sorted({
+        strip_compression(filename)[:-4] for filename in os.listdir(args.origin)
+        if strip_compression(filename).endswith('.sql')
+    })
+    
+    failures = 0
+    for table in tables:
+        mysql_path = os.path.join(args.origin, f"{table}.sql")
+        mysql_path = find_file(mysql_path) or mysql_path
+        postgres_path = with_compression(os.path.join(args.output, f"{table}_postgres.sql"), args.compress)
+        try:
+            rows = convert_table_file(mysql_path, postgres_path, args.output_format)
+        except (OSError, ValueError) as e:
+            failures += 1
+            print(f"✗ {table}: {e}")
+            continue
+        print(f"✓ {table}: {rows:,} rows → {os.path.basename(postgres_path)}")
+    
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Shared fixtures: the scripts sit one directory up and import each other as
+siblings, and the loader tests need a throwaway PostgreSQL cluster.
+"""
+
+import glob
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+DATABASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORIGIN_DIR = os.path.join(DATABASE_DIR, 'database', 'origin')
+
+sys.path.insert(0, DATABASE_DIR)
+
+from load_database import PSQL_OPTIONS, TemporaryCluster  # noqa: E402
+from mysql_to_postgres_bulk import MySQLToPostgreSQLConverter  # noqa: E402
+
+_database_numbers = itertools.count(1)
+
+
+def query(dsn, sql):
+    """Run one query with psql; returns its output as unaligned text"""
+    result = subprocess.run(
+        ['psql', *PSQL_OPTIONS, '-d', dsn, '-At', '-c', sql],
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip()
+
+
+def create_database(cluster):
+    """Create a new, empty database in the cluster; returns its connection string"""
+    name = f'test_{next(_database_numbers)}'
+    query(cluster.dsn, f'CREATE DATABASE {name}')
+    return cluster.dsn.replace('dbname=postgres', f'dbname={name}')
+
+
+@pytest.fixture(scope='session')
+def cluster():
+    """A running TemporaryCluster, skipped where initdb cannot run"""
+    if shutil.which('initdb') is None:
+        pytest.skip("initdb is not on PATH")
+    if hasattr(os, 'geteuid') and os.geteuid() == 0:
+        pytest.skip("initdb refuses to run as root")
+    with TemporaryCluster() as temporary:
+        yield temporary
+
+
+@pytest.fixture
+def database(cluster):
+    """Connection string of a new, empty database in the cluster"""
+    return create_database(cluster)
+
+
+@pytest.fixture
+def converted_origin(tmp_path):
+    """A copy of the origin dumps with their deterministic conversions"""
+    for path in glob.glob(os.path.join(ORIGIN_DIR, '*.sql')):
+        shutil.copy(path, tmp_path)
+    MySQLToPostgreSQLConverter(str(tmp_path), deterministic=True).run_conversion()
+    return tmp_path
@@ -0,0 +1,37 @@
+"""
+Load the converted origin dumps into a temporary cluster with psql's
+ON_ERROR_STOP and compare the row counts with the MySQL dumps.
+"""
+
+import os
+
+from check_parity import summarize
+from conftest import ORIGIN_DIR, query
+from load_database import find_dump_files, load_files, resolve_dependencies, run_post_data
+
+# The origin event_status_type dump is structure only, so the foreign key
+# event_type.status_id -> event_status_type cannot be created on its rows
+KNOWN_POST_DATA_ERRORS = {'event_type_postgres.sql': 'event_status_type'}
+
+
+def mysql_rows(dump):
+    name = dump.name[:-len('_postgres.sql')] + '.sql'
+    tables = summarize(os.path.join(ORIGIN_DIR, name))['tables']
+    return {table: tables.get(table, {}).get('rows', 0) for table in dump.tables}
+
+
+def test_origin_dumps_load(database, converted_origin):
+    files = find_dump_files(str(converted_origin))
+    assert len(files) == len([name for name in os.listdir(ORIGIN_DIR) if name.endswith('.sql')])
+    resolve_dependencies(files)
+    load_files(files, database, jobs=2)
+    run_post_data(files, database, jobs=2)
+    
+    for dump in files:
+        if dump.name in KNOWN_POST_DATA_ERRORS:
+            assert dump.status == 'post-data error', dump.name
+            assert KNOWN_POST_DATA_ERRORS[dump.name] in dump.error
+        else:
+            assert dump.status == 'loaded', f"{dump.name}: {dump.error}"
+        for table, rows in mysql_rows(dump).items():
+            assert int(query(database, f'SELECT count(*) FROM "{table}"')) == rows, table
@@ -0,0 +1,52 @@
+"""
+rewrite_tokens and its stage wrappers on the text of a whole dump, where
+statement-level rewrites have to apply to every statement.
+"""
+
+from mysql_to_postgres_bulk import CONVERSION_STAGES, MySQLToPostgreSQLConverter
+
+DUMP = """-- phpMyAdmin SQL Dump
+SET SQL_MODE = "NO_AUTO_VALUE_ON_ZERO";
+START TRANSACTION;
+SET time_zone = "+00:00";
+
+CREATE TABLE `t` (
+  `id` int(11) UNSIGNED NOT NULL COMMENT 'key; with a semicolon',
+  `name` varchar(20) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO `t` (`id`, `name`) VALUES
+(1, 'one; two'),
+(2, 'three');
+
+ALTER TABLE `t`
+  MODIFY `id` int(11) UNSIGNED NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=3;
+COMMIT;
+"""
+
+
+def converter(tmp_path):
+    return MySQLToPostgreSQLConverter(str(tmp_path))
+
+
+def test_convert_syntax_keeps_every_statement(tmp_path):
+    converted = converter(tmp_path).convert_syntax(DUMP)
+    assert 'SET SQL_MODE' not in converted and 'SET time_zone' not in converted
+    assert 'START TRANSACTION;' in converted
+    assert 'CREATE TABLE "t"' in converted
+    assert "COMMENT ON COLUMN \"t\".\"id\" IS 'key; with a semicolon';" in converted
+    assert "(1, 'one; two'),\n(2, 'three');" in converted
+    assert 'ADD GENERATED BY DEFAULT AS IDENTITY' in converted
+    assert converted.rstrip().endswith('COMMIT;')
+
+
+def test_rewrite_tokens_whole_dump_matches_statement_by_statement(tmp_path):
+    whole = converter(tmp_path).rewrite_tokens(DUMP)[0]
+    assert whole == converter(tmp_path).rewrite_typed(DUMP, CONVERSION_STAGES)
+    assert 'INSERT INTO "t"' in whole and 'COMMIT;' in whole
+
+
+def test_rewrite_tokens_single_statement(tmp_path):
+    assert converter(tmp_path).rewrite_tokens('\nSET SQL_MODE = "";') == ('\n', [])
+    statement = "INSERT INTO `t` VALUES (1, 'a;b');"
+    assert converter(tmp_path).rewrite_tokens(statement)[0] == "INSERT INTO \"t\" VALUES (1, 'a;b');"
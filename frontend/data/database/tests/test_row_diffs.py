@@ -0,0 +1,114 @@
+"""
+Row-level differences: check_parity between a dump and its conversion,
+dump_delta between two versions of a dump.
+"""
+
+import contextlib
+import io
+
+import pytest
+
+from check_parity import check_parity, find_pairs
+from dump_delta import dump_delta
+from mysql_to_postgres_bulk import MySQLToPostgreSQLConverter
+
+DUMP = """CREATE TABLE `t` (
+  `id` int(11) NOT NULL,
+  `name` varchar(20) NOT NULL,
+  `created` datetime NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO `t` (`id`, `name`, `created`) VALUES
+(1, 'one', '2024-01-01 00:00:00'),
+(2, 'it\\'s', '0000-00-00 00:00:00'),
+(3, 'three', '2024-01-03 00:00:00');
+
+ALTER TABLE `t`
+  ADD PRIMARY KEY (`id`);
+
+ALTER TABLE `t`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=4;
+"""
+
+ROWS = """(1, 'one', '2024-01-01 00:00:00'),
+(2, 'it\\'s', '0000-00-00 00:00:00'),
+(3, 'three', '2024-01-03 00:00:00');"""
+
+
+@pytest.fixture
+def converted(tmp_path):
+    """(origin directory, output directory) holding t.sql and its conversion"""
+    origin = tmp_path / 'origin'
+    output = tmp_path / 'output'
+    origin.mkdir()
+    output.mkdir()
+    (origin / 't.sql').write_text(DUMP, encoding='utf-8')
+    (output / 't.sql').write_text(DUMP, encoding='utf-8')
+    with contextlib.redirect_stdout(io.StringIO()):
+        MySQLToPostgreSQLConverter(str(output), deterministic=True).run_conversion()
+    return origin, output
+
+
+def parity(origin, output):
+    results = check_parity(find_pairs(str(origin), str(output)))
+    assert len(results) == 1
+    return results[0]
+
+
+def test_parity_match_through_conversion(converted):
+    # The zero-date became NULL and it\'s an escaped quote: both count as equal
+    result = parity(*converted)
+    assert result['status'] == 'match'
+    assert result['mysql_rows'] == result['postgres_rows'] == 3
+
+
+def test_parity_row_differences(converted):
+    origin, output = converted
+    path = output / 't_postgres.sql'
+    text = path.read_text(encoding='utf-8')
+    text = text.replace("(1, 'one', '2024-01-01 00:00:00'),\n", '')
+    text = text.replace("(3, 'three', '2024-01-03 00:00:00')", "(3, 'THREE', '2024-01-03 00:00:00'),\n"
+                                                                   "(4, 'four', '2024-01-04 00:00:00')")
+    path.write_text(text, encoding='utf-8')
+    
+    result = parity(origin, output)
+    assert result['status'] == 'mismatch'
+    assert result['differing_rows'] == 3
+    assert result['primary_key'] == ['id']
+    assert [(difference['key'], difference['kind']) for difference in result['differences']] == [
+        (['1'], 'missing'), (['3'], 'changed'), (['4'], 'extra'),
+    ]
+    assert result['differences'][1]['columns'] == ['name']
+
+
+def test_dump_delta(tmp_path):
+    old = tmp_path / 'old.sql'
+    new = tmp_path / 'new.sql'
+    output = tmp_path / 'new_delta.sql'
+    old.write_text(DUMP, encoding='utf-8')
+    new.write_text(DUMP.replace(ROWS, """(2, 'it\\'s', '0000-00-00 00:00:00'),
+(3, 'THREE', '2024-01-03 00:00:00'),
+(4, 'four', '2024-01-04 00:00:00');"""), encoding='utf-8')
+
+    results, _ = dump_delta(str(old), str(new), str(output))
+    assert [(result['table'], result['status'], result['inserted'], result['updated'], result['deleted'])
+            for result in results] == [('t', 'changed', 1, 1, 1)]
+
+    delta = output.read_text(encoding='utf-8')
+    assert delta.index('BEGIN;') < delta.index('DELETE FROM "t" WHERE "id" IN (\'1\');') \
+        < delta.index('INSERT INTO "t"') < delta.index('SELECT setval(') < delta.index('COMMIT;')
+    assert "('3', 'THREE', '2024-01-03 00:00:00'),\n('4', 'four', '2024-01-04 00:00:00')\n" in delta
+    assert 'ON CONFLICT ("id") DO UPDATE SET "name" = EXCLUDED."name"' in delta
+    # Row 2 is the same in both dumps
+    assert "('2'" not in delta
+
+
+def test_dump_delta_unchanged(tmp_path):
+    old = tmp_path / 'old.sql'
+    new = tmp_path / 'new.sql'
+    output = tmp_path / 'new_delta.sql'
+    old.write_text(DUMP, encoding='utf-8')
+    new.write_text(DUMP, encoding='utf-8')
+    results, _ = dump_delta(str(old), str(new), str(output))
+    assert [result['status'] for result in results] == ['unchanged']
+    assert not output.exists()
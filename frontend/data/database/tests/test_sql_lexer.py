@@ -0,0 +1,82 @@
+"""
+Statement and row splitting in sql_lexer, with statements and literals
+straddling the chunks they are read in.
+"""
+
+import io
+
+import pytest
+
+from sql_lexer import CopyData, iter_row_spans, iter_statements, split_insert_rows, split_leading_trivia
+
+DUMP = (
+    "-- header; with a semicolon\n"
+    "SET NAMES utf8mb4;\n"
+    "/* block; comment */\n"
+    "CREATE TABLE `t` (`a` int, `b` text);\n"
+    "INSERT INTO `t` VALUES (1, 'semi;colon'), (2, 'it\\'s; here'), (3, 'doubled '' quote;');\n"
+    "# hash comment ; still a comment\n"
+    "INSERT INTO `t` VALUES (4, \"double; quoted\"), (5, '`tick;`');\n"
+)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 16, 64, len(DUMP)])
+def test_iter_statements_across_chunk_boundaries(chunk_size):
+    statements = list(iter_statements(io.StringIO(DUMP), chunk_size))
+    assert ''.join(statements) == DUMP
+    bodies = [split_leading_trivia(statement)[1] for statement in statements]
+    assert bodies == [
+        "SET NAMES utf8mb4;",
+        "CREATE TABLE `t` (`a` int, `b` text);",
+        "INSERT INTO `t` VALUES (1, 'semi;colon'), (2, 'it\\'s; here'), (3, 'doubled '' quote;');",
+        "INSERT INTO `t` VALUES (4, \"double; quoted\"), (5, '`tick;`');",
+        "",
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 12, 4096])
+def test_iter_statements_copy_data(chunk_size):
+    dump = (
+        "COPY t (a, b) FROM stdin;\n"
+        "1\tsemi;colon\n"
+        "2\t\\N\n"
+        "\\.\n"
+        "SELECT 1;\n"
+    )
+    statements = list(iter_statements(io.StringIO(dump), chunk_size))
+    assert ''.join(statements) == dump
+    data = ''.join(statement for statement in statements if isinstance(statement, CopyData))
+    assert data == "\n1\tsemi;colon\n2\t\\N\n\\.\n"
+    sql = [statement for statement in statements if not isinstance(statement, CopyData)]
+    assert sql == ["COPY t (a, b) FROM stdin;", "SELECT 1;", "\n"]
+
+
+def test_split_insert_rows_cuts_after_whole_rows():
+    rows = ["(1, 'a,(b)')", "(2, 'x\\')')", "(3, NOW())", "(4, 'd')"]
+    statement = "INSERT INTO t VALUES " + ', '.join(rows) + ';'
+    # Just past the comma after each row
+    row_ends = {statement.index(row) + len(row) + 1 for row in rows}
+    for batch_size in range(1, len(statement) + 2):
+        pieces = split_insert_rows(statement, batch_size)
+        assert ''.join(pieces) == statement
+        cut = 0
+        for piece in pieces[:-1]:
+            cut += len(piece)
+            assert cut in row_ends
+
+
+def test_split_insert_rows_short_statement():
+    statement = "INSERT INTO t VALUES (1), (2);"
+    assert split_insert_rows(statement, len(statement)) == [statement]
+
+
+def test_iter_row_spans():
+    statement = "VALUES (1, 'a)'), (2, NOW()) /* c */, (3, '--')"
+    rows = [statement[start:end] for start, end in iter_row_spans(statement, len('VALUES '))]
+    assert rows == ["(1, 'a)')", "(2, NOW())", "(3, '--')"]
+
+
+def test_iter_row_spans_escaped_quotes():
+    rows = ["(1, 'it''s )')", "(2, 'a\\\\')", "(3, 'b\\')')", '(4, "q"")", \'x\')', "(5, '''')", "(6, f(''''))"]
+    statement = 'VALUES ' + ', '.join(rows)
+    assert [statement[start:end] for start, end in iter_row_spans(statement, len('VALUES '))] == rows
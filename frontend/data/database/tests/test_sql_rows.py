@@ -0,0 +1,108 @@
+"""
+Row rewriting in sql_rows: COPY text escaping, INSERT and COPY re-chunking and
+the dates MySQL stores as zero-dates.
+"""
+
+import pytest
+
+from sql_lexer import split_insert_rows
+from sql_rows import insert_to_copy, is_zero_date, rechunk_copy, rechunk_insert
+
+
+def test_insert_to_copy_escapes():
+    statement = (
+        "-- rows\n"
+        "INSERT INTO `t` (`a`, `b`) VALUES (1, 'tab\there'), (2, 'line\\nbreak'), "
+        "(3, 'back\\\\slash'), (4, NULL), (5, 'it''s'), (6, '\\\\N'), (7, 'cr\\rlf\\n');"
+    )
+    assert insert_to_copy(statement) == (
+        "-- rows\n"
+        "COPY `t` (`a`, `b`) FROM stdin;\n"
+        "1\ttab\\there\n"
+        "2\tline\\nbreak\n"
+        "3\tback\\\\slash\n"
+        "4\t\\N\n"
+        "5\tit's\n"
+        "6\t\\\\N\n"
+        "7\tcr\\rlf\\n\n"
+        "\\.\n"
+    )
+
+
+def test_insert_to_copy_keeps_expressions_as_insert():
+    assert insert_to_copy("INSERT INTO t VALUES (1, NOW());") is None
+
+
+def test_insert_to_copy_pieces():
+    statement = "INSERT INTO t (a) VALUES (1), (2), (3);"
+    pieces = split_insert_rows(statement, 1)
+    assert len(pieces) == 3
+    copied = ''.join(
+        insert_to_copy(piece, first=index == 0, last=index == len(pieces) - 1)
+        for index, piece in enumerate(pieces)
+    )
+    assert copied == "COPY t (a) FROM stdin;\n1\n2\n3\n\\.\n"
+
+
+def test_rechunk_insert_rows_per_statement():
+    statement = "-- c\nINSERT INTO t (a) VALUES (1),(2),(3);"
+    assert rechunk_insert(statement, rows_per_statement=2) == [
+        "-- c\nINSERT INTO t (a) VALUES (1),(2);",
+        "\nINSERT INTO t (a) VALUES (3);",
+    ]
+    assert rechunk_insert(statement, rows_per_statement=3) == [statement]
+
+
+def test_rechunk_insert_counts_utf8_bytes():
+    statement = "INSERT INTO t (a) VALUES ('éé'),('éé'),('a');"
+    # 26 bytes of header and 10 per ('éé') row with its separator: two fit in 46, not in 45
+    assert rechunk_insert(statement, max_statement_bytes=46) == [
+        "INSERT INTO t (a) VALUES ('éé'),('éé');",
+        "\nINSERT INTO t (a) VALUES ('a');",
+    ]
+    assert rechunk_insert(statement, max_statement_bytes=45)[0] == "INSERT INTO t (a) VALUES ('éé');"
+
+
+def test_rechunk_insert_oversized_row_stays_whole():
+    statement = "INSERT INTO t (a) VALUES ('long value'),('x');"
+    assert rechunk_insert(statement, max_statement_bytes=10) == [
+        "INSERT INTO t (a) VALUES ('long value');",
+        "\nINSERT INTO t (a) VALUES ('x');",
+    ]
+
+
+def test_rechunk_copy_rows_per_statement():
+    block = "-- c\nCOPY t (a) FROM stdin;\n1\n2\n3\n\\.\n"
+    assert rechunk_copy(block, rows_per_statement=2) == [
+        "-- c\nCOPY t (a) FROM stdin;\n1\n2\n\\.\n",
+        "\nCOPY t (a) FROM stdin;\n3\n\\.\n",
+    ]
+    assert rechunk_copy(block, rows_per_statement=3) == [block]
+
+
+def test_rechunk_copy_counts_utf8_bytes():
+    block = "COPY t (a) FROM stdin;\néé\néé\na\n\\.\n"
+    # 23 bytes of COPY line, 3 of terminator and 5 per éé line: two fit in 36, not in 35
+    assert rechunk_copy(block, max_statement_bytes=36) == [
+        "COPY t (a) FROM stdin;\néé\néé\n\\.\n",
+        "\nCOPY t (a) FROM stdin;\na\n\\.\n",
+    ]
+    assert rechunk_copy(block, max_statement_bytes=35)[0] == "COPY t (a) FROM stdin;\néé\n\\.\n"
+    assert rechunk_copy("COPY t (a) FROM stdin;\n\\.\n", max_statement_bytes=1) == ["COPY t (a) FROM stdin;\n\\.\n"]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('0000-00-00', True),
+    ('0000-00-00 00:00:00', True),
+    ('2024-00-10', True),
+    ('2024-13-01', True),
+    ('2024-11-00', True),
+    ('2024-11-31 10:00:00', True),
+    ('2023-02-29', True),
+    ('2024-02-29', False),
+    ('2024-11-30', False),
+    ('2024-01-28', False),
+    ('not a date', False),
+])
+def test_is_zero_date(value, expected):
+    assert is_zero_date(value) is expected
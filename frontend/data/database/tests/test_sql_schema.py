@@ -0,0 +1,91 @@
+"""
+SequenceTracker and PostDataSplitter over phpMyAdmin-style DDL, where the
+keys and AUTO_INCREMENT come in ALTER TABLE statements after the rows.
+"""
+
+from sql_schema import PostDataSplitter, SequenceTracker
+
+
+def track(statements):
+    tracker = SequenceTracker()
+    for statement in statements:
+        tracker.observe(statement)
+    return tracker
+
+
+def test_sequence_tracker_keys_added_after_rows():
+    tracker = track([
+        "CREATE TABLE `a` (`id` int(11) NOT NULL, `n` int) ENGINE=InnoDB;",
+        "INSERT INTO `a` (`id`, `n`) VALUES (3, 100), (7, 5);",
+        "INSERT INTO `a` (`n`, `id`) VALUES (1, 12);",
+        "ALTER TABLE `a` ADD PRIMARY KEY (`id`);",
+        "ALTER TABLE `a` MODIFY `id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=10;",
+    ])
+    assert tracker.tables['a'].serial_columns() == ['id']
+    assert tracker.tables['a'].maxima == {'id': 12, 'n': 100}
+    assert tracker.reset_sql().splitlines()[-1] == (
+        "SELECT setval(pg_get_serial_sequence('\"a\"', 'id'), 13, false);"
+    )
+
+
+def test_sequence_tracker_counter_above_rows():
+    tracker = track([
+        "CREATE TABLE `b` (`id` int NOT NULL AUTO_INCREMENT PRIMARY KEY, `x` text) AUTO_INCREMENT=50;",
+        "INSERT INTO `b` VALUES (1, 'one');",
+    ])
+    assert tracker.reset_sql().splitlines()[-1] == (
+        "SELECT setval(pg_get_serial_sequence('\"b\"', 'id'), 50, false);"
+    )
+
+
+def test_sequence_tracker_nothing_to_reset():
+    tracker = track([
+        "CREATE TABLE `c` (`k` varchar(5), `v` int);",
+        "INSERT INTO `c` VALUES ('a', 9);",
+        "CREATE TABLE `d` (`id` int NOT NULL AUTO_INCREMENT PRIMARY KEY);",
+    ])
+    assert tracker.tables['c'].serial_columns() == []
+    assert tracker.reset_sql() == ''
+
+
+def test_post_data_splitter_create_table():
+    splitter = PostDataSplitter()
+    statement = (
+        "-- keys\n"
+        "CREATE TABLE `a` (\n"
+        "  `id` int NOT NULL,\n"
+        "  `u` varchar(5) UNIQUE,\n"
+        "  `b_id` int,\n"
+        "  PRIMARY KEY (`id`),\n"
+        "  KEY `b` (`b_id`),\n"
+        "  CONSTRAINT `fk` FOREIGN KEY (`b_id`) REFERENCES `b` (`id`)\n"
+        ") ENGINE=InnoDB;"
+    )
+    assert splitter.split(statement) == (
+        "-- keys\n"
+        "CREATE TABLE `a` (\n"
+        "  `id` int NOT NULL,\n"
+        "  `u` varchar(5),\n"
+        "  `b_id` int\n"
+        ") ENGINE=InnoDB;"
+    )
+    assert splitter.post_data_sql() == (
+        'ALTER TABLE "a" ADD PRIMARY KEY ("id");\n'
+        'CREATE UNIQUE INDEX "idx_a_u" ON "a" ("u");\n'
+        'CREATE INDEX "idx_a_b" ON "a" ("b_id");\n'
+        'ALTER TABLE "a" ADD CONSTRAINT "fk" FOREIGN KEY ("b_id") REFERENCES "b" ("id");\n'
+    )
+
+
+def test_post_data_splitter_alter_table():
+    splitter = PostDataSplitter()
+    # Nothing but keys: only the comments in front are left
+    assert splitter.split("\n-- more\nALTER TABLE `a`\n  ADD KEY `u2` (`u`);") == "\n-- more\n"
+    assert splitter.split("\nALTER TABLE `a`\n  ADD KEY `x` (`u`),\n  ADD COLUMN `z` int;") == (
+        "\nALTER TABLE `a`\n  ADD COLUMN `z` int;"
+    )
+    assert splitter.split("\nALTER TABLE `a` ADD COLUMN `y` int;") == "\nALTER TABLE `a` ADD COLUMN `y` int;"
+    assert splitter.post_data_sql() == (
+        'CREATE INDEX "idx_a_u2" ON "a" ("u");\n'
+        'CREATE INDEX "idx_a_x" ON "a" ("u");\n'
+    )
@@ -0,0 +1,72 @@
+"""
+StatementBatcher: re-chunked INSERTs and COPY blocks and the transactions it
+groups data statements into.
+"""
+
+from mysql_to_postgres_bulk import StatementBatcher
+
+
+def batch(batcher, statements):
+    return ''.join(batcher.format(statement) for statement in statements) + batcher.finish()
+
+
+def test_rechunks_inserts_only():
+    batcher = StatementBatcher(rows_per_statement=2)
+    assert batch(batcher, [
+        "\nCREATE TABLE t (a int);",
+        "\nINSERT INTO t (a) VALUES (1),(2),(3);",
+    ]) == (
+        "\nCREATE TABLE t (a int);"
+        "\nINSERT INTO t (a) VALUES (1),(2);"
+        "\nINSERT INTO t (a) VALUES (3);"
+    )
+
+
+def test_own_transactions_close_before_ddl():
+    batcher = StatementBatcher(rows_per_statement=2, statements_per_transaction=3)
+    assert batch(batcher, [
+        "\nCREATE TABLE t (a int);",
+        "\nINSERT INTO t (a) VALUES (1),(2),(3);",
+        "\nCREATE INDEX i ON t (a);",
+        "\nCOPY t (a) FROM stdin;",
+    ]) == (
+        "\nCREATE TABLE t (a int);"
+        "\nBEGIN;"
+        "\nINSERT INTO t (a) VALUES (1),(2);"
+        "\nINSERT INTO t (a) VALUES (3);"
+        "\nCOMMIT;"
+        "\nCREATE INDEX i ON t (a);"
+        "\nBEGIN;"
+        "\nCOPY t (a) FROM stdin;"
+        "\nCOMMIT;"
+    )
+
+
+def test_own_transactions_commit_every_n_statements():
+    batcher = StatementBatcher(statements_per_transaction=2)
+    inserts = [f"\nINSERT INTO t VALUES ({value});" for value in range(3)]
+    assert batch(batcher, inserts) == (
+        "\nBEGIN;" + inserts[0] + inserts[1] + "\nCOMMIT;"
+        "\nBEGIN;" + inserts[2] + "\nCOMMIT;"
+    )
+
+
+def test_checkpoints_inside_dump_transaction():
+    batcher = StatementBatcher(statements_per_transaction=2)
+    inserts = [f"\nINSERT INTO t VALUES ({value});" for value in range(3)]
+    assert batch(batcher, ["\nSTART TRANSACTION;", *inserts, "\nCOMMIT;"]) == (
+        "\nSTART TRANSACTION;" + inserts[0] + inserts[1]
+        + "\nCOMMIT;\nSTART TRANSACTION;" + inserts[2] + "\nCOMMIT;"
+    )
+
+
+def test_rechunks_copy_blocks_into_transactions():
+    batcher = StatementBatcher(rows_per_statement=2, statements_per_transaction=1)
+    assert batch(batcher, ["\nCOPY t (a) FROM stdin;\n1\n2\n3\n\\.\n"]) == (
+        "\nBEGIN;"
+        "\nCOPY t (a) FROM stdin;\n1\n2\n\\.\n"
+        "\nCOMMIT;"
+        "\nBEGIN;"
+        "\nCOPY t (a) FROM stdin;\n3\n\\.\n"
+        "\nCOMMIT;"
+    )
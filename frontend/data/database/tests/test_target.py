@@ -0,0 +1,48 @@
+"""
+mysql_to_postgres_bulk.py --target: a dump converted straight into the
+database ends up with the same rows as its converted file loaded by psql.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+from check_parity import summarize
+from conftest import DATABASE_DIR, ORIGIN_DIR, create_database, query
+from load_database import find_dump_files, load_files, resolve_dependencies, run_post_data
+
+DUMP = 'blogcomment.sql'
+TABLE = 'blogcomment'
+
+
+def table_digest(dsn):
+    return query(dsn, f'SELECT count(*), md5(string_agg(t::text, \'|\' ORDER BY t::text)) FROM "{TABLE}" t')
+
+
+def convert(directory, *options):
+    subprocess.run(
+        [sys.executable, 'mysql_to_postgres_bulk.py', str(directory), '--deterministic', *options],
+        cwd=DATABASE_DIR, stdout=subprocess.DEVNULL, check=True,
+    )
+
+
+def test_target_matches_file_output(cluster, database, tmp_path):
+    for name in ('target', 'files'):
+        (tmp_path / name).mkdir()
+        shutil.copy(os.path.join(ORIGIN_DIR, DUMP), tmp_path / name)
+    
+    convert(tmp_path / 'target', '--target', database)
+    assert os.listdir(tmp_path / 'target') == [DUMP]
+    
+    convert(tmp_path / 'files')
+    file_database = create_database(cluster)
+    files = find_dump_files(str(tmp_path / 'files'))
+    resolve_dependencies(files)
+    load_files(files, file_database, jobs=1)
+    assert run_post_data(files, file_database, jobs=1) == 0
+    assert files[0].status == 'loaded', files[0].error
+    
+    rows = summarize(os.path.join(ORIGIN_DIR, DUMP))['tables'][TABLE]['rows']
+    assert table_digest(database).split('|')[0] == str(rows)
+    assert table_digest(database) == table_digest(file_database)
@@ -3,83 +3,144 @@
 验证PostgreSQL转换质量
 """
 
+import argparse
+import json
 import os
-import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def validate_postgres_file(filepath):
-    """验证单个PostgreSQL文件的转换质量"""
-    print(f"\n验证文件: {os.path.basename(filepath)}")
-    
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 检查常见问题
-    issues = []
-    
-    # 检查是否还有MySQL特有语法
-    mysql_patterns = [
-        (r'AUTO_INCREMENT', 'MySQL AUTO_INCREMENT 未转换'),
-        (r'ENGINE\s*=', 'MySQL ENGINE 未转换'),
-        (r'CHARSET\s*=', 'MySQL CHARSET 未转换'),
-        (r'`[^`]+`', '仍有MySQL反引号'),
-        (r"'0000-00-00", 'MySQL零日期未转换'),
-        (r'\bTINYINT\b', 'TINYINT未转换为SMALLINT'),
-        (r'\bDATETIME\b', 'DATETIME未转换为TIMESTAMP'),
-    ]
-    
-    for pattern, message in mysql_patterns:
-        matches = re.findall(pattern, content, flags=re.IGNORECASE)
-        if matches:
-            issues.append(f"{message}: 发现 {len(matches)} 处")
-    
-    # 统计信息
-    insert_count = len(re.findall(r'^INSERT INTO', content, flags=re.MULTILINE))
-    create_table = re.search(r'CREATE TABLE\s+"?(\w+)"?', content, flags=re.IGNORECASE)
-    table_name = create_table.group(1) if create_table else "未知"
+from compressed_io import glob_files
+from postprocess_pipeline import ValidationPass, run_pipeline
+
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 每个文件在屏幕上列出的问题明细条数（JSON报告里全部保留）
+PRINTED_FINDINGS = 10
+
+def validate_file(filepath):
+    """流式检查单个文件，返回报告字典（可在子进程中运行）
     
-    print(f"  表名: {table_name}")
-    print(f"  INSERT语句数量: {insert_count}")
-    print(f"  文件大小: {len(content):,} 字符")
+    文件只读一遍：ValidationPass 在同一次扫描里检查所有规则，
+    跳过字符串和注释，并记录每处问题的行号和列号。
+    """
+    start = time.perf_counter()
+    step, = run_pipeline(filepath, ['validate'])
+    return {
+        'file': filepath,
+        'table': step.table_name,
+        'insert_count': step.insert_count,
+        'size': step.size,
+        'lines': step.line,
+        'counts': {rule: count for rule, count in step.counts.items() if count},
+        'issues': step.issues,
+        'findings': step.findings,
+        'findings_truncated': sum(step.counts.values()) > len(step.findings),
+        'elapsed': round(time.perf_counter() - start, 4),
+    }
+
+def print_report(report, printed_findings=PRINTED_FINDINGS):
+    """打印单个文件的检查结果"""
+    print(f"\n验证文件: {os.path.basename(report['file'])}")
+    print(f"  表名: {report['table'] or '未知'}")
+    print(f"  INSERT语句数量: {report['insert_count']}")
+    print(f"  文件大小: {report['size']:,} 字节, {report['lines']:,} 行")
     
-    if issues:
+    if report['issues']:
         print("  发现问题:")
-        for issue in issues:
+        for issue in report['issues']:
             print(f"    - {issue}")
+        for finding in report['findings'][:printed_findings]:
+            print(f"      {os.path.basename(report['file'])}:{finding['line']}:{finding['column']}: "
+                  f"{finding['message']} ({finding['text']})")
+        hidden = sum(report['counts'].values()) - min(len(report['findings']), printed_findings)
+        if hidden > 0:
+            print(f"      ... 另有 {hidden} 处")
     else:
         print("  ✓ 转换质量良好")
-    
-    return len(issues) == 0
+
+def validate_postgres_file(filepath):
+    """验证单个PostgreSQL文件的转换质量"""
+    report = validate_file(filepath)
+    print_report(report)
+    return not report['issues']
+
+def find_postgres_files(paths, pattern='*_postgres.sql'):
+    """展开参数里的目录，返回要验证的文件列表（含 .gz/.xz/.bz2 压缩文件）"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob_files(path, pattern))
+        else:
+            files.append(path)
+    return files
+
+def validate_files(files, jobs=1):
+    """并行验证多个文件，按输入顺序返回报告"""
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(validate_file, files))
+    return [validate_file(filepath) for filepath in files]
+
+def write_report(path, reports, elapsed):
+    """写出结构化JSON报告"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'rules': ValidationPass.RULES,
+            'elapsed': round(elapsed, 4),
+            'files': reports,
+            'summary': {
+                'files': len(reports),
+                'good': sum(1 for report in reports if not report['issues']),
+                'findings': sum(sum(report['counts'].values()) for report in reports),
+                'size': sum(report['size'] for report in reports),
+            },
+        }, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="验证PostgreSQL转换质量")
+    parser.add_argument('paths', nargs='*', default=[DATABASE_DIR],
+                        help="要验证的文件或目录（目录下的 *_postgres.sql，默认: 本脚本所在目录）")
+    parser.add_argument('--pattern', default='*_postgres.sql', help="目录中匹配的文件名（默认: %(default)s）")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="并行进程数，0 表示使用全部CPU")
+    parser.add_argument('--report', default=None, help="把完整结果（含每处问题的行号列号）写入JSON文件")
+    parser.add_argument('--show', type=int, default=PRINTED_FINDINGS,
+                        help="每个文件在屏幕上列出的问题条数（默认: %(default)s）")
+    return parser.parse_args()
 
 def main():
-    database_dir = r"c:\Users\ken15.小恩\OneDrive\桌面\GURUlaptop\新增ckeditor版本(編輯中 render 用)\MFEE57-laptopGuru-ckeditor\frontend\data\database"
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
     
     print("PostgreSQL转换质量验证")
     print("=" * 50)
     
-    # 验证重要文件
-    important_files = [
-        'users_postgres.sql',
-        'product_postgres.sql', 
-        'product_detail_img_postgres.sql',
-        'event_type_postgres.sql',
-        'blogcomment_postgres.sql',
-        'event_registration_postgres.sql'
-    ]
-    
-    good_files = 0
-    total_files = 0
+    files = find_postgres_files(args.paths, args.pattern)
+    if not files:
+        print("未找到PostgreSQL文件")
+        sys.exit(1)
     
-    for filename in important_files:
-        filepath = os.path.join(database_dir, filename)
-        if os.path.exists(filepath):
-            total_files += 1
-            if validate_postgres_file(filepath):
-                good_files += 1
+    start = time.perf_counter()
+    reports = validate_files(files, jobs)
+    elapsed = time.perf_counter() - start
+    for report in reports:
+        print_report(report, args.show)
     
+    good_files = sum(1 for report in reports if not report['issues'])
+    total_size = sum(report['size'] for report in reports)
     print(f"\n验证总结:")
-    print(f"验证文件: {total_files}")
+    print(f"验证文件: {len(reports)}")
     print(f"转换良好: {good_files}")
-    print(f"需要修复: {total_files - good_files}")
+    print(f"需要修复: {len(reports) - good_files}")
+    print(f"耗时: {elapsed:.2f}s（{total_size / 1024 / 1024 / elapsed if elapsed else 0:.1f} MB/s，{jobs} 个进程）")
+    
+    if args.report:
+        write_report(args.report, reports, elapsed)
+        print(f"✓ 报告已写入 {args.report}")
+    
+    if good_files < len(reports):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()